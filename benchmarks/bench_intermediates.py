@@ -0,0 +1,47 @@
+"""
+Micro-benchmark: intermediate Whisper segments as CSV or Parquet.
+
+Writes 100k synthetic segments in both formats and compares the write time,
+the file size, reloading the whole table and reloading two columns of a
+1000-row range with convscript.intermediate_store.
+
+    python benchmarks/bench_intermediates.py --n_segments 100000
+"""
+import argparse
+import os
+import tempfile
+import timeit
+from pathlib import Path
+
+from bench_segment_tables import synthetic_whisper_segments
+from convscript.intermediate_store import read_intermediate, write_intermediate
+from convscript.segments import whisper_segments_to_df
+
+
+def run(n_segments, repeat):
+
+    text_df = whisper_segments_to_df(synthetic_whisper_segments(n_segments)).reset_index()
+    middle = n_segments // 2
+
+    print(f"Intermediate tables for {n_segments:,} segments")
+    print(f"  {'format':<8} {'write':>10} {'size':>10} {'read all':>10} {'read 2 cols x 1000 rows':>24}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for extension in ['csv', 'parquet']:
+            path = Path(tmp_dir) / f'segments.{extension}'
+            write_s = min(timeit.repeat(lambda: write_intermediate(text_df, path), number=1, repeat=repeat))
+            read_all_s = min(timeit.repeat(lambda: read_intermediate(path), number=1, repeat=repeat))
+            read_range_s = min(timeit.repeat(lambda: read_intermediate(path, columns=['start', 'avg_logprob'],
+                                                                       rows=(middle, middle + 1000)),
+                                             number=1, repeat=repeat))
+            print(f"  {extension:<8} {write_s * 1000:8.1f} ms {os.path.getsize(path) / 1e6:7.2f} MB "
+                  f"{read_all_s * 1000:7.1f} ms {read_range_s * 1000:21.1f} ms")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--n_segments', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    run(args.n_segments, args.repeat)
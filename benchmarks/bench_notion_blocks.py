@@ -0,0 +1,98 @@
+"""
+Micro-benchmark: converting a 500k-character transcript to Notion blocks.
+
+Compares the previous markdown_to_notion_blocks (re.split of paragraphs,
+repeated string concatenation for long ones) with the single-pass block
+builder in convscript.notion, and with building blocks from the DataFrame.
+
+    python benchmarks/bench_notion_blocks.py --n_chars 500000
+"""
+import argparse
+import re
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from convscript.notion import markdown_to_notion_blocks, transcript_df_to_notion_blocks
+from convscript.transcript_writer import iter_transcript_chunks
+
+
+def synthetic_text_speaker_df(n_chars, seed=0):
+
+    rng = np.random.default_rng(seed)
+    words = ['so', 'I', 'think', 'that', 'the', 'model', 'is', 'really', 'quite', 'interesting', 'because']
+
+    rows = []
+    start, total = 0.0, 0
+    while total < n_chars:
+        # mostly short turns, some monologues of several thousand characters
+        n_sentences = int(rng.integers(1, 6)) if rng.random() < 0.9 else int(rng.integers(50, 150))
+        sentences = [' '.join(rng.choice(words, size=int(rng.integers(5, 25)))).capitalize() + '.'
+                     for _ in range(n_sentences)]
+        text = ' ' + ' '.join(sentences)
+        end = start + len(text) / 15
+        rows.append({'start': start, 'end': end, 'text': text, 'speaker': f'SPEAKER_0{len(rows) % 3}'})
+        start, total = end, total + len(text)
+
+    return pd.DataFrame(rows)
+
+
+def legacy_markdown_to_notion_blocks(content):
+
+    paragraphs = re.split(r'\n\s*\n', content.strip())
+
+    blocks = []
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if len(paragraph) > 1900:
+            sentences = re.split(r'(?<=[.!?])\s+', paragraph)
+            current_block = ""
+
+            for sentence in sentences:
+                if len(current_block + sentence) > 1900:
+                    if current_block:
+                        blocks.append({"object": "block", "type": "paragraph",
+                                       "paragraph": {"rich_text": [{"type": "text", "text": {"content": current_block.strip()}}]}})
+                    current_block = sentence
+                else:
+                    current_block += (" " if current_block else "") + sentence
+
+            if current_block:
+                blocks.append({"object": "block", "type": "paragraph",
+                               "paragraph": {"rich_text": [{"type": "text", "text": {"content": current_block.strip()}}]}})
+        else:
+            blocks.append({"object": "block", "type": "paragraph",
+                           "paragraph": {"rich_text": [{"type": "text", "text": {"content": paragraph}}]}})
+
+    return blocks
+
+
+def run(n_chars, repeat):
+
+    text_speaker_df = synthetic_text_speaker_df(n_chars)
+    content = ''.join(iter_transcript_chunks(text_speaker_df, 'txt'))
+
+    cases = [
+        ('text file (legacy)', lambda: legacy_markdown_to_notion_blocks(content)),
+        ('text file (single pass)', lambda: markdown_to_notion_blocks(content)),
+        ('text_speaker_df', lambda: list(transcript_df_to_notion_blocks(text_speaker_df))),
+    ]
+
+    print(f"Converting {len(content):,} characters ({len(text_speaker_df):,} turns) to Notion blocks")
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(f"  {name:<28} {best * 1000:10.1f} ms  {len(func()):6d} blocks")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--n_chars', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.n_chars, args.repeat)
@@ -0,0 +1,170 @@
+"""
+Micro-benchmark suite: the post-inference pipeline at 100 / 1k / 10k / 100k rows.
+
+Times combine_whisper_and_pyannote, combine_consecutive_speakers,
+text_speaker_df_to_text, markdown_to_notion_blocks, split_blocks_into_parts
+and the segment table builders on synthetic tables with pytest-benchmark.
+Everything runs offline, in about 20 seconds.
+
+    # compare against the stored baseline, fail if a best time is more than 25% slower
+    python -m pytest benchmarks/bench_pipeline.py --benchmark-storage=benchmarks/baselines \
+        --benchmark-compare --benchmark-compare-fail=min:25%
+
+    # store a new baseline (after an intended change, or on a new machine)
+    python -m pytest benchmarks/bench_pipeline.py --benchmark-storage=benchmarks/baselines \
+        --benchmark-save=baseline
+
+Baselines are stored per machine (platform and Python version) in
+benchmarks/baselines, timings from other machines are not comparable. The
+best of several rounds (`min`) is the least noisy statistic; on shared or
+throttled VMs, where the same code varies by 50% between runs, save a fresh
+baseline right before the change and loosen the threshold.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_segment_tables import synthetic_whisper_segments
+from convscript.conversation_transcription import combine_whisper_and_pyannote, combine_consecutive_speakers, \
+    text_speaker_df_to_text
+from convscript.notion import markdown_to_notion_blocks, split_blocks_into_parts
+from convscript.segments import whisper_segments_to_df, speaker_turns_to_df
+
+SIZES = [100, 1000, 10000, 100000]
+# fewer rounds for the larger tables keep the whole suite within seconds
+ROUNDS = {100: 50, 1000: 20, 10000: 5, 100000: 3}
+SPEAKERS = ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02']
+WORDS = ['so', 'I', 'think', 'that', 'the', 'model', 'is', 'really', 'quite', 'interesting', 'because']
+
+sizes = pytest.mark.parametrize('n_rows', SIZES)
+
+
+@functools.lru_cache(maxsize=None)
+def whisper_segments(n_rows):
+    return synthetic_whisper_segments(n_rows)
+
+
+@functools.lru_cache(maxsize=None)
+def speaker_turns(n_rows, seed=1):
+    """Speaker turns covering the whole time span of the Whisper segments."""
+    rng = np.random.default_rng(seed)
+    bounds = np.concatenate([[0.0], np.cumsum(rng.uniform(1, 8, size=n_rows))])
+    bounds *= (whisper_segments(n_rows)[-1]['end'] + 1) / bounds[-1]
+    # speakers mostly alternate, so that merging consecutive turns has work to do
+    speakers = np.array(SPEAKERS)[np.cumsum(rng.random(n_rows) < 0.4) % len(SPEAKERS)]
+
+    return [{'index': f'T{i}', 'start': float(bounds[i]), 'end': float(bounds[i + 1]),
+             'speaker': str(speakers[i])}
+            for i in range(n_rows)]
+
+
+@functools.lru_cache(maxsize=None)
+def text_df(n_rows):
+    return whisper_segments_to_df(whisper_segments(n_rows)).reset_index()
+
+
+@functools.lru_cache(maxsize=None)
+def speaker_df(n_rows):
+    return speaker_turns_to_df(speaker_turns(n_rows))
+
+
+@functools.lru_cache(maxsize=None)
+def text_speaker_df_raw(n_rows):
+    return combine_whisper_and_pyannote(text_df(n_rows), speaker_df(n_rows))
+
+
+@functools.lru_cache(maxsize=None)
+def text_speaker_df(n_rows, seed=2):
+    """A merged transcript with n_rows speaker turns of one to five sentences."""
+    rng = np.random.default_rng(seed)
+    n_words = rng.integers(5, 25, size=(n_rows, 5))
+    n_sentences = rng.integers(1, 6, size=n_rows)
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), size=n_words.sum())]
+
+    texts, offset = [], 0
+    for row in range(n_rows):
+        sentences = []
+        for n in n_words[row, :n_sentences[row]]:
+            sentences.append(' '.join(words[offset:offset + n]).capitalize() + '.')
+            offset += n
+        texts.append(' ' + ' '.join(sentences))
+
+    ends = np.cumsum([len(text) / 15 for text in texts])
+    return pd.DataFrame({'start': np.concatenate([[0.0], ends[:-1]]), 'end': ends, 'text': texts,
+                         'speaker': [SPEAKERS[row % len(SPEAKERS)] for row in range(n_rows)]})
+
+
+@functools.lru_cache(maxsize=None)
+def transcript_text(n_rows):
+    return text_speaker_df_to_text(text_speaker_df(n_rows))
+
+
+@functools.lru_cache(maxsize=None)
+def notion_blocks(n_rows):
+    return [{'object': 'block', 'type': 'paragraph',
+             'paragraph': {'rich_text': [{'type': 'text', 'text': {'content': f'Block {i}'}}]}}
+            for i in range(n_rows)]
+
+
+def run_benchmark(benchmark, n_rows, func, *args, **kwargs):
+    benchmark.extra_info['n_rows'] = n_rows
+    return benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=ROUNDS[n_rows], iterations=1,
+                              warmup_rounds=1)
+
+
+@sizes
+def test_combine_whisper_and_pyannote(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, combine_whisper_and_pyannote, text_df(n_rows), speaker_df(n_rows))
+
+    assert len(result) == n_rows
+
+
+@sizes
+def test_combine_consecutive_speakers(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, combine_consecutive_speakers, text_speaker_df_raw(n_rows))
+
+    assert 0 < len(result) <= n_rows
+
+
+@sizes
+def test_text_speaker_df_to_text(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, text_speaker_df_to_text, text_speaker_df(n_rows))
+
+    assert result.count('SPEAKER_') == n_rows
+
+
+@sizes
+def test_markdown_to_notion_blocks(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, markdown_to_notion_blocks, transcript_text(n_rows))
+
+    assert len(result) >= n_rows
+
+
+@sizes
+def test_split_blocks_into_parts(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, split_blocks_into_parts, notion_blocks(n_rows), 90)
+
+    assert sum(len(part) for part in result) == n_rows
+
+
+@sizes
+def test_whisper_segments_to_df(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, whisper_segments_to_df, whisper_segments(n_rows))
+
+    assert len(result) == n_rows
+
+
+@sizes
+def test_speaker_turns_to_df(benchmark, n_rows):
+
+    result = run_benchmark(benchmark, n_rows, speaker_turns_to_df, speaker_turns(n_rows))
+
+    assert len(result) == n_rows
@@ -0,0 +1,270 @@
+"""
+End-to-end benchmark: realtime factor of wav_to_transcript on synthetic audio.
+
+Generates a deterministic multi-speaker recording locally (voiced syllables
+with a distinct pitch per speaker, alternating turns and pauses), transcribes
+it with each execution mode and ASR backend, and appends the realtime factor
+(processing seconds per audio second, lower is faster), the stage timings of
+the run report and the peak memory to a results table. Each configuration
+runs in a fresh process, so peak memory and model loading are not shared.
+
+    python benchmarks/bench_realtime_factor.py --model_type tiny --duration 120
+
+    # store the results as the baseline (per machine, like bench_pipeline.py)
+    python benchmarks/bench_realtime_factor.py --save_baseline
+
+Runs are compared against benchmarks/baselines/<machine>/rtf_baseline.json and
+the script exits with an error if a configuration is more than --threshold
+slower (or uses that much more memory). No network is needed once the Whisper
+models and the pyannote pipeline are in the local model caches. The audio is
+not speech, so the transcripts themselves are meaningless; the number of
+speakers found is reported as a sanity check of diarization.
+
+No baseline exists yet: the harness has only been run with fake Whisper and
+pyannote functions (which checks the plumbing, not the numbers), so no
+rtf_baseline.json is committed and none of its results so far are real
+measurements. Record one with --save_baseline on a machine with the models
+installed before relying on the regression check.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from convscript.asr_backends import ASR_BACKEND_NAMES
+from convscript.choices import EXECUTION_MODES
+
+SAMPLE_RATE = 16000
+BENCHMARKS_DIR = Path(__file__).parent
+RESULTS_FILE = BENCHMARKS_DIR / 'rtf_results.csv'
+BASELINE_FILE = 'rtf_baseline.json'
+STAGES = ['decode', 'whisper', 'pyannote', 'inference', 'combine', 'write_transcript', 'write_intermediates']
+
+# fundamental frequency of each synthetic voice in Hz
+SPEAKER_PITCHES = [110.0, 210.0, 150.0, 260.0]
+# first three formants of the vowels a, e, i, o, u in Hz
+VOWEL_FORMANTS = [(730, 1090, 2440), (530, 1840, 2480), (270, 2290, 3010), (570, 840, 2410), (300, 870, 2240)]
+
+
+def machine_id():
+    """Same naming as pytest-benchmark's storage folders."""
+    return f"{platform.system()}-{platform.python_implementation()}-" \
+           f"{'.'.join(platform.python_version_tuple()[:2])}-{platform.architecture()[0]}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def synthetic_syllable(f0, formants, duration_s, sample_rate=SAMPLE_RATE):
+    """A voiced syllable: harmonics of f0 weighted by the vowel's formants, faded in and out."""
+    t = np.arange(int(duration_s * sample_rate)) / sample_rate
+    harmonics = np.arange(1, int(4000 // f0) + 1) * f0
+    weights = sum(np.exp(-((harmonics - formant) / 150) ** 2) for formant in formants) + 0.02
+
+    # a slight falling pitch, like the end of a word
+    phase = 2 * np.pi * np.outer(harmonics, t - 0.1 * t ** 2)
+    syllable = weights @ np.sin(phase) / weights.sum()
+
+    return syllable * np.sin(np.pi * t / duration_s) ** 0.5
+
+
+def synthetic_conversation(duration_s=120.0, n_speakers=3, seed=0, sample_rate=SAMPLE_RATE):
+    """
+    Deterministic audio of `n_speakers` taking turns of 2 to 8 seconds.
+
+    Returns the float32 samples and the true speaker turns (start, end, speaker).
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration_s * sample_rate)
+    audio = rng.normal(0, 0.003, size=n_samples)
+
+    turns = []
+    position, speaker = 0.5, 0
+    while position < duration_s - 1:
+        turn_end = min(position + rng.uniform(2, 8), duration_s - 0.5)
+        turn_start = position
+        while position < turn_end:
+            syllable_s = rng.uniform(0.12, 0.3)
+            formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+            syllable = synthetic_syllable(SPEAKER_PITCHES[speaker % len(SPEAKER_PITCHES)] * rng.uniform(0.95, 1.05),
+                                          formants, syllable_s, sample_rate)
+            start = int(position * sample_rate)
+            audio[start:start + len(syllable)] += 0.5 * syllable[:n_samples - start]
+            # short gaps between syllables, longer ones between words
+            position += syllable_s + (rng.uniform(0.1, 0.3) if rng.random() < 0.3 else rng.uniform(0.01, 0.05))
+        turns.append({'start': turn_start, 'end': min(position, duration_s), 'speaker': f'SPEAKER_{speaker:02d}'})
+
+        position += rng.uniform(0.3, 1.0)
+        speaker = (speaker + rng.integers(1, n_speakers)) % n_speakers
+
+    return (audio / np.abs(audio).max() * 0.8).astype(np.float32), turns
+
+
+def write_wav(fname, audio, sample_rate=SAMPLE_RATE):
+    with wave.open(str(fname), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((audio * 32767).astype('<i2').tobytes())
+
+
+def run_config(wav_fname, model_type, execution_mode, backend, pyannote_token, work_dir):
+    """Transcribe once with one configuration, returning a row of the results table."""
+    from convscript.conversation_transcription import wav_to_transcript, warm_up_models
+    from convscript.instrumentation import record_run, peak_rss_mb
+    from convscript.path import ProjPaths
+
+    # keep transcripts and intermediate files out of data/
+    ProjPaths.outputs_path = ProjPaths.intermediate_path = Path(work_dir)
+
+    load_start = time.perf_counter()
+    warm_up_models(model_type, pyannote_token, backend)
+    load_s = time.perf_counter() - load_start
+
+    with record_run('realtime_factor', model_type=model_type, execution_mode=execution_mode,
+                    backend=backend) as run:
+        output_file = wav_to_transcript(wav_fname, model_type, pyannote_token,
+                                        f'rtf_{execution_mode}_{backend}', execution_mode=execution_mode,
+                                        output_format='jsonl', return_path=True, use_cache=False,
+                                        backend=backend)
+    turns = pd.read_json(output_file, lines=True)
+
+    with wave.open(str(wav_fname), 'r') as wav_file:
+        audio_s = wav_file.getnframes() / wav_file.getframerate()
+    stages = run.stages()
+
+    row = {'model_type': model_type,
+           'execution_mode': execution_mode,
+           'backend': backend,
+           'audio_s': audio_s,
+           'load_s': load_s,
+           'processing_s': run.wall_s,
+           'rtf': run.wall_s / audio_s,
+           'peak_rss_mb': peak_rss_mb(),
+           'n_speakers': turns['speaker'].nunique() if len(turns) else 0}
+    for stage in STAGES:
+        row[f'{stage}_s'] = stages[stage]['wall_s'] if stage in stages else float('nan')
+    return row
+
+
+def run_isolated(*args):
+    """run_config in a fresh process."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(run_config, *args).result()
+
+
+def config_key(row):
+    return f"{row['model_type']}/{row['execution_mode']}/{row['backend']}"
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Relative change of RTF and peak memory per configuration, and whether it is a regression."""
+    for row in results:
+        base = baseline.get(config_key(row))
+        if base is None:
+            row['rtf_change'] = row['rss_change'] = float('nan')
+            row['regression'] = False
+            continue
+        row['rtf_change'] = row['rtf'] / base['rtf'] - 1
+        row['rss_change'] = row['peak_rss_mb'] / base['peak_rss_mb'] - 1 if base.get('peak_rss_mb') else float('nan')
+        row['regression'] = bool(row['rtf_change'] > threshold or row['rss_change'] > threshold)
+    return results
+
+
+def append_results(results, results_file=RESULTS_FILE):
+    results_df = pd.DataFrame(results)
+    results_df.to_csv(results_file, mode='a', header=not os.path.exists(results_file), index=False)
+    return results_df
+
+
+def run(model_type, duration, n_speakers, execution_modes, backends, threshold, save_baseline, in_process):
+
+    from convscript.model_pyannote import get_pyannote_access_token
+    from convscript.path import ProjPaths
+    pyannote_token = get_pyannote_access_token(ProjPaths.env_variables_path)
+
+    baseline_path = BENCHMARKS_DIR / 'baselines' / machine_id() / BASELINE_FILE
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if not baseline and not save_baseline:
+        print(f"⚠️  No baseline at {baseline_path}, nothing to compare against (record one with --save_baseline)")
+
+    started = datetime.now().isoformat(timespec='seconds')
+    commit = git_commit()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        wav_fname = Path(work_dir) / f'conversation_{n_speakers}spk_{int(duration)}s.wav'
+        audio, turns = synthetic_conversation(duration, n_speakers)
+        write_wav(wav_fname, audio)
+        print(f"🎵 Synthetic conversation: {duration:.0f}s, {n_speakers} speakers, {len(turns)} turns")
+
+        results = []
+        for execution_mode, backend in product(execution_modes, backends):
+            print(f"\n⏱️  {model_type} / {execution_mode} / {backend}")
+            args = (wav_fname, model_type, execution_mode, backend, pyannote_token, work_dir)
+            row = run_config(*args) if in_process else run_isolated(*args)
+            results.append(dict(row, started=started, commit=commit, machine=machine_id(),
+                                n_speakers_true=n_speakers))
+
+    compare_to_baseline(results, baseline, threshold)
+    results_df = append_results(results)
+
+    print(f"\n{'configuration':<40} {'RTF':>7} {'change':>8} {'whisper':>8} {'pyannote':>9} {'peak MB':>8} "
+          f"{'speakers':>9}")
+    for row in results:
+        print(f"{config_key(row):<40} {row['rtf']:>7.3f} {row['rtf_change']:>+8.1%} {row['whisper_s']:>7.1f}s "
+              f"{row['pyannote_s']:>8.1f}s {row['peak_rss_mb'] or 0:>8.0f} "
+              f"{row['n_speakers']:>4d} of {n_speakers}")
+    print(f"\nResults appended to {RESULTS_FILE}")
+
+    if save_baseline:
+        baseline.update({config_key(row): {'rtf': row['rtf'], 'peak_rss_mb': row['peak_rss_mb'],
+                                           'commit': commit, 'started': started}
+                         for row in results})
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baseline, indent=2))
+        print(f"Baseline saved to {baseline_path}")
+        return results_df
+
+    regressions = [config_key(row) for row in results if row['regression']]
+    if regressions:
+        print(f"❌ More than {threshold:.0%} slower or larger than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+    return results_df
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model_type', default='tiny')
+    parser.add_argument('--duration', type=float, default=120.0, help='Seconds of synthetic audio')
+    parser.add_argument('--n_speakers', type=int, default=3)
+    parser.add_argument('--execution_modes', default=','.join(EXECUTION_MODES))
+    parser.add_argument('--backends', default=','.join(ASR_BACKEND_NAMES))
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative RTF or memory increase over the baseline that counts as a regression')
+    parser.add_argument('--save_baseline', action='store_true')
+    parser.add_argument('--in_process', action='store_true',
+                        help='Run all configurations in this process (models stay loaded between them)')
+    args = parser.parse_args()
+
+    run(args.model_type, args.duration, args.n_speakers, args.execution_modes.split(','),
+        args.backends.split(','), args.threshold, args.save_baseline, args.in_process)
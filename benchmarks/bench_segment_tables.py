@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: building segment tables for 10k segments.
+
+Compares the previous one-row-DataFrame-per-segment + pd.concat approach with
+the columnar builders in convscript.segments.
+
+    python benchmarks/bench_segment_tables.py --n_segments 10000
+"""
+import argparse
+import copy
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from convscript.segments import whisper_segments_to_df, speaker_turns_to_df
+
+
+def synthetic_whisper_segments(n_segments, seed=0):
+
+    rng = np.random.default_rng(seed)
+    bounds = np.cumsum(rng.uniform(1, 8, size=n_segments + 1))
+
+    return [{'id': i,
+             'seek': int(bounds[i] * 100) // 3000 * 3000,
+             'start': float(bounds[i]),
+             'end': float(bounds[i + 1]),
+             'text': f' segment number {i} with a few words of text.',
+             'tokens': rng.integers(0, 50000, size=20).tolist(),
+             'temperature': 0.0,
+             'avg_logprob': float(rng.normal(-0.3, 0.1)),
+             'compression_ratio': float(rng.uniform(1, 2)),
+             'no_speech_prob': float(rng.uniform(0, 0.1))}
+            for i in range(n_segments)]
+
+
+def synthetic_speaker_turns(n_segments, seed=0):
+
+    rng = np.random.default_rng(seed)
+    bounds = np.cumsum(rng.uniform(1, 20, size=n_segments + 1))
+    speakers = rng.choice(['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02'], size=n_segments)
+
+    return [{'index': f'T{i}', 'start': float(bounds[i]), 'end': float(bounds[i + 1]),
+             'speaker': str(speakers[i])}
+            for i in range(n_segments)]
+
+
+def legacy_whisper_segments_to_df(segments):
+
+    all_seg_df_list = []
+    for this_seg in segments:
+        if 'tokens' in this_seg.keys():
+            this_seg.pop('tokens')
+        all_seg_df_list.append(pd.DataFrame.from_dict({0: this_seg}, orient='index'))
+
+    return pd.concat(all_seg_df_list, axis=0).set_index('id')
+
+
+def legacy_speaker_turns_to_df(turns):
+
+    seg_info_list = []
+    for turn in turns:
+        this_seg_info = {'start': np.round(turn['start'], 2),
+                         'end': np.round(turn['end'], 2),
+                         'speaker': turn['speaker']}
+        seg_info_list.append(pd.DataFrame.from_dict({turn['index']: this_seg_info}, orient='index'))
+
+    return pd.concat(seg_info_list, axis=0).reset_index()
+
+
+def run(n_segments, repeat):
+
+    whisper_segments = synthetic_whisper_segments(n_segments)
+    speaker_turns = synthetic_speaker_turns(n_segments)
+
+    cases = [
+        ('whisper segments (legacy concat)',
+         lambda: legacy_whisper_segments_to_df(copy.deepcopy(whisper_segments)), 1),
+        ('whisper segments (columnar)',
+         lambda: whisper_segments_to_df(whisper_segments), repeat),
+        ('speaker turns (legacy concat)',
+         lambda: legacy_speaker_turns_to_df(speaker_turns), 1),
+        ('speaker turns (columnar)',
+         lambda: speaker_turns_to_df(speaker_turns), repeat),
+    ]
+
+    print(f"Building segment tables for {n_segments:,} segments")
+    for name, func, n_repeat in cases:
+        best = min(timeit.repeat(func, number=1, repeat=n_repeat))
+        print(f"  {name:<36} {best * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--n_segments', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.n_segments, args.repeat)
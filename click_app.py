@@ -1,12 +1,14 @@
 # %%
 import click
 import os
+from datetime import datetime
 from pathlib import Path
-from convscript.conversation_transcription import wav_to_transcript
-from convscript.audio_utils import download_mp3, transform_mp3_to_wav
-from convscript.model_pyannote import get_pyannote_access_token
-from convscript.notion import upload_transcript_to_notion, safe_filename, get_today_date
-from paths import INPUTS_RAW_DIR, INPUTS_WAV_DIR, OUTPUTS_DIR
+from convscript.asr_backends import ASR_BACKEND_NAMES, DEFAULT_ASR_BACKEND
+from convscript.choices import EXECUTION_MODES, OUTPUT_FORMATS, NOTION_UPLOAD_MODES, INTERMEDIATE_FORMATS
+from paths import INPUTS_RAW_DIR, INPUTS_WAV_DIR, OUTPUTS_DIR, ensure_directories
+
+# The pipeline modules (pandas, torch, pyannote, the Notion client) are imported
+# inside the commands, so --help and the cache commands start without them.
 
 WHISPER_MODELS = ['tiny.en', 'tiny', 'base.en', 'base', 'small.en', 'small', 'medium.en', 'medium', 'large-v1', 'large-v2', 'large', 'large-v3-turbo']
 
@@ -20,9 +22,30 @@ def transcribe():
 @click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS), 
               default='large-v3-turbo', prompt='Provide the Whisper model',
               help='Defines the model type in Whisper')
+@click.option('--execution_mode', type=click.Choice(choices=EXECUTION_MODES),
+              default='sequential',
+              help='Run Whisper and speaker diarization one after the other or concurrently')
+@click.option('--backend', type=click.Choice(choices=ASR_BACKEND_NAMES),
+              default=DEFAULT_ASR_BACKEND,
+              help='Speech recognition implementation (faster-whisper runs int8 quantized on CPU)')
+@click.option('--whisper_workers', type=click.INT, default=1,
+              help='Split long recordings at silences and transcribe the chunks in this many processes')
+@click.option('--diarization_window', type=click.INT, default=0,
+              help='Diarize in overlapping windows of this many seconds to bound memory (0: whole file)')
+@click.option('--diarization_workers', type=click.INT, default=1,
+              help='Diarization windows processed at the same time')
+@click.option('--output_format', type=click.Choice(choices=OUTPUT_FORMATS),
+              default='txt',
+              help='Transcript file format')
+@click.option('--intermediate_format', type=click.Choice(choices=INTERMEDIATE_FORMATS),
+              default='parquet',
+              help='File format of the Whisper segments and speaker turns kept in data/intermediate')
 @click.option('--output_filename', type=click.STRING,
               help='Output filename (without .txt extension). If not provided, will be prompted.')
-def click_wav_to_transcript(wav_fname, model_type, output_filename):
+def click_wav_to_transcript(wav_fname, model_type, execution_mode, backend, whisper_workers, diarization_window,
+                            diarization_workers, output_format, intermediate_format, output_filename):
+    from convscript.conversation_transcription import wav_to_transcript, warm_up_models
+    from convscript.model_pyannote import get_pyannote_access_token
     
     # Prompt for output filename if not provided
     if not output_filename:
@@ -32,8 +55,15 @@ def click_wav_to_transcript(wav_fname, model_type, output_filename):
     
     dotenv_path = './.env'
     pyannote_token = get_pyannote_access_token(dotenv_path)
+    warm_up_models(model_type, pyannote_token, backend)
     
-    wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename)
+    wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename,
+                      execution_mode=execution_mode, output_format=output_format,
+                      return_path=True, backend=backend,
+                      whisper_workers=whisper_workers,
+                      diarization_window_s=diarization_window or None,
+                      diarization_workers=diarization_workers,
+                      intermediate_format=intermediate_format)
 
 
 @click.command()
@@ -42,9 +72,34 @@ def click_wav_to_transcript(wav_fname, model_type, output_filename):
 @click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS), 
               default='large-v3-turbo', prompt='Provide the Whisper model',
               help='Defines the model type in Whisper')
+@click.option('--execution_mode', type=click.Choice(choices=EXECUTION_MODES),
+              default='sequential',
+              help='Run Whisper and speaker diarization one after the other or concurrently')
+@click.option('--backend', type=click.Choice(choices=ASR_BACKEND_NAMES),
+              default=DEFAULT_ASR_BACKEND,
+              help='Speech recognition implementation (faster-whisper runs int8 quantized on CPU)')
+@click.option('--whisper_workers', type=click.INT, default=1,
+              help='Split long recordings at silences and transcribe the chunks in this many processes')
+@click.option('--diarization_window', type=click.INT, default=0,
+              help='Diarize in overlapping windows of this many seconds to bound memory (0: whole file)')
+@click.option('--diarization_workers', type=click.INT, default=1,
+              help='Diarization windows processed at the same time')
+@click.option('--write_wav', is_flag=True, default=False,
+              help='Also convert the download to a WAV file in inputs/wav')
+@click.option('--output_format', type=click.Choice(choices=OUTPUT_FORMATS),
+              default='txt',
+              help='Transcript file format')
+@click.option('--intermediate_format', type=click.Choice(choices=INTERMEDIATE_FORMATS),
+              default='parquet',
+              help='File format of the Whisper segments and speaker turns kept in data/intermediate')
 @click.option('--output_filename', type=click.STRING,
               help='Output filename (without .txt extension). If not provided, will be prompted.')
-def click_url_to_transcript(url, model_type, output_filename):
+def click_url_to_transcript(url, model_type, execution_mode, backend, whisper_workers, diarization_window,
+                            diarization_workers, write_wav, output_format, intermediate_format, output_filename):
+    from convscript.audio_utils import download_mp3, transform_mp3_to_wav, print_download_progress, audio_extension
+    from convscript.conversation_transcription import wav_to_transcript, warm_up_models
+    from convscript.instrumentation import record_run, write_run_report
+    from convscript.model_pyannote import get_pyannote_access_token
 
     # Prompt for output filename if not provided
     if not output_filename:
@@ -54,26 +109,38 @@ def click_url_to_transcript(url, model_type, output_filename):
 
     dotenv_path = './.env'
     pyannote_token = get_pyannote_access_token(dotenv_path)
+    warm_up_models(model_type, pyannote_token, backend)
     
     # Ensure directories exist
-    INPUTS_RAW_DIR.mkdir(parents=True, exist_ok=True)
-    INPUTS_WAV_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Step 1: Download file to inputs/raw
-    print("Downloading file from URL...")
-    raw_filename = INPUTS_RAW_DIR / f"{output_filename}.mp3"
-    downloaded_file = download_mp3(url, str(raw_filename))
-    print(f"Downloaded to: {downloaded_file}")
+    ensure_directories()
     
-    # Step 2: Transform to .wav in inputs/wav
-    print("Converting MP3 to WAV...")
-    wav_filename = INPUTS_WAV_DIR / f"{output_filename}.wav"
-    wav_file = transform_mp3_to_wav(downloaded_file, str(wav_filename))
-    print(f"Converted to: {wav_file}")
-    
-    # Step 3: Do transcription
-    print("Starting transcription...")
-    wav_to_transcript(wav_file, model_type, pyannote_token, output_filename)
+    with record_run('url_to_transcript', url=url, model_type=model_type, backend=backend,
+                    execution_mode=execution_mode) as run:
+        # Step 1: Download file to inputs/raw
+        print("Downloading file from URL...")
+        raw_filename = INPUTS_RAW_DIR / f"{output_filename}{audio_extension(url)}"
+        downloaded_file = download_mp3(url, str(raw_filename), progress_callback=print_download_progress)
+        print(f"Downloaded to: {downloaded_file}")
+        
+        # Step 2: Transform to .wav in inputs/wav (optional, the MP3 is decoded in memory otherwise)
+        if write_wav:
+            print("Converting MP3 to WAV...")
+            wav_filename = INPUTS_WAV_DIR / f"{output_filename}.wav"
+            wav_file = transform_mp3_to_wav(downloaded_file, str(wav_filename))
+            print(f"Converted to: {wav_file}")
+        else:
+            wav_file = downloaded_file
+        
+        # Step 3: Do transcription
+        print("Starting transcription...")
+        transcript_file = wav_to_transcript(wav_file, model_type, pyannote_token, output_filename,
+                                            execution_mode=execution_mode, output_format=output_format,
+                                            return_path=True, backend=backend,
+                                            whisper_workers=whisper_workers,
+                                            diarization_window_s=diarization_window or None,
+                                            diarization_workers=diarization_workers,
+                                            intermediate_format=intermediate_format)
+    print(f"Run report saved to: {write_run_report(run, transcript_file)}")
 
 
 @click.command()
@@ -88,13 +155,40 @@ def click_url_to_transcript(url, model_type, output_filename):
 @click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS), 
               default='large-v3-turbo', prompt='Provide the Whisper model',
               help='Defines the model type in Whisper')
+@click.option('--execution_mode', type=click.Choice(choices=EXECUTION_MODES),
+              default='sequential',
+              help='Run Whisper and speaker diarization one after the other or concurrently')
+@click.option('--backend', type=click.Choice(choices=ASR_BACKEND_NAMES),
+              default=DEFAULT_ASR_BACKEND,
+              help='Speech recognition implementation (faster-whisper runs int8 quantized on CPU)')
+@click.option('--whisper_workers', type=click.INT, default=1,
+              help='Split long recordings at silences and transcribe the chunks in this many processes')
+@click.option('--diarization_window', type=click.INT, default=0,
+              help='Diarize in overlapping windows of this many seconds to bound memory (0: whole file)')
+@click.option('--diarization_workers', type=click.INT, default=1,
+              help='Diarization windows processed at the same time')
+@click.option('--write_wav', is_flag=True, default=False,
+              help='Also convert the download to a WAV file in inputs/wav')
 @click.option('--skip_notion', is_flag=True, default=False,
               help='Skip uploading to Notion, just transcribe')
-def click_url_to_notion(audio_url, source_url, title, model_type, skip_notion):
+@click.option('--intermediate_format', type=click.Choice(choices=INTERMEDIATE_FORMATS),
+              default='parquet',
+              help='File format of the Whisper segments and speaker turns kept in data/intermediate')
+@click.option('--notion_upload_mode', type=click.Choice(choices=NOTION_UPLOAD_MODES),
+              default='single_page',
+              help='Append long transcripts to one Notion page or split them into several pages')
+def click_url_to_notion(audio_url, source_url, title, model_type, execution_mode, backend, whisper_workers,
+                        diarization_window, diarization_workers, write_wav, skip_notion,
+                        intermediate_format, notion_upload_mode):
     """
     Download audio from URL, transcribe it, and upload to Notion.
     This command handles the full workflow: download -> transcribe -> upload to Notion.
     """
+    from convscript.audio_utils import download_mp3, transform_mp3_to_wav, print_download_progress, audio_extension
+    from convscript.conversation_transcription import wav_to_transcript, warm_up_models
+    from convscript.model_pyannote import get_pyannote_access_token
+    from convscript.notion import upload_transcript_to_notion, safe_filename, get_today_date
+    from convscript.instrumentation import record_run, write_run_report
     
     print(f"\n🎯 Starting URL-to-Notion transcription workflow")
     print(f"📄 Title: '{title}'")
@@ -110,56 +204,69 @@ def click_url_to_notion(audio_url, source_url, title, model_type, skip_notion):
     
     dotenv_path = './.env'
     pyannote_token = get_pyannote_access_token(dotenv_path)
+    warm_up_models(model_type, pyannote_token, backend)
     
     # Ensure directories exist
-    INPUTS_RAW_DIR.mkdir(parents=True, exist_ok=True)
-    INPUTS_WAV_DIR.mkdir(parents=True, exist_ok=True)
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+    ensure_directories()
     
     try:
-        # Step 1: Download file to inputs/raw
-        print(f"\n📥 Step 1: Downloading audio file...")
-        raw_filename = INPUTS_RAW_DIR / f"{output_filename}.mp3"
-        downloaded_file = download_mp3(audio_url, str(raw_filename))
-        print(f"✅ Downloaded to: {downloaded_file}")
-        
-        # Step 2: Transform to .wav in inputs/wav
-        print(f"\n🔄 Step 2: Converting to WAV format...")
-        wav_filename = INPUTS_WAV_DIR / f"{output_filename}.wav"
-        wav_file = transform_mp3_to_wav(downloaded_file, str(wav_filename))
-        print(f"✅ Converted to: {wav_file}")
-        
-        # Step 3: Do transcription
-        print(f"\n📝 Step 3: Starting transcription...")
-        transcript_result = wav_to_transcript(wav_file, model_type, pyannote_token, output_filename)
-        
-        # Find the generated transcript file
-        transcript_file = OUTPUTS_DIR / f"{output_filename}.txt"
-        if not transcript_file.exists():
-            print(f"❌ Transcript file not found at: {transcript_file}")
-            return
-        
-        print(f"✅ Transcription completed: {transcript_file}")
-        
-        # Step 4: Upload to Notion (if not skipped)
-        if not skip_notion:
-            print(f"\n📤 Step 4: Uploading to Notion...")
-            today_date = get_today_date()
+        with record_run('url_to_notion', url=audio_url, model_type=model_type, backend=backend,
+                        execution_mode=execution_mode, notion_upload_mode=notion_upload_mode) as run:
+            # Step 1: Download file to inputs/raw
+            print(f"\n📥 Step 1: Downloading audio file...")
+            raw_filename = INPUTS_RAW_DIR / f"{output_filename}{audio_extension(audio_url)}"
+            downloaded_file = download_mp3(audio_url, str(raw_filename),
+                                           progress_callback=print_download_progress)
+            print(f"✅ Downloaded to: {downloaded_file}")
             
-            page_url = upload_transcript_to_notion(
-                file_path=str(transcript_file),
-                title=title,
-                date=today_date,
-                url=source_url
-            )
+            # Step 2: Transform to .wav in inputs/wav (optional, the MP3 is decoded in memory otherwise)
+            if write_wav:
+                print(f"\n🔄 Step 2: Converting to WAV format...")
+                wav_filename = INPUTS_WAV_DIR / f"{output_filename}.wav"
+                wav_file = transform_mp3_to_wav(downloaded_file, str(wav_filename))
+                print(f"✅ Converted to: {wav_file}")
+            else:
+                print(f"\n⏭️  Step 2: Skipping WAV conversion, decoding audio in memory")
+                wav_file = downloaded_file
+            
+            # Step 3: Do transcription
+            print(f"\n📝 Step 3: Starting transcription...")
+            transcript_file, text_speaker_df = wav_to_transcript(wav_file, model_type, pyannote_token,
+                                                                 output_filename, execution_mode=execution_mode,
+                                                                 return_path=True, return_df=True,
+                                                                 backend=backend, whisper_workers=whisper_workers,
+                                                                 diarization_window_s=diarization_window or None,
+                                                                 diarization_workers=diarization_workers,
+                                                                 intermediate_format=intermediate_format)
+            
+            if not transcript_file.exists():
+                print(f"❌ Transcript file not found at: {transcript_file}")
+                return
+            
+            print(f"✅ Transcription completed: {transcript_file}")
             
-            if page_url:
-                print(f"✅ Successfully uploaded to Notion!")
-                print(f"🔗 Notion page (Part I if multi-part): {page_url}")
+            # Step 4: Upload to Notion (if not skipped)
+            if not skip_notion:
+                print(f"\n📤 Step 4: Uploading to Notion...")
+                today_date = get_today_date()
+                
+                page_url = upload_transcript_to_notion(
+                    file_path=str(transcript_file),
+                    title=title,
+                    date=today_date,
+                    url=source_url,
+                    upload_mode=notion_upload_mode,
+                    text_speaker_df=text_speaker_df
+                )
+                
+                if page_url:
+                    print(f"✅ Successfully uploaded to Notion!")
+                    print(f"🔗 Notion page (Part I if multi-part): {page_url}")
+                else:
+                    print(f"❌ Failed to upload to Notion")
             else:
-                print(f"❌ Failed to upload to Notion")
-        else:
-            print(f"\n⏭️  Skipping Notion upload (--skip_notion flag used)")
+                print(f"\n⏭️  Skipping Notion upload (--skip_notion flag used)")
+        print(f"📊 Run report: {write_run_report(run, transcript_file)}")
         
         print(f"\n🎉 Workflow completed successfully!")
         print(f"📄 Title: '{title}'")
@@ -169,6 +276,183 @@ def click_url_to_notion(audio_url, source_url, title, model_type, skip_notion):
         print(f"❌ Error in workflow: {e}")
         raise
 
+@click.command()
+@click.option('--manifest', type=click.Path(exists=True),
+              prompt='Path to the manifest (CSV or JSONL with audio, title, source_url columns)')
+@click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS),
+              default='large-v3-turbo',
+              help='Defines the model type in Whisper')
+@click.option('--execution_mode', type=click.Choice(choices=EXECUTION_MODES),
+              default='sequential',
+              help='Run Whisper and speaker diarization one after the other or concurrently')
+@click.option('--backend', type=click.Choice(choices=ASR_BACKEND_NAMES),
+              default=DEFAULT_ASR_BACKEND,
+              help='Speech recognition implementation (faster-whisper runs int8 quantized on CPU)')
+@click.option('--download_workers', type=click.INT, default=2,
+              help='Number of parallel downloads/conversions')
+@click.option('--inference_workers', type=click.INT, default=1,
+              help='Number of inference worker processes, each loading the models once')
+@click.option('--output_format', type=click.Choice(choices=OUTPUT_FORMATS),
+              default='txt',
+              help='Transcript file format')
+@click.option('--write_wav', is_flag=True, default=False,
+              help='Also convert downloads to WAV files in inputs/wav')
+@click.option('--upload_to_notion', is_flag=True, default=False,
+              help='Upload every finished transcript to Notion')
+@click.option('--notion_upload_mode', type=click.Choice(choices=NOTION_UPLOAD_MODES),
+              default='single_page',
+              help='Append long transcripts to one Notion page or split them into several pages')
+@click.option('--state_file', type=click.Path(), default=None,
+              help='Progress file used to resume the batch (default: <manifest>.state.json)')
+def click_batch(manifest, model_type, execution_mode, backend, download_workers, inference_workers,
+                output_format, write_wav, upload_to_notion, notion_upload_mode, state_file):
+    """
+    Transcribe all episodes listed in a manifest file.
+    Re-running the same command resumes an interrupted batch.
+    """
+    from convscript.batch import run_batch
+    from convscript.model_pyannote import get_pyannote_access_token
+    
+    if upload_to_notion and output_format != 'txt':
+        raise click.BadParameter('Notion upload requires --output_format txt')
+    
+    dotenv_path = './.env'
+    pyannote_token = get_pyannote_access_token(dotenv_path)
+    
+    run_batch(manifest, model_type, pyannote_token,
+              n_download_workers=download_workers,
+              n_inference_workers=inference_workers,
+              execution_mode=execution_mode,
+              backend=backend,
+              output_format=output_format,
+              upload_to_notion=upload_to_notion,
+              notion_upload_mode=notion_upload_mode,
+              write_wav=write_wav,
+              state_path=state_file,
+              raw_dir=INPUTS_RAW_DIR,
+              wav_dir=INPUTS_WAV_DIR)
+
+@click.group()
+def cache():
+    """Inspect and prune the cache of Whisper and pyannote results."""
+    pass
+
+@cache.command('info')
+def cache_info():
+    """List cached inference results, least recently used first."""
+    from convscript.result_cache import ResultCache
+    
+    result_cache = ResultCache()
+    entries = result_cache.entries()
+    
+    print(f"Cache directory: {result_cache.cache_dir}")
+    for entry in entries:
+        params = {k: v for k, v in entry.items()
+                  if k not in ('key', 'stage', 'created', 'n_rows', 'size_bytes', 'last_used')}
+        last_used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M')
+        print(f"  {entry['key'][:12]}  {entry.get('stage', '?'):<9} {entry.get('n_rows', '?'):>6} rows  "
+              f"{entry['size_bytes'] / 1e6:8.2f} MB  last used {last_used}  {params}")
+    
+    total_mb = sum(entry['size_bytes'] for entry in entries) / 1e6
+    print(f"{len(entries)} entries, {total_mb:.2f} MB (limit {result_cache.max_size_bytes / 1e6:.0f} MB)")
+
+@cache.command('prune')
+@click.option('--max_mb', type=click.FLOAT, default=None,
+              help='Evict least recently used entries until the cache is below this size '
+                   '(default: CONVSCRIPT_RESULT_CACHE_MB or 2048)')
+def cache_prune(max_mb):
+    """Evict least recently used results down to a size limit."""
+    from convscript.result_cache import ResultCache
+    
+    n_removed = ResultCache().prune(int(max_mb * 1024 ** 2) if max_mb is not None else None)
+    print(f"Removed {n_removed} cache entries")
+
+@cache.command('clear')
+@click.confirmation_option(prompt='Remove all cached inference results?')
+def cache_clear():
+    """Remove all cached results."""
+    from convscript.result_cache import ResultCache
+    
+    n_removed = ResultCache().clear()
+    print(f"Removed {n_removed} cache entries")
+
+@click.command()
+@click.option('--wav_fname', type=click.Path(exists=True),
+              prompt='Path to a local audio sample')
+@click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS),
+              default='base',
+              help='Defines the model type in Whisper')
+@click.option('--backends', type=click.STRING, default=','.join(ASR_BACKEND_NAMES),
+              help='Comma-separated backends to compare; the first one is the WER reference')
+def click_benchmark_backends(wav_fname, model_type, backends):
+    """
+    Compare speech recognition backends on a local sample: model load time,
+    realtime factor and word error rate against the first backend.
+    """
+    from convscript.asr_backends import benchmark_backends
+    from convscript.audio_utils import load_audio, SAMPLE_RATE
+    
+    backends = [backend.strip() for backend in backends.split(',') if backend.strip()]
+    for backend in backends:
+        if backend not in ASR_BACKEND_NAMES:
+            raise click.BadParameter(f"Unknown backend '{backend}', use any of {ASR_BACKEND_NAMES}")
+    
+    audio = load_audio(wav_fname)
+    print(f"🎵 {wav_fname}: {len(audio) / SAMPLE_RATE:.1f}s of audio, model {model_type}")
+    
+    results = benchmark_backends(audio, model_type, backends, sample_rate=SAMPLE_RATE)
+    
+    print(f"\n{'backend':<16} {'load':>8} {'transcribe':>11} {'RTF':>7} {'segments':>9} {'WER vs ' + backends[0]:>24}")
+    for result in results:
+        print(f"{result['backend']:<16} {result['load_s']:>7.1f}s {result['transcribe_s']:>10.1f}s "
+              f"{result['rtf']:>7.3f} {result['n_segments']:>9d} {result['wer_vs_reference']:>24.1%}")
+
+@click.command()
+@click.option('--model_type', type=click.Choice(choices=WHISPER_MODELS),
+              default='base',
+              help='Defines the model type in Whisper (small models keep up with realtime more easily)')
+@click.option('--backend', type=click.Choice(choices=ASR_BACKEND_NAMES),
+              default=DEFAULT_ASR_BACKEND,
+              help='Speech recognition implementation')
+@click.option('--duration', type=click.FLOAT, default=0,
+              help='Stop recording after this many seconds (0: until Ctrl+C)')
+@click.option('--wav_input', type=click.Path(exists=True), default=None,
+              help='Replay a 16-bit WAV file at recording speed instead of using the microphone')
+@click.option('--window', type=click.FLOAT, default=30,
+              help='Seconds of pending audio after which segments become final')
+@click.option('--step', type=click.FLOAT, default=5,
+              help='Transcribe again after this many seconds of new audio')
+@click.option('--diarize_every', type=click.FLOAT, default=0,
+              help='Also diarize the recording so far at this interval in seconds (0: only at the end)')
+@click.option('--output_filename', type=click.STRING,
+              default=lambda: f"live_{datetime.now():%Y%m%d_%H%M%S}",
+              help='Name of the recording and transcript files')
+def click_live(model_type, backend, duration, wav_input, window, step, diarize_every, output_filename):
+    """
+    Transcribe from the microphone while recording. Partial segments are
+    printed as they are transcribed (marked with ~) and become final once
+    enough audio follows them; speakers are assigned when the recording ends.
+    """
+    from convscript.conversation_transcription import warm_up_models
+    from convscript.live_transcription import live_transcript, PyAudioSource, WavFileSource
+    from convscript.model_pyannote import get_pyannote_access_token
+    
+    dotenv_path = './.env'
+    pyannote_token = get_pyannote_access_token(dotenv_path)
+    warm_up_models(model_type, pyannote_token, backend)
+    ensure_directories()
+    
+    source = WavFileSource(wav_input, realtime=True) if wav_input else PyAudioSource()
+    print("🎙️  Recording, press Ctrl+C to stop" if not duration else f"🎙️  Recording for {duration:.0f}s")
+    
+    live_transcript(source, INPUTS_WAV_DIR / f"{output_filename}.wav", model_type, pyannote_token,
+                    output_filename, max_seconds=duration or None, backend=backend,
+                    window_s=window, step_s=step, diarize_every_s=diarize_every or None)
+
+transcribe.add_command(cache)
+transcribe.add_command(click_benchmark_backends)
+transcribe.add_command(click_batch)
+transcribe.add_command(click_live)
 transcribe.add_command(click_url_to_notion)
 transcribe.add_command(click_url_to_transcript)
 transcribe.add_command(click_wav_to_transcript)
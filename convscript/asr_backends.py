@@ -0,0 +1,182 @@
+"""
+Speech recognition backends behind a common interface.
+
+A backend loads a model (through the process-wide model cache) and turns a
+file path or 16 kHz float32 samples into a Whisper-style segment table
+(see convscript.segments), so everything downstream of transcription is
+independent of the backend:
+
+    openai-whisper           the reference implementation (PyTorch)
+    openai-whisper-batched   the same model in a long-lived worker that decodes
+                             30-second windows of concurrently submitted files
+                             in batches (see convscript.batched_whisper)
+    faster-whisper           CTranslate2 re-implementation, int8 quantized on CPU
+
+Backend libraries (and pandas) are imported when a model is loaded, so only
+the ones in use need to be installed and the backend names are cheap to import.
+"""
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from convscript.model_cache import resolve_device
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_ASR_BACKEND = 'openai-whisper'
+
+
+class ASRBackend:
+    """Interface of a speech recognition backend."""
+
+    name = None
+
+    def load(self, model_type: str, device: Optional[str] = None):
+        """Load (or get the cached) model."""
+        raise NotImplementedError
+
+    def transcribe(self, audio, model_type: str, device: Optional[str] = None) -> 'pd.DataFrame':
+        """Transcribe a file path or decoded samples to a segment table indexed by id."""
+        raise NotImplementedError
+
+    def cache_params(self, device: Optional[str] = None) -> Dict[str, Any]:
+        """Settings besides the model type that change the result, for result cache keys."""
+        return {'backend': self.name}
+
+
+class OpenAIWhisperBackend(ASRBackend):
+
+    name = 'openai-whisper'
+
+    def load(self, model_type, device=None):
+        from convscript.model_whisper import load_whisper_model
+        return load_whisper_model(model_type, device=device)
+
+    def transcribe(self, audio, model_type, device=None):
+        from convscript.model_whisper import whisper_inference_with_segments_df
+        return whisper_inference_with_segments_df(audio, model_type=model_type)
+
+    def cache_params(self, device=None):
+        # keeps the cache keys of results computed before backends existed
+        return {}
+
+
+class OpenAIWhisperBatchedBackend(ASRBackend):
+
+    name = 'openai-whisper-batched'
+
+    def load(self, model_type, device=None):
+        from convscript.batched_whisper import get_batch_worker
+        return get_batch_worker(model_type, device=device)
+
+    def transcribe(self, audio, model_type, device=None):
+        from convscript.audio_utils import load_audio
+        if isinstance(audio, (str, os.PathLike)):
+            audio = load_audio(audio)
+        return self.load(model_type, device).transcribe(audio)
+
+
+class FasterWhisperBackend(ASRBackend):
+
+    name = 'faster-whisper'
+
+    def __init__(self, compute_type: Optional[str] = None):
+        self.compute_type = compute_type
+
+    def _compute_type(self, device):
+        from convscript.model_faster_whisper import default_compute_type
+        return self.compute_type or default_compute_type(resolve_device(device))
+
+    def load(self, model_type, device=None):
+        from convscript.model_faster_whisper import load_faster_whisper_model
+        return load_faster_whisper_model(model_type, device=device, compute_type=self._compute_type(device))
+
+    def transcribe(self, audio, model_type, device=None):
+        from convscript.model_faster_whisper import faster_whisper_inference_with_segments_df
+        return faster_whisper_inference_with_segments_df(audio, model_type=model_type, device=device,
+                                                         compute_type=self._compute_type(device))
+
+    def cache_params(self, device=None):
+        return {'backend': self.name, 'compute_type': self._compute_type(device)}
+
+
+ASR_BACKENDS: Dict[str, ASRBackend] = {
+    'openai-whisper': OpenAIWhisperBackend(),
+    'openai-whisper-batched': OpenAIWhisperBatchedBackend(),
+    'faster-whisper': FasterWhisperBackend(),
+}
+
+ASR_BACKEND_NAMES = list(ASR_BACKENDS.keys())
+
+
+def get_asr_backend(backend: str = DEFAULT_ASR_BACKEND) -> ASRBackend:
+    if backend not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{backend}', expected one of {ASR_BACKEND_NAMES}")
+    return ASR_BACKENDS[backend]
+
+
+def transcribe_with_backend(audio, model_type: str, backend: str = DEFAULT_ASR_BACKEND) -> 'pd.DataFrame':
+    """Transcribe a file path or decoded samples with the given backend."""
+    return get_asr_backend(backend).transcribe(audio, model_type)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level edit distance between two transcripts, relative to the reference
+    length. Case and punctuation are ignored.
+    """
+    def words(text):
+        return ''.join(c.lower() if c.isalnum() or c.isspace() else ' ' for c in text).split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return float(len(hyp) > 0)
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1,
+                             current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+
+    return previous[-1] / len(ref)
+
+
+def benchmark_backends(audio, model_type: str, backends: Sequence[str] = ASR_BACKEND_NAMES,
+                       sample_rate: int = 16000) -> List[Dict[str, Any]]:
+    """
+    Transcribe the same decoded audio with several backends.
+
+    Reports the model load time, the realtime factor (transcription seconds per
+    audio second, lower is faster) and, as a proxy for accuracy, the word error
+    rate against the first backend's transcript.
+    """
+    duration = len(audio) / sample_rate
+
+    results = []
+    for backend in backends:
+        asr = get_asr_backend(backend)
+
+        load_start = time.time()
+        asr.load(model_type)
+        load_time = time.time() - load_start
+
+        transcribe_start = time.time()
+        seg_df = asr.transcribe(audio, model_type)
+        transcribe_time = time.time() - transcribe_start
+
+        results.append({'backend': backend,
+                        'load_s': load_time,
+                        'transcribe_s': transcribe_time,
+                        'rtf': transcribe_time / duration if duration else float('nan'),
+                        'n_segments': len(seg_df),
+                        'text': ''.join(seg_df['text'].astype(str))})
+
+    reference = results[0]['text'] if results else ''
+    for result in results:
+        result['wer_vs_reference'] = word_error_rate(reference, result['text'])
+
+    return results
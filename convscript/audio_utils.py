@@ -1,9 +1,34 @@
 # %%
+import os
+import re
+import subprocess
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
-from pydub import AudioSegment
+import numpy as np
+from urllib.parse import urlparse
+
+from convscript.instrumentation import span, timed, current_span, file_size
+
+# Whisper and pyannote both work on 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# containers ffmpeg decodes (the codec is probed from the content, the extension only names files)
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.mp4', '.aac', '.ogg', '.oga', '.opus', '.flac', '.webm')
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = (10, 60)  # connect, read (seconds)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
 
 def record_to_wav(RECORD_SECONDS, WAVE_OUTPUT_FILENAME):
+    """Record a fixed duration from the microphone (see convscript.live_transcription to transcribe while recording)"""
+    import pyaudio
+    import wave
 
     CHUNK = 1024
     FORMAT = pyaudio.paInt16
@@ -41,55 +66,270 @@ def record_to_wav(RECORD_SECONDS, WAVE_OUTPUT_FILENAME):
     wf.close()
 
 
-def download_mp3(audio_url, fname=None):
+class IncompleteDownloadError(IOError):
+    """Raised when fewer bytes than announced by the server were received"""
+
+def get_http_session():
+    """Shared requests session, so repeated downloads reuse pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+    return _session
+
+def print_download_progress(n_bytes, total_bytes, bytes_per_second):
+    """Progress callback printing downloaded megabytes and throughput"""
+    total_str = f"/{total_bytes / 1e6:.1f}" if total_bytes else ""
+    print(f"\r  {n_bytes / 1e6:.1f}{total_str} MB ({bytes_per_second / 1e6:.1f} MB/s)", end="", flush=True)
+    if total_bytes and n_bytes >= total_bytes:
+        print()
+
+def _total_size(response, offset):
+    content_range = response.headers.get('Content-Range')
+    if content_range:
+        match = re.match(r'bytes \d+-\d+/(\d+)', content_range)
+        if match:
+            return int(match.group(1))
+    content_length = response.headers.get('Content-Length')
+    if content_length is not None:
+        return offset + int(content_length)
+    return None
+
+@timed('download')
+def download_file(url, fname, chunk_size=DOWNLOAD_CHUNK_SIZE, max_retries=5, backoff_factor=1.0,
+                  timeout=DOWNLOAD_TIMEOUT, progress_callback=None, session=None):
+    """
+    Stream a URL to disk in chunks, resuming partial downloads.
+    
+    Data is written to `<fname>.part`. After a dropped connection, timeout or
+    5xx/429 response the download is retried with exponential backoff,
+    continuing from the bytes already on disk via an HTTP Range request.
+    `If-Range` with the server's ETag makes sure a changed file is downloaded
+    from scratch instead of being stitched together. The final size is
+    checked against Content-Length/Content-Range before the part file is
+    renamed to `fname`.
+    
+    Args:
+        progress_callback: Called as callback(bytes_downloaded, total_bytes, bytes_per_second)
+        
+    Returns:
+        fname
+    """
+    session = session or get_http_session()
+    part_fname = f"{fname}.part"
+    etag_fname = f"{fname}.part.etag"
+    
+    for attempt in range(max_retries + 1):
+        offset = os.path.getsize(part_fname) if os.path.exists(part_fname) else 0
+        headers = {}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if os.path.exists(etag_fname):
+                with open(etag_fname, 'r') as f:
+                    headers['If-Range'] = f.read().strip()
+        
+        try:
+            with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                
+                if response.status_code == 416:
+                    # requested range starts at or after the end of the file
+                    total = _total_size(response, 0)
+                    if total is not None and offset == total:
+                        break
+                    os.remove(part_fname)
+                    raise IncompleteDownloadError(f"Partial file does not match '{url}', restarting")
+                
+                if response.status_code in RETRY_STATUS_CODES:
+                    raise requests.HTTPError(f"{response.status_code} from server", response=response)
+                response.raise_for_status()
+                
+                if response.status_code != 206:
+                    offset = 0  # server ignored the range or file changed
+                total = _total_size(response, offset)
+                
+                etag = response.headers.get('ETag')
+                if etag:
+                    with open(etag_fname, 'w') as f:
+                        f.write(etag)
+                
+                n_bytes = offset
+                start_time = time.time()
+                with open(part_fname, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        n_bytes += len(chunk)
+                        if progress_callback:
+                            elapsed = max(time.time() - start_time, 1e-6)
+                            progress_callback(n_bytes, total, (n_bytes - offset) / elapsed)
+                
+                if total is not None and n_bytes != total:
+                    raise IncompleteDownloadError(f"Received {n_bytes} of {total} bytes")
+            break
+        
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                IncompleteDownloadError, requests.HTTPError) as e:
+            is_retryable = not isinstance(e, requests.HTTPError) or \
+                (e.response is not None and e.response.status_code in RETRY_STATUS_CODES)
+            if not is_retryable or attempt == max_retries:
+                raise
+            
+            retry_after = None
+            if isinstance(e, requests.HTTPError) and e.response is not None:
+                retry_after = e.response.headers.get('Retry-After')
+            wait = float(retry_after) if retry_after and retry_after.isdigit() else backoff_factor * 2 ** attempt
+            print(f"Download interrupted ({e}), retrying in {wait:.1f}s")
+            time.sleep(wait)
+    
+    os.replace(part_fname, fname)
+    if os.path.exists(etag_fname):
+        os.remove(etag_fname)
+    
+    current_span().set(attempts=attempt + 1)
+    current_span().add_bytes(file_size(fname))
+    
+    return fname
 
-    # download
-    doc = requests.get(audio_url)
+def audio_extension(url_or_fname, default='.mp3'):
+    """Audio file extension of a URL or path (ignoring query strings), or `default` if there is none"""
+    path = urlparse(str(url_or_fname)).path if '://' in str(url_or_fname) else str(url_or_fname)
+    extension = os.path.splitext(path)[1].lower()
+    
+    return extension if extension in AUDIO_EXTENSIONS else default
 
+def download_mp3(audio_url, fname=None, **download_kwargs):
+    """Download an audio file (to a temp file if no fname is given), see download_file"""
+    
     if fname:
         this_temp_file_name = fname
-        with open(fname, 'wb') as f:
-            f.write(doc.content)
-
+    
     else:
-        # create temp file
-        temp_file = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
-        this_temp_file_name = temp_file.name
-
-        # write to file
-        temp_file.write(doc.content)
-
-    return this_temp_file_name
+        # create temp file, keeping the extension of m4a/ogg/opus/... downloads
+        temp_fd, this_temp_file_name = tempfile.mkstemp(suffix=audio_extension(audio_url))
+        os.close(temp_fd)
+    
+    return download_file(audio_url, this_temp_file_name, **download_kwargs)
+
+def _ffmpeg_command(fname, start_s=None, duration_s=None, sr=SAMPLE_RATE):
+    """
+    ffmpeg arguments decoding `fname` to mono audio at `sr` Hz. The seek
+    options come before the input, so ffmpeg skips to `start_s` in the
+    container instead of decoding everything before it.
+    """
+    cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-threads', '0']
+    if start_s:
+        cmd += ['-ss', f'{start_s:.3f}']
+    if duration_s is not None:
+        cmd += ['-t', f'{duration_s:.3f}']
+    
+    return cmd + ['-i', str(fname), '-vn', '-ac', '1', '-ar', str(sr)]
+
+def _run_ffmpeg(cmd, fname):
+    """Run ffmpeg and return its stdout"""
+    try:
+        return subprocess.run(cmd, capture_output=True, check=True).stdout
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg is not installed") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio '{fname}': {e.stderr.decode(errors='ignore')}") from e
+
+def convert_audio(fname, output_fname=None, start_s=None, duration_s=None, sr=SAMPLE_RATE):
+    """
+    Convert any audio file ffmpeg reads (mp3, m4a, ogg, opus, ...) to a 16-bit
+    PCM WAV file at `sr` Hz mono, optionally only `duration_s` seconds from
+    `start_s` on.
+    
+    ffmpeg streams from the input to the output, the samples never pass
+    through Python. With `output_fname='-'` the WAV file is returned as bytes
+    (ffmpeg writes to a pipe), without `output_fname` it is written to a
+    temp file. The output may be the input file itself.
+    
+    Returns the output path (or the WAV bytes).
+    """
+    cmd = _ffmpeg_command(fname, start_s, duration_s, sr) + ['-acodec', 'pcm_s16le', '-f', 'wav']
+    
+    if output_fname == '-':
+        with span('convert', start_s=start_s, duration_s=duration_s) as convert_span:
+            wav_bytes = _run_ffmpeg(cmd + ['-'], fname)
+            convert_span.add_bytes(len(wav_bytes))
+        return wav_bytes
+    
+    if not output_fname:
+        temp_fd, output_fname = tempfile.mkstemp(suffix='.wav')
+        os.close(temp_fd)
+    
+    # ffmpeg cannot overwrite its own input, write next to it and replace
+    in_place = os.path.exists(output_fname) and os.path.samefile(fname, output_fname)
+    target = f"{output_fname}.tmp.wav" if in_place else str(output_fname)
+    with span('convert', start_s=start_s, duration_s=duration_s) as convert_span:
+        _run_ffmpeg(cmd + ['-y', target], fname)
+        convert_span.add_bytes(file_size(target))
+    if in_place:
+        os.replace(target, output_fname)
+    
+    return output_fname
 
 def transform_mp3_to_wav(mp3_fname, output_fname=None):
-        
-    sound = AudioSegment.from_mp3(mp3_fname) # load source
-
-    if output_fname:
-        this_temp_file_name = output_fname
-        sound.export(output_fname, format="wav")
-
-    else:
-        # create temp file
-        temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        this_temp_file_name = temp_file.name
-
-        sound.export(this_temp_file_name, format="wav")
-
-    return this_temp_file_name
+    """Convert an mp3 (or m4a/ogg/opus/...) file to a 16 kHz mono WAV file, see convert_audio"""
+    
+    return convert_audio(mp3_fname, output_fname)
 
 def crop_wav(fname, output_fname, start_frame=0, n_frames=60000):
+    """
+    Cut an excerpt of `n_frames` milliseconds from `start_frame` milliseconds on
+    (60000 equals 60 seconds) to a 16 kHz mono WAV file. ffmpeg seeks to the
+    start, so only the excerpt is decoded.
+    """
     
-    sound = AudioSegment.from_wav(fname)
+    return convert_audio(fname, output_fname, start_s=start_frame / 1000, duration_s=n_frames / 1000)
 
-    sound = sound.set_channels(1) # mono
-    sound = sound.set_frame_rate(16000) # 16000Hz
+@timed('decode')
+def load_audio(fname, sr=SAMPLE_RATE, mmap_path=None, start_s=None, duration_s=None):
+    """
+    Decode an audio file once into a mono float32 array at `sr` Hz.
+    
+    The result can be passed directly to Whisper (`transcribe` accepts arrays)
+    and to pyannote (see `model_pyannote.waveform_input`). Any format ffmpeg
+    understands works (wav, mp3, m4a, ogg, opus, ...). With `start_s` and
+    `duration_s` only that part is decoded.
+    
+    If `mmap_path` is given, ffmpeg writes the raw samples to that file and a
+    read-only memory map of it is returned, so the decoded audio is not held
+    in process memory.
+    """
+    cmd = _ffmpeg_command(fname, start_s, duration_s, sr) + ['-f', 'f32le', '-acodec', 'pcm_f32le']
+    
+    current_span().set(mmap=bool(mmap_path))
+    
+    if mmap_path:
+        _run_ffmpeg(cmd + ['-y', str(mmap_path)], fname)
+        if os.path.getsize(mmap_path) == 0:
+            return np.zeros(0, dtype=np.float32)
+        audio = np.memmap(mmap_path, dtype=np.float32, mode='r')
+    else:
+        audio = np.frombuffer(_run_ffmpeg(cmd + ['-'], fname), dtype=np.float32)
+    current_span().add_bytes(audio.nbytes)
+    
+    return audio
 
-    # Extract the first frames (60000 equals 60 seconds)
-    excerpt = sound[start_frame:(start_frame + n_frames)]
+def audio_duration(audio, sr=SAMPLE_RATE):
+    """Duration in seconds of a decoded audio array"""
+    return len(audio) / float(sr)
 
-    # write to disk
-    excerpt.export(output_fname, format="wav")
+def write_wav(audio, output_fname, sr=SAMPLE_RATE):
+    """Write a decoded float32 array as a 16-bit PCM WAV file"""
+    import wave
+    
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(str(output_fname), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(pcm.tobytes())
+    
+    return output_fname
 
 
 # %%
@@ -0,0 +1,288 @@
+"""
+Batch transcription of many episodes from a manifest file.
+
+A manifest is a CSV or JSONL file with one episode per row:
+
+    audio        URL or local path of the audio file (also: audio_url, audio_path)
+    title        Title for the transcript and Notion page (optional)
+    source_url   Page the episode was found on (optional)
+
+Downloads run in a thread pool that is separate from the inference workers,
+so the next episodes are fetched while the current one is transcribed.
+Inference workers load the models once and keep them for all their jobs.
+Progress is written to a JSON state file after every step, so an
+interrupted batch continues where it stopped when started again.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from convscript.audio_utils import download_mp3, transform_mp3_to_wav, audio_extension
+from convscript.path import ProjPaths
+
+AUDIO_COLUMNS = ['audio', 'audio_url', 'audio_path']
+
+STATUS_PENDING = 'pending'
+STATUS_DOWNLOADED = 'downloaded'
+STATUS_TRANSCRIBED = 'transcribed'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def _is_url(audio: str) -> bool:
+    return audio.startswith('http://') or audio.startswith('https://')
+
+
+def load_manifest(manifest_path, model_type: str = 'base') -> List[Dict[str, Any]]:
+    """
+    Read a CSV or JSONL manifest into a list of jobs.
+
+    Every job gets a unique `job_id` (also used as output filename) derived
+    from its title, or from the audio file name if there is no title.
+    """
+    from convscript.notion import safe_filename
+
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if manifest_path.suffix.lower() in ('.jsonl', '.json'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    seen_ids = set()
+    for line_number, row in enumerate(rows, 1):
+        audio = next((row[col] for col in AUDIO_COLUMNS if row.get(col)), None)
+        if not audio:
+            raise ValueError(f"Manifest row {line_number} has no audio column ({', '.join(AUDIO_COLUMNS)})")
+
+        title = row.get('title') or Path(audio.split('?')[0]).stem
+        job_id = row.get('output_filename') or f"{safe_filename(title)}_{model_type}"
+        base_id, counter = job_id, 2
+        while job_id in seen_ids:
+            job_id = f"{base_id}_{counter}"
+            counter += 1
+        seen_ids.add(job_id)
+
+        jobs.append({'job_id': job_id,
+                     'audio': audio,
+                     'title': title,
+                     'source_url': row.get('source_url') or None})
+
+    return jobs
+
+
+class BatchState:
+    """Per-job progress, persisted as JSON after every update."""
+
+    def __init__(self, state_path):
+        self.state_path = Path(state_path)
+        self._lock = threading.Lock()
+        self.jobs = {}
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        return self.jobs.get(job_id, {'status': STATUS_PENDING})
+
+    def status(self, job_id: str) -> str:
+        return self.get(job_id)['status']
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            record = dict(self.get(job_id))
+            record.update(fields)
+            record['updated'] = time.time()
+            self.jobs[job_id] = record
+
+            tmp_path = self.state_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.jobs, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def summary(self) -> Dict[str, int]:
+        counts = {}
+        for record in self.jobs.values():
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+        return counts
+
+
+def prepare_audio(job: Dict[str, Any], raw_dir: Path, wav_dir: Optional[Path] = None) -> str:
+    """Download a job's audio (resuming partial downloads) and optionally convert it to WAV."""
+    audio = job['audio']
+
+    if _is_url(audio):
+        raw_fname = Path(raw_dir) / f"{job['job_id']}{audio_extension(audio)}"
+        if not raw_fname.exists():
+            download_mp3(audio, str(raw_fname))
+        audio_file = str(raw_fname)
+    else:
+        if not os.path.exists(audio):
+            raise FileNotFoundError(f"Audio file '{audio}' does not exist")
+        audio_file = audio
+
+    if wav_dir is not None and not audio_file.endswith('.wav'):
+        audio_file = transform_mp3_to_wav(audio_file, str(Path(wav_dir) / f"{job['job_id']}.wav"))
+
+    return audio_file
+
+
+def _init_inference_worker(model_type: str, pyannote_token: str, n_threads: Optional[int],
+                           backend: str = 'openai-whisper'):
+    """Runs once per inference worker process: set thread count, load models."""
+    if n_threads:
+        try:
+            import torch
+            torch.set_num_threads(n_threads)
+        except ImportError:
+            pass
+
+    from convscript.conversation_transcription import warm_up_models
+    warm_up_models(model_type, pyannote_token, backend)
+
+
+def transcribe_job(audio_file: str, model_type: str, pyannote_token: str, output_filename: str,
+                   execution_mode: str = 'sequential', output_format: str = 'txt',
+                   backend: str = 'openai-whisper') -> str:
+    """Transcribe one job's audio, returning the transcript path."""
+    from convscript.conversation_transcription import wav_to_transcript
+
+    transcript_file = wav_to_transcript(audio_file, model_type, pyannote_token, output_filename,
+                                        execution_mode=execution_mode, output_format=output_format,
+                                        return_path=True, backend=backend)
+    return str(transcript_file)
+
+
+def upload_job(job: Dict[str, Any], transcript_file: str, upload_mode: str = 'single_page') -> Optional[str]:
+    """Upload a transcript to Notion, returning the page URL."""
+    from convscript.notion import upload_transcript_to_notion, get_today_date
+
+    return upload_transcript_to_notion(file_path=transcript_file, title=job['title'],
+                                       date=get_today_date(), url=job['source_url'],
+                                       upload_mode=upload_mode)
+
+
+def run_batch(manifest_path, model_type: str, pyannote_token: str,
+              n_download_workers: int = 2, n_inference_workers: int = 1,
+              execution_mode: str = 'sequential', backend: str = 'openai-whisper', output_format: str = 'txt',
+              upload_to_notion: bool = False, notion_upload_mode: str = 'single_page', write_wav: bool = False,
+              state_path=None, raw_dir=None, wav_dir=None, retry_failed: bool = True) -> Dict[str, int]:
+    """
+    Transcribe all jobs of a manifest.
+
+    Args:
+        n_download_workers: Threads downloading/converting audio ahead of inference
+        n_inference_workers: Inference workers. With 1, inference runs in a thread of
+            this process (sharing its model cache); with more, each worker is a separate
+            process that loads the models once and gets an equal share of the CPU cores.
+            With the 'openai-whisper-batched' backend the workers are threads of this
+            process whose Whisper windows are decoded together by one batch worker.
+        notion_upload_mode: 'single_page' or 'multi_page' for long transcripts
+        state_path: Progress file, defaults to '<manifest>.state.json'
+        retry_failed: Also rerun jobs that failed in an earlier run
+
+    Returns:
+        Number of jobs per final status
+    """
+    ProjPaths.create_directories()
+    raw_dir = Path(raw_dir) if raw_dir else ProjPaths.inputs_path / 'raw'
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    if write_wav:
+        wav_dir = Path(wav_dir) if wav_dir else ProjPaths.inputs_path / 'wav'
+        wav_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        wav_dir = None
+
+    jobs = load_manifest(manifest_path, model_type=model_type)
+    state = BatchState(state_path or f"{manifest_path}.state.json")
+
+    skip_statuses = {STATUS_DONE} if retry_failed else {STATUS_DONE, STATUS_FAILED}
+    jobs = [job for job in jobs if state.status(job['job_id']) not in skip_statuses]
+    print(f"📋 {len(jobs)} jobs to process ({state.summary()} from earlier runs)")
+
+    if n_inference_workers > 1 and backend == 'openai-whisper-batched':
+        _init_inference_worker(model_type, pyannote_token, None, backend)
+        inference_pool = ThreadPoolExecutor(max_workers=n_inference_workers)
+    elif n_inference_workers > 1:
+        n_threads = max(1, (os.cpu_count() or 1) // n_inference_workers)
+        inference_pool = ProcessPoolExecutor(max_workers=n_inference_workers,
+                                             mp_context=get_context('spawn'),
+                                             initializer=_init_inference_worker,
+                                             initargs=(model_type, pyannote_token, n_threads, backend))
+    else:
+        _init_inference_worker(model_type, pyannote_token, None, backend)
+        inference_pool = ThreadPoolExecutor(max_workers=1)
+
+    def finish(job, transcript_file):
+        if upload_to_notion:
+            page_url = upload_job(job, transcript_file, notion_upload_mode)
+            if not page_url:
+                raise RuntimeError("Notion upload failed")
+            state.update(job['job_id'], status=STATUS_DONE, notion_url=page_url)
+        else:
+            state.update(job['job_id'], status=STATUS_DONE)
+        print(f"✅ {job['job_id']}: done")
+
+    with ThreadPoolExecutor(max_workers=n_download_workers) as download_pool, inference_pool:
+
+        download_futures = {}
+        inference_futures = {}
+
+        for job in jobs:
+            record = state.get(job['job_id'])
+            transcript_file = record.get('transcript_file')
+
+            upload_pending = record['status'] == STATUS_TRANSCRIBED or \
+                (record['status'] == STATUS_FAILED and record.get('stage') == 'upload')
+            if upload_pending and transcript_file and os.path.exists(transcript_file):
+                # only the upload is missing
+                try:
+                    finish(job, transcript_file)
+                except Exception as e:
+                    print(f"❌ {job['job_id']}: upload failed: {e}")
+                    state.update(job['job_id'], status=STATUS_FAILED, stage='upload', error=str(e))
+                continue
+
+            download_futures[download_pool.submit(prepare_audio, job, raw_dir, wav_dir)] = job
+
+        for future in as_completed(download_futures):
+            job = download_futures[future]
+            try:
+                audio_file = future.result()
+            except Exception as e:
+                print(f"❌ {job['job_id']}: download failed: {e}")
+                state.update(job['job_id'], status=STATUS_FAILED, stage='download', error=str(e))
+                continue
+
+            state.update(job['job_id'], status=STATUS_DOWNLOADED, audio_file=audio_file)
+            inference_future = inference_pool.submit(transcribe_job, audio_file, model_type, pyannote_token,
+                                                     job['job_id'], execution_mode, output_format, backend)
+            inference_futures[inference_future] = job
+
+        for future in as_completed(inference_futures):
+            job = inference_futures[future]
+            try:
+                transcript_file = future.result()
+            except Exception as e:
+                print(f"❌ {job['job_id']}: transcription failed: {e}")
+                state.update(job['job_id'], status=STATUS_FAILED, stage='transcription', error=str(e))
+                continue
+
+            state.update(job['job_id'], status=STATUS_TRANSCRIBED, transcript_file=transcript_file)
+            try:
+                finish(job, transcript_file)
+            except Exception as e:
+                print(f"❌ {job['job_id']}: upload failed: {e}")
+                state.update(job['job_id'], status=STATUS_FAILED, stage='upload', error=str(e))
+
+    summary = state.summary()
+    print(f"\n🎉 Batch finished: {summary}")
+
+    return summary
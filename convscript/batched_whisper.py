@@ -0,0 +1,254 @@
+"""
+Batched Whisper decoding across files in a long-lived worker.
+
+`model.transcribe` decodes one 30-second window at a time. For many short
+recordings arriving together (voice memos, interview clips) the matrix
+kernels stay underused, so the worker here collects windows from all files
+submitted so far and decodes up to `batch_size` of them in one
+`whisper.decode` call:
+
+    worker = get_batch_worker('base')
+    futures = [worker.submit(audio) for audio in recordings]
+    seg_dfs = [future.result() for future in futures]
+
+Windows are cut at quiet points (at most 30 s each) and their log-mel
+spectrograms are computed in the submitting thread; the worker thread only
+runs the model. Segments come from Whisper's timestamp tokens, shifted to
+global times, and every file gets its own segment table in the same layout
+as whisper_segments_to_df.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from convscript.audio_utils import SAMPLE_RATE
+from convscript.chunked_whisper import find_split_points, split_audio
+from convscript.model_cache import resolve_device
+from convscript.segments import whisper_segments_to_df
+
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * SAMPLE_RATE
+TIMESTAMP_SECONDS = 0.02
+DEFAULT_BATCH_SIZE = 8
+
+# same thresholds as whisper.transcribe for skipping silent windows
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+_BATCH_WORKERS: Dict[Tuple, 'WhisperBatchWorker'] = {}
+_workers_lock = threading.Lock()
+
+
+def split_into_windows(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, np.ndarray]]:
+    """(start sample, samples) of windows of at most 30 seconds, cut at quiet points where possible."""
+    windows = []
+    for start, samples in split_audio(audio, find_split_points(audio, sample_rate, chunk_s=20, search_window_s=8)):
+        for offset in range(0, len(samples), WINDOW_SAMPLES):
+            windows.append((start + offset, samples[offset:offset + WINDOW_SAMPLES]))
+
+    return windows
+
+
+def segments_from_tokens(tokens: List[int], timestamp_begin: int, decode_text, offset_s: float,
+                         duration_s: float) -> List[Dict[str, Any]]:
+    """
+    Split a decoded window into segments at its timestamp tokens.
+
+    Whisper emits `<|start|> text <|end|>` pairs; text without a closing
+    timestamp runs to the end of the window, and a window without any
+    timestamps becomes a single segment.
+    """
+    segments = []
+    start = 0.0
+    text_tokens = []
+
+    for token in tokens:
+        if token >= timestamp_begin:
+            time = min((token - timestamp_begin) * TIMESTAMP_SECONDS, duration_s)
+            if text_tokens:
+                segments.append({'start': start, 'end': time, 'tokens': text_tokens})
+                text_tokens = []
+            start = time
+        else:
+            text_tokens.append(token)
+
+    if text_tokens:
+        segments.append({'start': start, 'end': duration_s, 'tokens': text_tokens})
+
+    for segment in segments:
+        segment['text'] = decode_text(segment['tokens'])
+        segment['start'] += offset_s
+        segment['end'] = max(segment['end'] + offset_s, segment['start'])
+
+    return segments
+
+
+class _FileRequest:
+    """The windows of one submitted file and their decoded segments."""
+
+    def __init__(self, n_windows: int):
+        self.future = Future()
+        self.segments = [None] * n_windows
+        self.n_pending = n_windows
+        self.lock = threading.Lock()
+
+    def window_done(self, window_index: int, segments: List[Dict[str, Any]]):
+        with self.lock:
+            self.segments[window_index] = segments
+            self.n_pending -= 1
+            finished = self.n_pending == 0
+
+        if finished and not self.future.done():
+            all_segments = [dict(segment, id=i)
+                            for i, segment in enumerate(s for window in self.segments for s in window)]
+            self.future.set_result(whisper_segments_to_df(all_segments))
+
+
+class WhisperBatchWorker:
+    """
+    Long-lived thread that owns a Whisper model and decodes windows from
+    several files in batches of up to `batch_size`.
+
+    After taking the first waiting window, the worker waits at most
+    `max_wait_s` for more before decoding a partial batch.
+    """
+
+    def __init__(self, model_type: str = 'base', device: Optional[str] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_wait_s: float = 0.05):
+        self.model_type = model_type
+        self.device = resolve_device(device)
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.model = self._load_model()
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'whisper-batch-{model_type}', daemon=True)
+        self._thread.start()
+
+    # model specific parts, overridden in tests
+
+    def _load_model(self):
+        from convscript.model_whisper import load_whisper_model
+        return load_whisper_model(self.model_type, device=self.device)
+
+    def _prepare(self, window: np.ndarray):
+        """Log-mel spectrogram of one window, padded to 30 seconds."""
+        import whisper
+        return whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(window, dtype=np.float32)),
+                                           n_mels=self.model.dims.n_mels, device=self.device)
+
+    def _decode(self, features: List[Any], offsets_s: List[float],
+                durations_s: List[float]) -> List[List[Dict[str, Any]]]:
+        """Decode a batch of windows, returning the segments of each."""
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+
+        options = whisper.DecodingOptions(task='transcribe', fp16=self.device == 'cuda')
+        results = whisper.decode(self.model, torch.stack(features), options)
+
+        windows = []
+        for result, offset_s, duration_s in zip(results, offsets_s, durations_s):
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                windows.append([])
+                continue
+
+            tokenizer = get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                      language=result.language, task='transcribe')
+            segments = segments_from_tokens(result.tokens, tokenizer.timestamp_begin, tokenizer.decode,
+                                            offset_s, duration_s)
+            for segment in segments:
+                segment.update(seek=int(round(offset_s * 100)),
+                               temperature=result.temperature,
+                               avg_logprob=result.avg_logprob,
+                               compression_ratio=result.compression_ratio,
+                               no_speech_prob=result.no_speech_prob)
+            windows.append(segments)
+
+        return windows
+
+    # batching
+
+    def submit(self, audio: np.ndarray) -> Future:
+        """
+        Queue the windows of one recording (16 kHz mono float32 samples).
+        The returned future resolves to its segment table.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("WhisperBatchWorker has been stopped")
+
+        windows = split_into_windows(audio)
+        request = _FileRequest(len(windows))
+        if not windows:
+            request.future.set_result(whisper_segments_to_df([]))
+            return request.future
+
+        for window_index, (start, samples) in enumerate(windows):
+            self._queue.put((request, window_index, self._prepare(samples),
+                             start / SAMPLE_RATE, len(samples) / SAMPLE_RATE))
+
+        return request.future
+
+    def transcribe(self, audio: np.ndarray) -> pd.DataFrame:
+        """Submit one recording and wait for its segment table."""
+        return self.submit(audio).result()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get(timeout=self.max_wait_s))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            batch = [item for item in batch if item is not None]
+
+            if batch:
+                requests, window_indices, features, offsets_s, durations_s = zip(*batch)
+                try:
+                    windows = self._decode(list(features), list(offsets_s), list(durations_s))
+                except Exception as e:
+                    for request in set(requests):
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                else:
+                    for request, window_index, segments in zip(requests, window_indices, windows):
+                        if not request.future.done():
+                            request.window_done(window_index, segments)
+
+            if stop:
+                return
+
+    def stop(self):
+        """Finish the queued windows, then end the worker thread."""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join()
+
+
+def get_batch_worker(model_type: str = 'base', device: Optional[str] = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> WhisperBatchWorker:
+    """The process-wide batch worker for a model, started on first use."""
+    key = (model_type, resolve_device(device), batch_size)
+    with _workers_lock:
+        if key not in _BATCH_WORKERS:
+            _BATCH_WORKERS[key] = WhisperBatchWorker(model_type, device=device, batch_size=batch_size)
+        return _BATCH_WORKERS[key]
+
+
+def shutdown_batch_workers():
+    """Stop all batch workers."""
+    with _workers_lock:
+        for worker in _BATCH_WORKERS.values():
+            worker.stop()
+        _BATCH_WORKERS.clear()
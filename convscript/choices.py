@@ -0,0 +1,14 @@
+"""
+Option values shared by the command line interface and the pipeline modules.
+
+Kept free of third-party imports, so click_app can build its options
+without importing pandas, torch or the Notion client.
+"""
+
+EXECUTION_MODES = ['sequential', 'concurrent']
+
+OUTPUT_FORMATS = ['txt', 'srt', 'vtt', 'jsonl']
+
+NOTION_UPLOAD_MODES = ['single_page', 'multi_page']
+
+INTERMEDIATE_FORMATS = ['parquet', 'csv']
@@ -0,0 +1,192 @@
+"""
+Chunked parallel transcription of long recordings.
+
+The decoded audio is split into chunks of roughly `chunk_s` seconds at the
+quietest point near each target boundary (frame energy, so no extra VAD
+model is needed), the chunks are transcribed in a pool of worker processes
+that each keep a loaded model and a share of the torch threads, and the
+segments are stitched back together with global timestamps and ids. The
+result has the same layout as a whole-file transcription, so everything
+downstream (combine_whisper_and_pyannote etc.) is unaffected.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from convscript.asr_backends import transcribe_with_backend, get_asr_backend, DEFAULT_ASR_BACKEND
+from convscript.audio_utils import SAMPLE_RATE
+
+DEFAULT_CHUNK_SECONDS = 300
+SEARCH_WINDOW_SECONDS = 30
+FRAME_SECONDS = 0.02
+SILENCE_SECONDS = 0.5
+
+# the worker pool stays alive between files, keyed by (model_type, backend, n_workers, n_threads);
+# only the pool of the latest configuration is kept
+_CHUNK_POOLS: Dict[Tuple, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def frame_energy(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 frame_s: float = FRAME_SECONDS) -> np.ndarray:
+    """Root mean square of non-overlapping frames."""
+    frame_length = max(1, int(frame_s * sample_rate))
+    n_frames = len(audio) // frame_length
+    frames = np.asarray(audio[:n_frames * frame_length], dtype=np.float32).reshape(n_frames, frame_length)
+
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+
+
+def find_split_points(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                      chunk_s: float = DEFAULT_CHUNK_SECONDS,
+                      search_window_s: float = SEARCH_WINDOW_SECONDS) -> List[int]:
+    """
+    Sample positions to split the audio at, roughly every `chunk_s` seconds.
+
+    Around each target boundary (+- half the search window) the split goes to
+    the middle of the quietest half-second, so words are not cut in half.
+    """
+    duration = len(audio) / sample_rate
+    if duration <= chunk_s * 1.5:
+        return []
+
+    energy = frame_energy(audio, sample_rate)
+    frame_length = max(1, int(FRAME_SECONDS * sample_rate))
+
+    # mean energy over a sliding half-second window, centred on each frame
+    window = max(1, int(SILENCE_SECONDS / FRAME_SECONDS))
+    smoothed = np.convolve(energy, np.ones(window) / window, mode='same')
+
+    split_points = []
+    half_window = int(search_window_s / 2 / FRAME_SECONDS)
+    for target_s in np.arange(chunk_s, duration - chunk_s / 2, chunk_s):
+        target = int(target_s / FRAME_SECONDS)
+        lower, upper = max(0, target - half_window), min(len(smoothed), target + half_window + 1)
+        quietest = lower + int(np.argmin(smoothed[lower:upper]))
+        split_points.append(quietest * frame_length)
+
+    return split_points
+
+
+def split_audio(audio: np.ndarray, split_points: Sequence[int]) -> List[Tuple[int, np.ndarray]]:
+    """(start sample, samples) of every chunk between the split points."""
+    bounds = [0] + list(split_points) + [len(audio)]
+
+    return [(start, audio[start:end]) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def stitch_segments(chunk_dfs: Sequence[pd.DataFrame], offsets_s: Sequence[float],
+                    durations_s: Optional[Sequence[float]] = None) -> pd.DataFrame:
+    """
+    Concatenate per-chunk segment tables, shifting times by each chunk's offset
+    and numbering segments 0..N-1 like a whole-file transcription.
+    """
+    shifted = []
+    for i, (chunk_df, offset) in enumerate(zip(chunk_dfs, offsets_s)):
+        chunk_df = chunk_df.reset_index(drop=True)
+        if durations_s is not None:
+            # segments must not reach into the next chunk
+            chunk_df['end'] = np.minimum(chunk_df['end'].to_numpy(), durations_s[i])
+        chunk_df['start'] = chunk_df['start'].to_numpy() + offset
+        chunk_df['end'] = chunk_df['end'].to_numpy() + offset
+        if 'seek' in chunk_df:
+            # Whisper's seek counts 10 ms mel frames
+            chunk_df['seek'] = chunk_df['seek'].to_numpy() + int(round(offset * 100))
+        shifted.append(chunk_df)
+
+    seg_df = pd.concat(shifted, ignore_index=True) if shifted else pd.DataFrame(columns=['start', 'end', 'text'])
+    seg_df.index.name = 'id'
+
+    return seg_df
+
+
+def _init_chunk_worker(model_type: str, backend: str, n_threads: int):
+    """Runs once per worker process: set its thread count and load the model."""
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+
+    get_asr_backend(backend).load(model_type)
+
+
+def _transcribe_chunk(audio: np.ndarray, model_type: str, backend: str) -> pd.DataFrame:
+    return transcribe_with_backend(audio, model_type, backend)
+
+
+def get_chunk_pool(model_type: str, backend: str, n_workers: int, n_threads: int) -> ProcessPoolExecutor:
+    """
+    A pool of workers with loaded models, created once and reused for later
+    files. Pools of other configurations are shut down first, so at most one
+    set of worker processes holds models.
+    """
+    key = (model_type, backend, n_workers, n_threads)
+    with _pools_lock:
+        if key not in _CHUNK_POOLS:
+            for pool in _CHUNK_POOLS.values():
+                pool.shutdown()
+            _CHUNK_POOLS.clear()
+            _CHUNK_POOLS[key] = ProcessPoolExecutor(max_workers=n_workers,
+                                                    mp_context=get_context('spawn'),
+                                                    initializer=_init_chunk_worker,
+                                                    initargs=(model_type, backend, n_threads))
+        return _CHUNK_POOLS[key]
+
+
+def shutdown_chunk_pools():
+    """Stop all worker processes and free their models."""
+    with _pools_lock:
+        for pool in _CHUNK_POOLS.values():
+            pool.shutdown()
+        _CHUNK_POOLS.clear()
+
+
+def split_workers(n_workers: int, n_cores: Optional[int] = None) -> Tuple[int, int]:
+    """Number of worker processes and torch threads per worker for the available cores."""
+    n_cores = n_cores or os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, n_cores))
+
+    return n_workers, max(1, n_cores // n_workers)
+
+
+def chunked_whisper_inference_df(audio: np.ndarray, model_type: str = 'base',
+                                 backend: str = DEFAULT_ASR_BACKEND, n_workers: int = 4,
+                                 chunk_s: float = DEFAULT_CHUNK_SECONDS, n_cores: Optional[int] = None,
+                                 sample_rate: int = SAMPLE_RATE) -> pd.DataFrame:
+    """
+    Transcribe decoded audio in chunks split at silences, `n_workers` chunks at a time.
+
+    Args:
+        audio: 16 kHz mono float32 samples
+        n_workers: Worker processes; with 1 the chunks are transcribed in this process
+        chunk_s: Target chunk length in seconds
+        n_cores: Cores to share between the workers (default: all)
+
+    Returns:
+        Segment table indexed by id with global start/end times
+    """
+    chunks = split_audio(audio, find_split_points(audio, sample_rate, chunk_s=chunk_s))
+    offsets_s = [start / sample_rate for start, _ in chunks]
+    durations_s = [len(samples) / sample_rate for _, samples in chunks]
+
+    # the pool is sized by the configured worker count, not the number of chunks, so that
+    # files with few chunks reuse it instead of starting a pool of their own
+    n_workers, n_threads = split_workers(n_workers, n_cores)
+    print(f"Transcribing {len(chunks)} chunks with {min(n_workers, len(chunks))} workers "
+          f"({n_threads} threads each)")
+
+    if n_workers == 1 or len(chunks) == 1:
+        chunk_dfs = [_transcribe_chunk(samples, model_type, backend) for _, samples in chunks]
+    else:
+        pool = get_chunk_pool(model_type, backend, n_workers, n_threads)
+        futures = [pool.submit(_transcribe_chunk, np.ascontiguousarray(samples), model_type, backend)
+                   for _, samples in chunks]
+        chunk_dfs = [future.result() for future in futures]
+
+    return stitch_segments(chunk_dfs, offsets_s, durations_s)
@@ -2,133 +2,185 @@ import pandas as pd
 import numpy as np
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from convscript.audio_utils import download_mp3, transform_mp3_to_wav, crop_wav
-from convscript.model_whisper import whisper_inference_with_segments_df
-from convscript.model_pyannote import get_pyannote_access_token, pyannote_inference_df
+from convscript.audio_utils import download_mp3, transform_mp3_to_wav, crop_wav, load_audio, SAMPLE_RATE
+from convscript.asr_backends import transcribe_with_backend, get_asr_backend, DEFAULT_ASR_BACKEND
+from convscript.chunked_whisper import chunked_whisper_inference_df, shutdown_chunk_pools, DEFAULT_CHUNK_SECONDS
+from convscript.batched_whisper import shutdown_batch_workers
+from convscript.model_pyannote import get_pyannote_access_token, pyannote_inference_df, load_pyannote_pipeline, \
+    PYANNOTE_PIPELINE, PYANNOTE_REVISION
+from convscript.model_cache import MODEL_CACHE
+from convscript.windowed_diarization import windowed_diarization_df, DEFAULT_OVERLAP_SECONDS
 from convscript.path import ProjPaths
+from convscript.result_cache import ResultCache, stage_key
+from convscript.transcript_writer import iter_transcript_chunks, write_transcript, FILE_EXTENSIONS
+from convscript.choices import EXECUTION_MODES
+from convscript.intermediate_store import save_intermediate_tables, DEFAULT_INTERMEDIATE_FORMAT
+from convscript.instrumentation import span, propagate, record_run, current_run, write_run_report, file_size
 
 def combine_whisper_and_pyannote(text_df, speaker_df):
+    """
+    Assign each text segment the speaker turn it overlaps most.
+    
+    Speaker turns are sorted by start time, so the turns overlapping a text
+    segment lie in one contiguous range: from the first turn whose running
+    maximum end reaches the segment start (speaker turns may overlap each
+    other) up to the last turn starting before the segment ends. Both bounds
+    come from np.searchsorted, so the join costs O((N + M) log M + K) for K
+    overlapping pairs instead of masking all text segments per speaker turn.
+    Ties are resolved in favour of the turn listed first in speaker_df.
+    """
+    
+    overlap_columns = ['speaker_start', 'speaker_end', 'speaker',
+                       'max_start', 'min_end', 'overlap_duration']
+    
+    text_start = text_df['start'].to_numpy(dtype=float)
+    text_end = text_df['end'].to_numpy(dtype=float)
+    
+    # sort speaker turns by start time
+    speaker_order = np.argsort(speaker_df['start'].to_numpy(dtype=float), kind='stable')
+    speaker_start = speaker_df['start'].to_numpy(dtype=float)[speaker_order]
+    speaker_end = speaker_df['end'].to_numpy(dtype=float)[speaker_order]
+    
+    if len(speaker_order) == 0 or len(text_start) == 0:
+        return pd.DataFrame(columns=list(text_df.columns) + overlap_columns)
+    
+    # candidate range of speaker turns for each text segment
+    running_max_end = np.maximum.accumulate(speaker_end)
+    lower = np.searchsorted(running_max_end, text_start, side='left')
+    upper = np.searchsorted(speaker_start, text_end, side='right')
+    counts = np.maximum(upper - lower, 0)
+    
+    # expand ranges into (text, speaker) candidate pairs
+    text_idx = np.repeat(np.arange(len(text_start)), counts)
+    range_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    speaker_idx = np.repeat(lower, counts) + range_offsets
+    
+    # drop turns inside the range that end before the text segment starts
+    is_overlap = speaker_end[speaker_idx] >= text_start[text_idx]
+    text_idx = text_idx[is_overlap]
+    speaker_idx = speaker_idx[is_overlap]
     
-    # find overlapping speakers for each text segment
-    overlap_list = []
+    # compute overlap durations
+    max_start = np.maximum(text_start[text_idx], speaker_start[speaker_idx])
+    min_end = np.minimum(text_end[text_idx], speaker_end[speaker_idx])
+    overlap_duration = min_end - max_start
     
-    for idx, this_row in speaker_df.iterrows():
-        
-        this_start = this_row['start']
-        this_end = this_row['end']
-        this_speaker = this_row['speaker']
-        
-        xx_inds = ~((text_df['end'] < this_start) | (text_df['start'] > this_end))
-        this_overlap_texts = text_df.loc[xx_inds, :]
-        this_overlap_texts['speaker_start'] = this_start
-        this_overlap_texts['speaker_end'] = this_end
-        this_overlap_texts['speaker'] = this_speaker
-        
-        overlap_list.append(this_overlap_texts)
-        
-    all_overlaps = pd.concat(overlap_list)
-    all_overlaps = all_overlaps.reset_index(drop=True)
+    # pick only one text/speaker combination for each text
+    speaker_rows = speaker_order[speaker_idx]
+    best_order = np.lexsort((speaker_rows, -overlap_duration, text_idx))
+    is_best = np.ones(len(best_order), dtype=bool)
+    is_best[1:] = text_idx[best_order][1:] != text_idx[best_order][:-1]
+    best = best_order[is_best]
+    
+    # order by segment id like the segment table itself
+    best = best[np.argsort(text_df['id'].to_numpy()[text_idx[best]], kind='stable')]
+    
+    text_speaker_df = text_df.iloc[text_idx[best]].reset_index(drop=True)
+    text_speaker_df['speaker_start'] = speaker_df['start'].to_numpy()[speaker_rows[best]]
+    text_speaker_df['speaker_end'] = speaker_df['end'].to_numpy()[speaker_rows[best]]
+    text_speaker_df['speaker'] = speaker_df['speaker'].to_numpy()[speaker_rows[best]]
+    text_speaker_df['max_start'] = max_start[best]
+    text_speaker_df['min_end'] = min_end[best]
+    text_speaker_df['overlap_duration'] = overlap_duration[best]
     
-    # compute overlap durations
-    all_overlaps['max_start'] = np.maximum(all_overlaps['start'], 
-                                        all_overlaps['speaker_start'])
+    return text_speaker_df
+
+def combine_consecutive_speakers(text_speaker_df_raw, max_turn_duration=None):
+    """
+    Merge consecutive segments of the same speaker into one turn.
     
-    all_overlaps['min_end'] = np.minimum(all_overlaps['end'], 
-                                        all_overlaps['speaker_end'])
+    Runs of the same speaker get a group id from a speaker-change mask and a
+    cumulative sum, then each group is aggregated in one pass (min start,
+    max end, texts joined by spaces). With `max_turn_duration` (seconds), a
+    run is split into several turns so that no merged turn grows longer.
+    """
     
-    all_overlaps['overlap_duration'] = all_overlaps['min_end'] - all_overlaps['max_start']
+    text_speaker_df = text_speaker_df_raw.reset_index(drop=True)
     
-    # pick only one text/speaker combination for each text
+    if text_speaker_df.empty:
+        return text_speaker_df.loc[:, ['start', 'end', 'text', 'speaker']]
     
-    max_overlap_indices = all_overlaps.groupby('id')['overlap_duration'].idxmax()
-    text_speaker_df = all_overlaps.loc[max_overlap_indices, :]
+    speakers = text_speaker_df['speaker'].to_numpy()
+    is_new_turn = np.ones(len(speakers), dtype=bool)
+    is_new_turn[1:] = speakers[1:] != speakers[:-1]
     
-    return text_speaker_df
-
-def combine_consecutive_speakers(text_speaker_df_raw):
-
-    text_speaker_df = text_speaker_df_raw.copy()
+    if max_turn_duration is not None:
+        starts = text_speaker_df['start'].to_numpy(dtype=float)
+        ends = text_speaker_df['end'].to_numpy(dtype=float)
+        turn_start = starts[0]
+        for counter in range(1, len(speakers)):
+            if is_new_turn[counter] or ends[counter] - turn_start > max_turn_duration:
+                is_new_turn[counter] = True
+                turn_start = starts[counter]
     
-    n_iter = text_speaker_df.shape[0]
+    turn_ids = np.cumsum(is_new_turn)
+    
+    # Handle NaN values in text columns
+    texts = text_speaker_df['text'].where(text_speaker_df['text'].notna(), '').astype(str)
+    
+    grouped = text_speaker_df.assign(text=texts).groupby(turn_ids, sort=False)
+    text_speaker_df = grouped.agg(start=('start', 'min'),
+                                  end=('end', 'max'),
+                                  text=('text', ' '.join),
+                                  speaker=('speaker', 'first'))
     
-    for counter in range(1, n_iter):
-        
-        is_same_speaker = (text_speaker_df['speaker'].iloc[counter] == text_speaker_df['speaker'].iloc[counter-1])
-        
-        if is_same_speaker:
-            
-            new_start = text_speaker_df['start'].iloc[counter-1]
-            previous_text = text_speaker_df['text'].iloc[counter-1]
-            current_text = text_speaker_df['text'].iloc[counter]
-            
-            # Handle NaN values in text columns
-            previous_text = str(previous_text) if pd.notna(previous_text) else ""
-            current_text = str(current_text) if pd.notna(current_text) else ""
-            
-            new_text = previous_text + ' ' + current_text
-            
-            text_speaker_df['start'].iloc[counter] = new_start
-            text_speaker_df['text'].iloc[counter] = new_text
-            text_speaker_df['start'].iloc[counter-1] = np.nan
-            text_speaker_df['end'].iloc[counter-1] = np.nan
-        
-    # Only drop rows where start or end is NaN (these are the ones we marked for removal)
-    text_speaker_df = text_speaker_df.dropna(subset=['start', 'end']).loc[:, ['start', 'end', 'text', 'speaker']]
     text_speaker_df = text_speaker_df.reset_index(drop=True)
     text_speaker_df = text_speaker_df.sort_values('start')
     
     return text_speaker_df
 
-def text_speaker_df_to_text(text_speaker_df):
+def text_speaker_df_to_text(text_speaker_df, output_format='txt'):
     
-    output_str = ''
-
-    for idx, this_row in text_speaker_df.iterrows():
-        
-        this_start = np.round(this_row['start'], 2)
-        this_end = np.round(this_row['end'], 2)
-        this_speaker = this_row['speaker']
-        this_text = this_row['text']
-        
-        output_str += f'{this_start} - {this_end}: {this_speaker}\n'
-        output_str += f'{this_text}\n\n'
-        
-    return output_str
+    return ''.join(iter_transcript_chunks(text_speaker_df, output_format))
 
 def save_intermediate_csvs(text_df, speaker_df, wav_fname, model_type):
     """Save intermediate DataFrames as CSV files"""
-    # Ensure directories exist
-    ProjPaths.create_directories()
-    
-    base_name = os.path.splitext(os.path.basename(wav_fname))[0]
-    
-    # Save whisper segments
-    whisper_csv = ProjPaths.intermediate_path / f"{base_name}_whisper_{model_type}_segments.csv"
-    text_df.to_csv(whisper_csv, index=False, encoding='utf-8')
-    
-    # Save speaker segments
-    speaker_csv = ProjPaths.intermediate_path / f"{base_name}_speaker_segments.csv"
-    speaker_df.to_csv(speaker_csv, index=False, encoding='utf-8')
-    
-    return whisper_csv, speaker_csv
+    return save_intermediate_tables(text_df, speaker_df, wav_fname, model_type, intermediate_format='csv')
 
-def save_final_transcript(output_str, output_filename=None, wav_fname=None, model_type=None):
-    """Save final transcript to outputs folder"""
+def save_intermediates(text_df, speaker_df, wav_fname, model_type, intermediate_format=DEFAULT_INTERMEDIATE_FORMAT):
+    """Save intermediate DataFrames as Parquet (default) or CSV files (see convscript.intermediate_store)"""
+    with span('write_intermediates', format=intermediate_format) as s:
+        whisper_path, speaker_path = save_intermediate_tables(text_df, speaker_df, wav_fname, model_type,
+                                                              intermediate_format=intermediate_format)
+        s.add_bytes(file_size(whisper_path) + file_size(speaker_path))
+    
+    return whisper_path, speaker_path
+
+def get_transcript_path(output_filename=None, wav_fname=None, model_type=None, output_format='txt'):
+    """Path of the final transcript in the outputs folder"""
     # Ensure directories exist
     ProjPaths.create_directories()
     
+    extension = FILE_EXTENSIONS[output_format]
     if output_filename:
-        output_file = ProjPaths.outputs_path / f"{output_filename}.txt"
+        output_file = ProjPaths.outputs_path / f"{output_filename}.{extension}"
     else:
         base_name = os.path.splitext(os.path.basename(wav_fname))[0]
-        output_file = ProjPaths.outputs_path / f"{base_name}_{model_type}_transcript.txt"
+        output_file = ProjPaths.outputs_path / f"{base_name}_{model_type}_transcript.{extension}"
+    
+    return output_file
+
+def save_final_transcript(output_str, output_filename=None, wav_fname=None, model_type=None):
+    """Save final transcript to outputs folder"""
+    output_file = get_transcript_path(output_filename, wav_fname, model_type)
     
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(output_str)
     
     return output_file
 
+def save_final_transcript_df(text_speaker_df, output_filename=None, wav_fname=None, model_type=None,
+                             output_format='txt'):
+    """Stream the final transcript to the outputs folder, returning path and character count"""
+    output_file = get_transcript_path(output_filename, wav_fname, model_type, output_format)
+    with span('write_transcript', format=output_format) as s:
+        n_chars = write_transcript(text_speaker_df, output_file, output_format)
+        s.add_bytes(file_size(output_file))
+    
+    return output_file, n_chars
+
 def get_audio_duration(wav_fname):
     """Get audio duration in seconds"""
     try:
@@ -156,62 +208,355 @@ def detect_device():
     except ImportError:
         return "CPU (torch not available)"
 
-def wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename=None):
+def warm_up_models(model_type, pyannote_token=None, backend=DEFAULT_ASR_BACKEND):
+    """Load Whisper and pyannote models into the model cache ahead of inference"""
+    warm_start = time.time()
+    get_asr_backend(backend).load(model_type)
+    if pyannote_token is not None:
+        load_pyannote_pipeline(pyannote_token)
+    print(f"Models ready after {time.time() - warm_start:.1f}s (cached: {len(MODEL_CACHE)})")
+
+def unload_models():
+    """Remove all models from the model cache (and stop chunk workers) to free their memory"""
+    shutdown_chunk_pools()
+    shutdown_batch_workers()
+    return MODEL_CACHE.unload()
+
+def split_torch_threads(n_stages=2, n_cores=None):
+    """Partition the available cores between concurrently running stages"""
+    n_cores = n_cores or os.cpu_count() or 1
+    base = max(1, n_cores // n_stages)
+    thread_counts = [base] * n_stages
+    # give leftover cores to the first stage (Whisper)
+    thread_counts[0] += max(0, n_cores - base * n_stages)
+    
+    return thread_counts
+
+def _set_torch_threads(n_threads):
+    if not n_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+
+def whisper_cache_key(audio_hash, model_type, backend=DEFAULT_ASR_BACKEND, chunk_s=None):
+    params = get_asr_backend(backend).cache_params()
+    if chunk_s is not None:
+        # chunked transcription gives (slightly) different segments
+        params['chunk_s'] = chunk_s
+    return stage_key(audio_hash, 'whisper', model_type=model_type, **params)
+
+def pyannote_cache_key(audio_hash, diarization_window_s=None):
+    params = {}
+    if diarization_window_s:
+        # windowed diarization links speakers across windows, results can differ
+        params = {'window_s': diarization_window_s, 'overlap_s': DEFAULT_OVERLAP_SECONDS}
+    return stage_key(audio_hash, 'pyannote', pipeline=PYANNOTE_PIPELINE, revision=PYANNOTE_REVISION, **params)
+
+def run_whisper_stage(audio, model_type, n_threads=None, result_cache=None, cache_key=None,
+                      backend=DEFAULT_ASR_BACKEND, whisper_workers=1, cached_df=None):
+    """
+    Run Whisper inference on a file path or decoded array, returning the segments and the elapsed seconds.
+    With whisper_workers > 1 the audio is transcribed in chunks by that many worker
+    processes, which share the n_threads cores (all cores if None).
+    `cached_df` is a result already loaded from the result cache.
+    """
+    with span('whisper', model_type=model_type, backend=backend, workers=whisper_workers) as stage_span:
+        
+        text_df = cached_df
+        if text_df is None and result_cache is not None and cache_key is not None:
+            text_df = result_cache.get(cache_key)
+        if text_df is not None:
+            print(f"Whisper segments loaded from cache ({len(text_df)} segments)")
+            stage_span.set(cached=True, n_segments=len(text_df))
+            return text_df, stage_span.elapsed
+        
+        _set_torch_threads(n_threads)
+        print(f"Starting Whisper inference with model: {model_type} ({backend})")
+        if whisper_workers > 1:
+            if isinstance(audio, (str, os.PathLike)):
+                audio = load_audio(audio)
+            text_df = chunked_whisper_inference_df(audio, model_type, backend, n_workers=whisper_workers,
+                                                   n_cores=n_threads)
+        else:
+            text_df = transcribe_with_backend(audio, model_type, backend)
+        text_df = text_df.reset_index()
+        whisper_time = stage_span.elapsed
+        stage_span.set(cached=False, n_segments=len(text_df))
+        print(f"Whisper inference complete. Found {len(text_df)} segments")
+        
+        if result_cache is not None and cache_key is not None:
+            result_cache.put(cache_key, text_df, {'stage': 'whisper', 'model_type': model_type, 'backend': backend})
+    
+    return text_df, whisper_time
+
+def run_pyannote_stage(audio, pyannote_token, n_threads=None, result_cache=None, cache_key=None,
+                       diarization_window_s=None, diarization_workers=1, cached_df=None):
+    """
+    Run speaker diarization on a file path or decoded array, returning the segments and the elapsed seconds.
+    With diarization_window_s the audio is diarized in overlapping windows of that
+    many seconds (diarization_workers at a time) and speakers are linked across them.
+    `cached_df` is a result already loaded from the result cache.
+    """
+    with span('pyannote', window_s=diarization_window_s) as stage_span:
+        
+        speaker_df = cached_df
+        if speaker_df is None and result_cache is not None and cache_key is not None:
+            speaker_df = result_cache.get(cache_key)
+        if speaker_df is not None:
+            print(f"Speaker segments loaded from cache ({len(speaker_df)} segments)")
+            stage_span.set(cached=True, n_segments=len(speaker_df))
+            return speaker_df, stage_span.elapsed
+        
+        _set_torch_threads(n_threads)
+        if diarization_window_s:
+            print(f"Starting windowed speaker diarization with pyannote ({diarization_window_s}s windows)")
+            if isinstance(audio, (str, os.PathLike)):
+                audio = load_audio(audio)
+            speaker_df = windowed_diarization_df(audio, pyannote_token, window_s=diarization_window_s,
+                                                 n_workers=diarization_workers)
+        else:
+            print("Starting speaker diarization with pyannote")
+            speaker_df = pyannote_inference_df(audio, pyannote_token)
+        pyannote_time = stage_span.elapsed
+        stage_span.set(cached=False, n_segments=len(speaker_df))
+        print(f'Speaker diarization done. Found {len(speaker_df)} speaker segments')
+        
+        if result_cache is not None and cache_key is not None:
+            result_cache.put(cache_key, speaker_df, {'stage': 'pyannote', 'pipeline': PYANNOTE_PIPELINE,
+                                                     'revision': PYANNOTE_REVISION,
+                                                     'window_s': diarization_window_s})
+    
+    return speaker_df, pyannote_time
+
+def run_inference_stages(audio, model_type, pyannote_token, execution_mode='sequential',
+                         result_cache=None, audio_hash=None, backend=DEFAULT_ASR_BACKEND,
+                         whisper_workers=1, diarization_window_s=None, diarization_workers=1,
+                         cached_text_df=None, cached_speaker_df=None):
+    """
+    Run Whisper and pyannote on the same audio, either one after the other or
+    concurrently in two threads with the torch threads split between them.
+    `backend` selects the speech recognition implementation (see convscript.asr_backends),
+    `whisper_workers` > 1 transcribes the audio in chunks in parallel processes,
+    `diarization_window_s` diarizes it in overlapping windows (see convscript.windowed_diarization).
+    
+    With a `result_cache` and the `audio_hash`, each stage first looks up its
+    earlier result and stores new results. Results already loaded from the
+    cache are passed as `cached_text_df` and `cached_speaker_df`.
+    
+    Returns text_df, speaker_df and a dict of stage timings in seconds.
+    """
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode '{execution_mode}', expected one of {EXECUTION_MODES}")
+    
+    with span('inference', mode=execution_mode) as inference_span:
+        whisper_kwargs = {'backend': backend, 'whisper_workers': whisper_workers, 'cached_df': cached_text_df}
+        pyannote_kwargs = {'diarization_window_s': diarization_window_s, 'diarization_workers': diarization_workers,
+                           'cached_df': cached_speaker_df}
+        if result_cache is not None and audio_hash is not None:
+            chunk_s = DEFAULT_CHUNK_SECONDS if whisper_workers > 1 else None
+            whisper_kwargs.update(result_cache=result_cache,
+                                  cache_key=whisper_cache_key(audio_hash, model_type, backend, chunk_s))
+            pyannote_kwargs.update(result_cache=result_cache,
+                                   cache_key=pyannote_cache_key(audio_hash, diarization_window_s))
+        
+        if execution_mode == 'concurrent':
+            whisper_threads, pyannote_threads = split_torch_threads(2)
+            print(f"Running Whisper ({whisper_threads} threads) and pyannote ({pyannote_threads} threads) concurrently")
+            
+            try:
+                import torch
+                previous_threads = torch.get_num_threads()
+            except ImportError:
+                previous_threads = None
+            
+            try:
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    whisper_future = executor.submit(propagate(run_whisper_stage), audio, model_type,
+                                                     whisper_threads, **whisper_kwargs)
+                    pyannote_future = executor.submit(propagate(run_pyannote_stage), audio, pyannote_token,
+                                                      pyannote_threads, **pyannote_kwargs)
+                    text_df, whisper_time = whisper_future.result()
+                    speaker_df, pyannote_time = pyannote_future.result()
+            finally:
+                _set_torch_threads(previous_threads)
+        else:
+            text_df, whisper_time = run_whisper_stage(audio, model_type, **whisper_kwargs)
+            speaker_df, pyannote_time = run_pyannote_stage(audio, pyannote_token, **pyannote_kwargs)
+        
+        timings = {'whisper': whisper_time,
+                   'pyannote': pyannote_time,
+                   'inference_wall': inference_span.elapsed}
+    
+    return text_df, speaker_df, timings
+
+def _transcribe_to_file(wav_fname, model_type, pyannote_token, output_filename, execution_mode,
+                        max_turn_duration, output_format, decode_once, mmap_audio, use_cache, backend,
+                        whisper_workers, diarization_window_s, diarization_workers, intermediate_format):
+    """The stages of wav_to_transcript, returning the path of the transcript and the speaker turns"""
     
     # Display device information
     device_info = detect_device()
     print(f"Processing device: {device_info}")
     
-    # Get audio duration
-    audio_duration = get_audio_duration(wav_fname)
+    result_cache = ResultCache() if use_cache else None
+    known_audio = result_cache.known_audio(wav_fname) if use_cache else None
+    
+    chunk_s = DEFAULT_CHUNK_SECONDS if whisper_workers > 1 else None
+    cached_text_df = cached_speaker_df = None
+    if known_audio:
+        # loaded up front: an entry can be evicted by another process at any time
+        cached_text_df = result_cache.get(whisper_cache_key(known_audio['audio_hash'], model_type, backend,
+                                                            chunk_s))
+        cached_speaker_df = result_cache.get(pyannote_cache_key(known_audio['audio_hash'], diarization_window_s))
+    
+    if cached_text_df is not None and cached_speaker_df is not None:
+        # everything needed is cached, skip decoding
+        audio = None
+        audio_hash = known_audio['audio_hash']
+        audio_duration = known_audio['duration']
+        mmap_path = None
+    else:
+        # Decode audio once for both models
+        mmap_path = None
+        if decode_once:
+            if mmap_audio:
+                ProjPaths.create_directories()
+                base_name = os.path.splitext(os.path.basename(wav_fname))[0]
+                mmap_path = ProjPaths.intermediate_path / f"{base_name}_{SAMPLE_RATE}hz.f32"
+            audio = load_audio(wav_fname, mmap_path=mmap_path)
+            audio_duration = len(audio) / SAMPLE_RATE
+        else:
+            audio = wav_fname
+            audio_duration = get_audio_duration(wav_fname)
+        
+        audio_hash = result_cache.remember_audio(wav_fname, audio, audio_duration) if use_cache else None
     print(f"Audio duration: {audio_duration:.2f} seconds ({audio_duration/60:.2f} minutes)")
     
-    # Step 1: Whisper inference
-    print(f"Starting Whisper inference with model: {model_type}")
-    whisper_start = time.time()
-    text_df = whisper_inference_with_segments_df(wav_fname, model_type=model_type)
-    text_df = text_df.reset_index()
-    whisper_time = time.time() - whisper_start
-    print(f"Whisper inference complete. Found {len(text_df)} segments")
-    
-    # Step 2: Speaker diarization
-    print("Starting speaker diarization with pyannote")
-    pyannote_start = time.time()
-    speaker_df = pyannote_inference_df(wav_fname, pyannote_token)
-    pyannote_time = time.time() - pyannote_start
-    print(f'Speaker diarization done. Found {len(speaker_df)} speaker segments')
+    # Step 1 + 2: Whisper inference and speaker diarization
+    try:
+        text_df, speaker_df, timings = run_inference_stages(audio, model_type, pyannote_token,
+                                                            execution_mode=execution_mode,
+                                                            result_cache=result_cache,
+                                                            audio_hash=audio_hash,
+                                                            backend=backend,
+                                                            whisper_workers=whisper_workers,
+                                                            diarization_window_s=diarization_window_s,
+                                                            diarization_workers=diarization_workers,
+                                                            cached_text_df=cached_text_df,
+                                                            cached_speaker_df=cached_speaker_df)
+    finally:
+        del audio
+        if mmap_path is not None and os.path.exists(mmap_path):
+            os.remove(mmap_path)
+    whisper_time = timings['whisper']
+    pyannote_time = timings['pyannote']
     
     # Step 3: Combining results
     print("Combining Whisper and pyannote results")
     combine_start = time.time()
-    text_speaker_df_raw = combine_whisper_and_pyannote(text_df, speaker_df)    
-    text_speaker_df = combine_consecutive_speakers(text_speaker_df_raw)
-    output_str = text_speaker_df_to_text(text_speaker_df)
+    with span('combine') as s:
+        text_speaker_df_raw = combine_whisper_and_pyannote(text_df, speaker_df)    
+        text_speaker_df = combine_consecutive_speakers(text_speaker_df_raw,
+                                                       max_turn_duration=max_turn_duration)
+        s.set(n_segments=len(text_speaker_df))
+    
+    # Save final transcript
+    output_file, n_chars = save_final_transcript_df(text_speaker_df, output_filename, wav_fname,
+                                                    model_type, output_format=output_format)
     combine_time = time.time() - combine_start
     print(f"Combination complete. Final transcript has {len(text_speaker_df)} segments")
     
-    # Save intermediate CSVs
-    save_intermediate_csvs(text_df, speaker_df, wav_fname, model_type)
-    
-    # Save final transcript
-    output_file = save_final_transcript(output_str, output_filename, wav_fname, model_type)
+    # Save intermediate tables
+    save_intermediates(text_df, speaker_df, wav_fname, model_type, intermediate_format)
     
     # Display timing and statistics
-    total_time = whisper_time + pyannote_time + combine_time
+    total_time = timings['inference_wall'] + combine_time
     print(f"\\n=== PROCESSING SUMMARY ===")
     print(f"Processing device: {device_info}")
+    print(f"Execution mode: {execution_mode}")
+    print(f"ASR backend: {backend}")
+    if whisper_workers > 1:
+        print(f"Whisper workers: {whisper_workers}")
+    if diarization_window_s:
+        print(f"Diarization windows: {diarization_window_s}s ({diarization_workers} at a time)")
     print(f"Audio duration: {audio_duration:.2f} seconds")
-    print(f"Final transcript length: {len(output_str):,} characters")
+    print(f"Final transcript length: {n_chars:,} characters")
     print(f"Whisper inference: {whisper_time:.1f}s")
     print(f"Speaker diarization: {pyannote_time:.1f}s") 
+    if execution_mode == 'concurrent':
+        print(f"Inference wall-clock (concurrent): {timings['inference_wall']:.1f}s")
     print(f"Combination: {combine_time:.1f}s")
     print(f"Total processing time: {total_time:.1f}s")
     print(f"Processing speed: {audio_duration/total_time:.1f}x realtime")
     print(f"Final transcript saved to: {output_file}")
     
-    return output_str
+    return output_file, text_speaker_df
+
+def wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename=None,
+                      execution_mode='sequential', max_turn_duration=None,
+                      output_format='txt', return_path=False, decode_once=True, mmap_audio=False,
+                      use_cache=True, backend=DEFAULT_ASR_BACKEND, whisper_workers=1,
+                      diarization_window_s=None, diarization_workers=1,
+                      intermediate_format=DEFAULT_INTERMEDIATE_FORMAT, return_df=False):
+    """
+    Transcribe an audio file with speaker labels and save the transcript.
+    `backend` selects the speech recognition implementation ('openai-whisper'
+    or 'faster-whisper', see convscript.asr_backends). With `whisper_workers`
+    > 1, long recordings are split at silences and the chunks transcribed in
+    that many processes (see convscript.chunked_whisper). With
+    `diarization_window_s`, speaker diarization runs on overlapping windows of
+    that many seconds (`diarization_workers` at a time), which bounds its peak
+    memory on recordings of several hours (see convscript.windowed_diarization).
+    
+    With `decode_once` (default) the file is decoded a single time to 16 kHz
+    mono float32 samples that both Whisper and pyannote read from, so any
+    format ffmpeg understands can be passed and no WAV conversion is needed.
+    `mmap_audio` keeps those samples in a memory-mapped file in the
+    intermediate folder instead of process memory.
+    
+    With `use_cache`, Whisper and pyannote results are looked up in the
+    content-addressed result cache (see convscript.result_cache) before
+    running inference. If both are cached for an unchanged file, the audio
+    is not even decoded.
+    
+    The Whisper segments and speaker turns are kept in the intermediate
+    folder as Parquet files, or as CSV files with `intermediate_format='csv'`
+    (see convscript.intermediate_store).
+    
+    The stages are timed (see convscript.instrumentation) and, unless the
+    call is part of a run recorded by the caller, the report is written next
+    to the transcript and summarised in the run history of its folder.
+    
+    Returns the transcript as a string, or its path if `return_path` is set
+    (the transcript is streamed to disk and never held in memory as a whole).
+    With `return_df`, the speaker turns (start, end, text and speaker columns)
+    are returned as well, as a tuple (transcript, text_speaker_df).
+    """
+    owns_run = current_run() is None
+    with record_run('wav_to_transcript', audio=str(wav_fname), model_type=model_type, backend=backend,
+                    execution_mode=execution_mode, output_format=output_format) as run:
+        output_file, text_speaker_df = _transcribe_to_file(wav_fname, model_type, pyannote_token, output_filename,
+                                                           execution_mode, max_turn_duration, output_format,
+                                                           decode_once, mmap_audio, use_cache, backend,
+                                                           whisper_workers, diarization_window_s,
+                                                           diarization_workers, intermediate_format)
+    if owns_run:
+        report_path = write_run_report(run, output_file)
+        print(f"Run report saved to: {report_path}")
+    
+    if return_path:
+        return (output_file, text_speaker_df) if return_df else output_file
+    
+    with open(output_file, 'r', encoding='utf-8') as f:
+        output_str = f.read()
+    
+    return (output_str, text_speaker_df) if return_df else output_str
 
-def url_to_transcript(url, model_type, pyannote_token, output_filename=None):
+def url_to_transcript(url, model_type, pyannote_token, output_filename=None,
+                      execution_mode='sequential', backend=DEFAULT_ASR_BACKEND):
 
     ## download file, transform to wav
     mp3_fname = download_mp3(url)
@@ -219,7 +564,8 @@ def url_to_transcript(url, model_type, pyannote_token, output_filename=None):
     print('TODO: remove file cropping in url_to_transcript')
     crop_wav(wav_fname, wav_fname, start_frame=100000, n_frames=60000)
     
-    return wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename)
+    return wav_to_transcript(wav_fname, model_type, pyannote_token, output_filename,
+                             execution_mode=execution_mode, backend=backend)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,247 @@
+"""
+Lightweight spans for timing pipeline stages, and machine-readable run reports.
+
+    with record_run('wav_to_transcript', model_type='base') as run:
+        with span('decode') as s:
+            audio = load_audio(fname)
+            s.add_bytes(audio.nbytes)
+        ...
+    write_run_report(run, transcript_path)
+
+A span measures wall-clock time, process CPU time (all threads, so stages
+running concurrently see each other's CPU time), the peak resident memory of
+the process when it ends and the bytes it processed. The current run and
+span are context variables, so concurrent transcriptions in threads record
+separate runs; functions submitted to thread pools through propagate() add
+their spans to the caller's run. Outside of a recorded run spans only
+measure time, so instrumented functions cost next to nothing when nobody is
+listening. Spans in worker processes (chunked Whisper, batch workers) belong
+to the runs of those processes.
+
+The report of a run is written as `<transcript>.run.json` next to the
+transcript, and a one-line summary per run is appended to
+`run_history.jsonl` in the same folder.
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+RUN_HISTORY_FILE = 'run_history.jsonl'
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar('convscript_run', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('convscript_span', default=None)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss / 1024 ** 2 if sys.platform == 'darwin' else max_rss / 1024
+
+
+class Span:
+    """One timed stage. Use through span()."""
+
+    def __init__(self, name: str, parent: Optional[str] = None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs: Dict[str, Any] = attrs
+        self.n_bytes = 0
+        self.thread = threading.current_thread().name
+        self.started = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.wall_s: Optional[float] = None
+        self.cpu_s: Optional[float] = None
+        self.peak_rss_mb: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock seconds so far (or in total once finished)."""
+        return self.wall_s if self.wall_s is not None else time.perf_counter() - self._wall_start
+
+    def add_bytes(self, n_bytes: int):
+        self.n_bytes += int(n_bytes)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.wall_s = time.perf_counter() - self._wall_start
+        self.cpu_s = time.process_time() - self._cpu_start
+        self.peak_rss_mb = peak_rss_mb()
+
+    def to_dict(self, run_started: float) -> Dict[str, Any]:
+        return {'name': self.name,
+                'parent': self.parent,
+                'thread': self.thread,
+                'offset_s': round(self.started - run_started, 6),
+                'wall_s': round(self.wall_s, 6),
+                'cpu_s': round(self.cpu_s, 6),
+                'peak_rss_mb': self.peak_rss_mb,
+                'bytes': self.n_bytes,
+                'error': self.error,
+                'attrs': self.attrs}
+
+
+class RunRecord:
+    """The spans of one run (a transcription, an upload, ...) plus metadata."""
+
+    def __init__(self, name: str, **meta):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.meta: Dict[str, Any] = meta
+        self.started = time.time()
+        self.wall_s: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, finished_span: Span):
+        with self._lock:
+            self.spans.append(finished_span)
+
+    def stages(self) -> Dict[str, Dict[str, Any]]:
+        """Spans aggregated by name: count, summed wall/CPU seconds and bytes, highest peak RSS."""
+        stages: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for s in self.spans:
+                stage = stages.setdefault(s.name, {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'bytes': 0,
+                                                   'peak_rss_mb': None})
+                stage['count'] += 1
+                stage['wall_s'] += s.wall_s
+                stage['cpu_s'] += s.cpu_s
+                stage['bytes'] += s.n_bytes
+                if s.peak_rss_mb is not None:
+                    stage['peak_rss_mb'] = max(stage['peak_rss_mb'] or 0.0, s.peak_rss_mb)
+        return stages
+
+    def summary(self) -> Dict[str, Any]:
+        return {'run_id': self.run_id,
+                'name': self.name,
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'wall_s': round(self.wall_s if self.wall_s is not None else time.time() - self.started, 6),
+                'peak_rss_mb': peak_rss_mb(),
+                'meta': self.meta,
+                'stages': {name: dict(stage, wall_s=round(stage['wall_s'], 6), cpu_s=round(stage['cpu_s'], 6))
+                           for name, stage in self.stages().items()}}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [s.to_dict(self.started) for s in self.spans]
+        return dict(self.summary(), spans=spans)
+
+
+def current_run() -> Optional[RunRecord]:
+    return _current_run.get()
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span, e.g. to add bytes or attributes from inside a @timed function."""
+    return _current_span.get()
+
+
+@contextmanager
+def record_run(name: str, **meta) -> Iterator[RunRecord]:
+    """
+    Record the spans of this context into a new run. If a run is already
+    being recorded, its record is returned instead (nested calls, e.g. a
+    transcription inside an upload command, add to the outer run).
+    """
+    outer = _current_run.get()
+    if outer is not None:
+        yield outer
+        return
+
+    run = RunRecord(name, **meta)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        run.wall_s = time.time() - run.started
+        _current_run.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """Time a stage; spans started inside it get it as parent."""
+    parent = _current_span.get()
+    s = Span(name, parent=parent.name if parent is not None else None, **attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        s.finish()
+        run = _current_run.get()
+        if run is not None:
+            run.add(s)
+
+
+def propagate(func):
+    """
+    Wrap `func` to run in a copy of the caller's context, so its spans join the
+    caller's run when it is submitted to a thread pool.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def timed(name: Optional[str] = None, **attrs):
+    """Decorator running a function inside a span (named after the function by default)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def write_run_report(run: RunRecord, transcript_path, history_path=None) -> Path:
+    """
+    Write the full report next to the transcript (`<transcript>.run.json`) and
+    append its summary to the run history (`run_history.jsonl` in the same folder).
+    """
+    transcript_path = Path(transcript_path)
+    report_path = transcript_path.with_name(transcript_path.name + '.run.json')
+    history_path = Path(history_path) if history_path else transcript_path.parent / RUN_HISTORY_FILE
+
+    report = run.to_dict()
+    report['transcript'] = str(transcript_path)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    summary = run.summary()
+    summary['transcript'] = str(transcript_path)
+    with open(history_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(summary, default=str) + '\n')
+
+    return report_path
@@ -0,0 +1,223 @@
+"""
+Columnar store for the intermediate Whisper segments and speaker turns.
+
+Each transcription keeps its two tables in data/intermediate, by default as
+Parquet files: zstd compressed, with the column types of convscript.segments
+(float32 scores, float64 times) and the speaker labels dictionary encoded.
+Files are written in row groups, so read_intermediate() loads selected
+columns and row ranges without parsing the rest of the file:
+
+    path = whisper_intermediate_path('episode.mp3', 'base')
+    scores = read_intermediate(path, columns=['start', 'avg_logprob'], rows=(1000, 2000))
+
+read_corpus() concatenates one table over all stored episodes. CSV files are
+still written with intermediate_format='csv' and read by the same functions.
+pyarrow is imported on first use.
+"""
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from convscript.choices import INTERMEDIATE_FORMATS
+from convscript.path import ProjPaths
+
+DEFAULT_INTERMEDIATE_FORMAT = 'parquet'
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_COMPRESSION_LEVEL = 3
+# rows per row group, the unit read_intermediate() skips over
+PARQUET_ROW_GROUP_SIZE = 10_000
+# string columns stored as dictionary indices into the few distinct labels
+DICTIONARY_COLUMNS = ['speaker']
+FILE_EXTENSIONS: Dict[str, str] = {'parquet': 'parquet', 'csv': 'csv'}
+
+PathLike = Union[str, os.PathLike]
+
+
+def _check_format(intermediate_format: str):
+    if intermediate_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unknown intermediate format '{intermediate_format}', "
+                         f"expected one of {INTERMEDIATE_FORMATS}")
+
+
+def _format_of(path: PathLike) -> str:
+    extension = Path(path).suffix.lstrip('.')
+    for intermediate_format, format_extension in FILE_EXTENSIONS.items():
+        if extension == format_extension:
+            return intermediate_format
+    raise ValueError(f"Not an intermediate table: '{path}'")
+
+
+def whisper_intermediate_path(wav_fname: PathLike, model_type: str,
+                              intermediate_format: str = DEFAULT_INTERMEDIATE_FORMAT) -> Path:
+    """Path of the Whisper segments of an audio file in the intermediate folder"""
+    _check_format(intermediate_format)
+    base_name = os.path.splitext(os.path.basename(wav_fname))[0]
+    extension = FILE_EXTENSIONS[intermediate_format]
+    return ProjPaths.intermediate_path / f"{base_name}_whisper_{model_type}_segments.{extension}"
+
+
+def speaker_intermediate_path(wav_fname: PathLike,
+                              intermediate_format: str = DEFAULT_INTERMEDIATE_FORMAT) -> Path:
+    """Path of the speaker turns of an audio file in the intermediate folder"""
+    _check_format(intermediate_format)
+    base_name = os.path.splitext(os.path.basename(wav_fname))[0]
+    extension = FILE_EXTENSIONS[intermediate_format]
+    return ProjPaths.intermediate_path / f"{base_name}_speaker_segments.{extension}"
+
+
+def write_intermediate(df: pd.DataFrame, path: PathLike,
+                       intermediate_format: Optional[str] = None) -> Path:
+    """
+    Write one table as Parquet or CSV (chosen by the file extension unless
+    `intermediate_format` is given).
+    """
+    path = Path(path)
+    intermediate_format = intermediate_format or _format_of(path)
+    _check_format(intermediate_format)
+
+    if intermediate_format == 'csv':
+        df.to_csv(path, index=False, encoding='utf-8')
+        return path
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.reset_index(drop=True)
+    for col in DICTIONARY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = path.with_name(path.name + '.tmp')
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION,
+                   compression_level=PARQUET_COMPRESSION_LEVEL, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def save_intermediate_tables(text_df: pd.DataFrame, speaker_df: pd.DataFrame, wav_fname: PathLike,
+                             model_type: str,
+                             intermediate_format: str = DEFAULT_INTERMEDIATE_FORMAT) -> Tuple[Path, Path]:
+    """Save the Whisper segments and speaker turns of an audio file, returning both paths"""
+    _check_format(intermediate_format)
+    ProjPaths.create_directories()
+
+    whisper_path = write_intermediate(text_df, whisper_intermediate_path(wav_fname, model_type, intermediate_format),
+                                      intermediate_format)
+    speaker_path = write_intermediate(speaker_df, speaker_intermediate_path(wav_fname, intermediate_format),
+                                      intermediate_format)
+
+    return whisper_path, speaker_path
+
+
+def count_rows(path: PathLike) -> int:
+    """Number of rows of a table (read from the Parquet footer, without loading the data)"""
+    if _format_of(path) == 'csv':
+        with open(path, 'r', encoding='utf-8') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    import pyarrow.parquet as pq
+    return pq.read_metadata(path).num_rows
+
+
+def read_intermediate(path: PathLike, columns: Optional[Sequence[str]] = None,
+                      rows: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+    """
+    Load a table written by write_intermediate().
+
+    Args:
+        path: Parquet or CSV file
+        columns: Columns to load (all if None)
+        rows: Half-open range (start, stop) of row numbers to load (all if None)
+
+    Returns:
+        DataFrame with a fresh RangeIndex; speakers are categorical for Parquet files
+    """
+    start, stop = rows if rows is not None else (0, None)
+    if start < 0 or (stop is not None and stop < start):
+        raise ValueError(f"Invalid row range {rows}")
+
+    if _format_of(path) == 'csv':
+        return pd.read_csv(path, usecols=list(columns) if columns is not None else None,
+                           skiprows=range(1, start + 1),
+                           nrows=stop - start if stop is not None else None, encoding='utf-8')
+
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    stop = metadata.num_rows if stop is None else min(stop, metadata.num_rows)
+
+    # only the row groups overlapping [start, stop) are read and decompressed
+    row_groups, first_row, group_start = [], None, 0
+    for index in range(metadata.num_row_groups):
+        group_stop = group_start + metadata.row_group(index).num_rows
+        if group_start < stop and group_stop > start:
+            row_groups.append(index)
+            if first_row is None:
+                first_row = group_start
+        group_start = group_stop
+
+    columns = list(columns) if columns is not None else None
+    if not row_groups:
+        table = parquet_file.schema_arrow.empty_table()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    table = parquet_file.read_row_groups(row_groups, columns=columns)
+    table = table.slice(start - first_row, stop - start)
+
+    return table.to_pandas()
+
+
+def iter_intermediate_files(table: str = 'speaker', model_type: Optional[str] = None,
+                            intermediate_format: str = DEFAULT_INTERMEDIATE_FORMAT,
+                            directory: Optional[PathLike] = None) -> Iterable[Tuple[str, Path]]:
+    """
+    Episode names and paths of the stored 'whisper' or 'speaker' tables
+    (Whisper tables of all models unless `model_type` is given).
+    """
+    _check_format(intermediate_format)
+    directory = Path(directory) if directory is not None else ProjPaths.intermediate_path
+    extension = FILE_EXTENSIONS[intermediate_format]
+
+    if table == 'speaker':
+        suffix = f"_speaker_segments.{extension}"
+    elif table == 'whisper':
+        suffix = f"_whisper_{model_type or '*'}_segments.{extension}"
+    else:
+        raise ValueError(f"Unknown intermediate table '{table}', expected 'whisper' or 'speaker'")
+
+    for path in sorted(directory.glob(f"*{suffix}")):
+        if table == 'whisper':
+            episode = path.name.rsplit('_whisper_', 1)[0]
+        else:
+            episode = path.name[:-len(suffix)]
+        yield episode, path
+
+
+def read_corpus(table: str = 'speaker', columns: Optional[Sequence[str]] = None,
+                model_type: Optional[str] = None,
+                intermediate_format: str = DEFAULT_INTERMEDIATE_FORMAT,
+                directory: Optional[PathLike] = None) -> pd.DataFrame:
+    """One table of all stored episodes, with an `episode` column, loading only `columns`"""
+    frames: List[pd.DataFrame] = []
+    for episode, path in iter_intermediate_files(table, model_type, intermediate_format, directory):
+        df = read_intermediate(path, columns=columns)
+        df.insert(0, 'episode', episode)
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=['episode'] + list(columns or []))
+
+    corpus_df = pd.concat(frames, ignore_index=True)
+    # categories differ between episodes, concat falls back to object
+    for col in DICTIONARY_COLUMNS:
+        if col in corpus_df.columns:
+            corpus_df[col] = corpus_df[col].astype('category')
+
+    return corpus_df
@@ -0,0 +1,427 @@
+"""
+Incremental transcription of a live recording.
+
+A reader thread pulls 16-bit PCM blocks from a stream source (the microphone
+through PyAudio, or a WAV file through WavFileSource for tests and replays),
+converts them to 16 kHz mono float32, appends them to a WAV file on disk and
+to a fixed-size ring buffer. The main thread transcribes the audio that is
+not yet final whenever `step_s` seconds of new audio have arrived:
+
+    committed            transcribed    written
+    |--- final ---|------ partial ------|-- new --|
+
+Segments are re-transcribed (and emitted as partial) until the pending audio
+reaches `window_s` seconds; then every segment ending at least `holdback_s`
+before the end of the window becomes final and the ring buffer space before
+it is released. Each emitted segment carries its latency: the wall-clock
+seconds between the capture of its last sample and its emission.
+
+Speaker diarization needs the whole recording, so it runs on the WAV file
+when the recording ends, and optionally every `diarize_every_s` seconds in
+a background thread to get provisional speaker labels.
+"""
+import bisect
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from convscript.asr_backends import transcribe_with_backend, DEFAULT_ASR_BACKEND
+from convscript.audio_utils import SAMPLE_RATE
+from convscript.chunked_whisper import stitch_segments
+from convscript.segments import speaker_turns_to_df
+
+DEFAULT_WINDOW_SECONDS = 30
+DEFAULT_STEP_SECONDS = 5
+DEFAULT_HOLDBACK_SECONDS = 2
+BLOCK_FRAMES = 1024
+WAV_HEADER_BYTES = 44
+
+
+class PyAudioSource:
+    """Microphone input through PyAudio, 16-bit PCM."""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = 1, block_frames: int = BLOCK_FRAMES):
+        import pyaudio
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_frames = block_frames
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=channels, rate=sample_rate,
+                                          input=True, frames_per_buffer=block_frames)
+
+    def read(self) -> bytes:
+        # a slow consumer drops input instead of raising
+        return self._stream.read(self.block_frames, exception_on_overflow=False)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pyaudio.terminate()
+
+
+class WavFileSource:
+    """
+    Feeds a 16-bit WAV file block by block like a live stream. With `realtime`
+    each block is delivered at the pace it would be recorded at.
+    """
+
+    def __init__(self, wav_fname, block_frames: int = BLOCK_FRAMES, realtime: bool = False):
+        self._wav = wave.open(str(wav_fname), 'rb')
+        if self._wav.getsampwidth() != 2:
+            raise ValueError(f"'{wav_fname}' is not a 16-bit PCM WAV file")
+        self.sample_rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.block_frames = block_frames
+        self.realtime = realtime
+
+    def read(self) -> bytes:
+        if self.realtime:
+            time.sleep(self.block_frames / self.sample_rate)
+        return self._wav.readframes(self.block_frames)
+
+    def close(self):
+        self._wav.close()
+
+
+class Resampler:
+    """Streaming linear-interpolation resampler, continuous across blocks."""
+
+    def __init__(self, rate_in: int, rate_out: int = SAMPLE_RATE):
+        self.rate_in = rate_in
+        self.rate_out = rate_out
+        self._n_in = 0
+        self._n_out = 0
+        self._last = 0.0
+
+    def __call__(self, block: np.ndarray) -> np.ndarray:
+        if self.rate_in == self.rate_out or len(block) == 0:
+            return block
+
+        # input sample positions covered so far, including the last sample of the previous block
+        last_in = self._n_in + len(block) - 1
+        n_out_end = last_in * self.rate_out // self.rate_in + 1
+        positions = np.arange(self._n_out, n_out_end) * self.rate_in / self.rate_out
+        resampled = np.interp(positions, np.arange(self._n_in - 1, last_in + 1),
+                              np.concatenate([[self._last], block])).astype(np.float32)
+
+        self._n_in += len(block)
+        self._n_out = n_out_end
+        self._last = block[-1]
+
+        return resampled
+
+
+def pcm16_to_mono(data: bytes, channels: int) -> np.ndarray:
+    """Interleaved 16-bit PCM to mono float32 in [-1, 1]."""
+    samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the most recent samples, addressed by absolute sample
+    index. A writer that would overwrite samples not yet released by the
+    reader waits, so memory stays bounded however long the recording runs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+        self.released = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def write(self, samples: np.ndarray):
+        position = 0
+        while position < len(samples):
+            with self._condition:
+                self._condition.wait_for(lambda: self.written - self.released < self.capacity or self.closed)
+                if self.closed:
+                    return
+                n = min(len(samples) - position, self.capacity - (self.written - self.released))
+                indices = np.arange(self.written, self.written + n) % self.capacity
+                self._data[indices] = samples[position:position + n]
+                self.written += n
+                position += n
+                self._condition.notify_all()
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        with self._condition:
+            if start < self.released or end > self.written:
+                raise IndexError(f"Samples {start}-{end} are not in the buffer "
+                                 f"({self.released}-{self.written})")
+            return self._data[np.arange(start, end) % self.capacity]
+
+    def release(self, upto: int):
+        """Samples before `upto` are no longer needed."""
+        with self._condition:
+            self.released = max(self.released, min(upto, self.written))
+            self._condition.notify_all()
+
+    def wait_for(self, n_samples: int, timeout: Optional[float] = None) -> int:
+        """Wait until `n_samples` have been written in total (or the buffer is closed)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.written >= n_samples or self.closed, timeout)
+            return self.written
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def read_wav_samples(wav_fname, n_frames: Optional[int] = None) -> np.ndarray:
+    """
+    16 kHz mono samples of a WAV file written by LiveTranscriber, also while
+    it is still being written (the header is not read).
+    """
+    count = -1 if n_frames is None else n_frames
+    samples = np.fromfile(wav_fname, dtype='<i2', count=count, offset=WAV_HEADER_BYTES)
+    return samples.astype(np.float32) / 32768.0
+
+
+def print_segment(segment: Dict[str, Any]):
+    """Default segment callback, partial segments are marked with ~"""
+    marker = ' ' if segment['final'] else '~'
+    print(f"{marker}[{segment['start']:7.1f}s - {segment['end']:7.1f}s] {segment['text'].strip()}"
+          f"  ({segment['latency_s']:.1f}s latency)")
+
+
+class LiveTranscriber:
+    """
+    Transcribes a stream source while it is being recorded.
+
+    Args:
+        model_type: Whisper model (a small one keeps up more easily)
+        pyannote_token: Token for the diarization pipeline
+        window_s: Pending audio after which segments become final
+        step_s: New audio that triggers the next transcription
+        holdback_s: Segments ending this close to the end of a full window stay partial
+        diarize_every_s: Provisional diarization of the recording so far at this interval (None: only at the end)
+        diarization_window_s: Diarize in windows (see convscript.windowed_diarization)
+        on_segment: Called with every emitted segment (start, end, text, final, latency_s)
+        on_speakers: Called with the speaker table after every diarization
+        transcribe_fn: Turns 16 kHz samples into a segment table (default: the ASR backend)
+        diarize_fn: Turns 16 kHz samples into a speaker table (default: pyannote)
+    """
+
+    def __init__(self, model_type: str = 'base', pyannote_token: Optional[str] = None,
+                 backend: str = DEFAULT_ASR_BACKEND,
+                 window_s: float = DEFAULT_WINDOW_SECONDS, step_s: float = DEFAULT_STEP_SECONDS,
+                 holdback_s: float = DEFAULT_HOLDBACK_SECONDS, diarize_every_s: Optional[float] = None,
+                 diarization_window_s: Optional[float] = None,
+                 on_segment: Callable[[Dict[str, Any]], None] = print_segment,
+                 on_speakers: Optional[Callable[[pd.DataFrame], None]] = None,
+                 transcribe_fn: Optional[Callable[[np.ndarray], pd.DataFrame]] = None,
+                 diarize_fn: Optional[Callable[[np.ndarray], pd.DataFrame]] = None):
+        self.model_type = model_type
+        self.window_samples = int(window_s * SAMPLE_RATE)
+        self.step_samples = int(step_s * SAMPLE_RATE)
+        self.holdback_s = holdback_s
+        self.diarize_every_samples = int(diarize_every_s * SAMPLE_RATE) if diarize_every_s else None
+        self.on_segment = on_segment
+        self.on_speakers = on_speakers
+        self.transcribe_fn = transcribe_fn or (lambda audio: transcribe_with_backend(audio, model_type, backend))
+        self.diarize_fn = diarize_fn or self._pyannote_diarize_fn(pyannote_token, diarization_window_s)
+
+        self.ring = RingBuffer(2 * self.window_samples + self.step_samples)
+        self._stop = threading.Event()
+        self._capture_ends: List[int] = []
+        self._capture_times: List[float] = []
+        self._persisted = 0
+
+        self.final_segment_dfs: List[pd.DataFrame] = []
+        self.final_offsets_s: List[float] = []
+        self.segments: List[Dict[str, Any]] = []
+        self.steps: List[Dict[str, Any]] = []
+        self.speaker_df: Optional[pd.DataFrame] = None
+
+    @staticmethod
+    def _pyannote_diarize_fn(pyannote_token, diarization_window_s):
+        def diarize(audio):
+            from convscript.conversation_transcription import run_pyannote_stage
+            return run_pyannote_stage(audio, pyannote_token, diarization_window_s=diarization_window_s)[0]
+        return diarize
+
+    def stop(self):
+        """End the recording; the audio read so far is still transcribed."""
+        self._stop.set()
+
+    # reader thread
+
+    def _read_source(self, source, wav_file, max_samples):
+        resample = Resampler(source.sample_rate)
+        try:
+            while not self._stop.is_set() and (max_samples is None or self.ring.written < max_samples):
+                data = source.read()
+                if not data:
+                    break
+                samples = resample(pcm16_to_mono(data, source.channels))
+                if max_samples is not None:
+                    samples = samples[:max_samples - self.ring.written]
+
+                wav_file.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+                self._persisted += len(samples)
+                self._capture_ends.append(self.ring.written + len(samples))
+                self._capture_times.append(time.monotonic())
+                self.ring.write(samples)
+        finally:
+            self.ring.close()
+
+    def _capture_time(self, sample: int) -> float:
+        """Wall-clock time at which a sample was read from the source."""
+        index = min(bisect.bisect_left(self._capture_ends, sample), len(self._capture_times) - 1)
+        return self._capture_times[index]
+
+    # transcription
+
+    def _emit(self, seg_df: pd.DataFrame, offset_s: float, final: bool, now: float):
+        for row in seg_df.itertuples():
+            segment = {'start': row.start + offset_s, 'end': row.end + offset_s, 'text': row.text, 'final': final}
+            segment['latency_s'] = now - self._capture_time(int(segment['end'] * SAMPLE_RATE))
+            self.segments.append(segment)
+            self.on_segment(segment)
+
+    def _transcribe_pending(self, committed: int, end: int, last: bool) -> int:
+        """Transcribe samples committed..end, emit its segments and return the new committed position."""
+        offset_s = committed / SAMPLE_RATE
+        step_start = time.monotonic()
+        seg_df = self.transcribe_fn(self.ring.read(committed, end)).reset_index(drop=True)
+        now = time.monotonic()
+        self.steps.append({'audio_s': (end - committed) / SAMPLE_RATE,
+                           'compute_s': now - step_start,
+                           'lag_s': now - self._capture_time(end)})
+
+        is_final = np.zeros(len(seg_df), dtype=bool)
+        # at the end of the recording, or if no segment ends early enough in a full window,
+        # everything becomes final and the next window starts at `end`
+        cut = last
+        if not last and end - committed >= self.window_samples:
+            is_final = seg_df['end'].to_numpy(dtype=float) <= (end - committed) / SAMPLE_RATE - self.holdback_s
+            cut = not is_final.any()
+        if cut:
+            is_final[:] = True
+
+        final_df, partial_df = seg_df[is_final], seg_df[~is_final]
+        if len(final_df):
+            self.final_segment_dfs.append(final_df)
+            self.final_offsets_s.append(offset_s)
+        self._emit(final_df, offset_s, True, now)
+        self._emit(partial_df, offset_s, False, now)
+
+        if cut:
+            return end
+        if len(final_df):
+            return committed + int(round(final_df['end'].max() * SAMPLE_RATE))
+        return committed
+
+    def _diarize(self, n_samples: Optional[int], wav_fname) -> pd.DataFrame:
+        audio = read_wav_samples(wav_fname, n_samples)
+        speaker_df = self.diarize_fn(audio) if len(audio) else speaker_turns_to_df([])
+        self.speaker_df = speaker_df
+        if self.on_speakers is not None:
+            self.on_speakers(speaker_df)
+        return speaker_df
+
+    def run(self, source, wav_fname, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record from `source` into `wav_fname` until the source ends, `max_seconds`
+        are recorded or stop() is called (Ctrl+C also stops the recording).
+
+        Returns the final segment and speaker tables and latency metrics.
+        """
+        max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+
+        file = open(wav_fname, 'wb')
+        wav_file = wave.open(file, 'wb')
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+
+        reader = threading.Thread(target=self._read_source, args=(source, wav_file, max_samples),
+                                  name='live-audio-reader', daemon=True)
+        reader.start()
+
+        committed = transcribed = last_diarized = 0
+        diarization = None
+        with ThreadPoolExecutor(max_workers=1) as diarize_executor:
+            while True:
+                try:
+                    written = self.ring.wait_for(transcribed + self.step_samples, timeout=0.5)
+                except KeyboardInterrupt:
+                    self.stop()
+                    continue
+
+                last = self.ring.closed and self.ring.written == written
+                if not last and written - transcribed < self.step_samples:
+                    continue
+
+                end = written if last else min(written, committed + self.window_samples)
+                if end > committed:
+                    committed = self._transcribe_pending(committed, end, last)
+                    self.ring.release(committed)
+                transcribed = end
+
+                if last:
+                    break
+
+                if self.diarize_every_samples and self._persisted - last_diarized >= self.diarize_every_samples \
+                        and (diarization is None or diarization.done()):
+                    last_diarized = self._persisted
+                    file.flush()
+                    diarization = diarize_executor.submit(self._diarize, last_diarized, wav_fname)
+
+        reader.join()
+        wav_file.close()
+        file.close()
+        source.close()
+
+        text_df = stitch_segments(self.final_segment_dfs, self.final_offsets_s).reset_index()
+        speaker_df = self._diarize(None, wav_fname)
+
+        latencies = [segment['latency_s'] for segment in self.segments if segment['final']]
+        return {'text_df': text_df,
+                'speaker_df': speaker_df,
+                'duration_s': self._persisted / SAMPLE_RATE,
+                'n_transcriptions': len(self.steps),
+                'mean_latency_s': float(np.mean(latencies)) if latencies else float('nan'),
+                'max_latency_s': float(np.max(latencies)) if latencies else float('nan'),
+                'max_lag_s': max((step['lag_s'] for step in self.steps), default=float('nan')),
+                'rtf': sum(step['compute_s'] for step in self.steps) / max(self._persisted / SAMPLE_RATE, 1e-9)}
+
+
+def live_transcript(source, wav_fname, model_type: str, pyannote_token: Optional[str], output_filename: str,
+                    max_seconds: Optional[float] = None, output_format: str = 'txt', **transcriber_kwargs):
+    """
+    Transcribe a live source, keeping the recording in `wav_fname` and saving
+    the final transcript with speaker labels to the outputs folder.
+
+    Returns the transcript path and the run metrics.
+    """
+    from convscript.conversation_transcription import combine_whisper_and_pyannote, \
+        combine_consecutive_speakers, save_final_transcript_df
+
+    transcriber = LiveTranscriber(model_type, pyannote_token, **transcriber_kwargs)
+    result = transcriber.run(source, wav_fname, max_seconds=max_seconds)
+
+    text_speaker_df = combine_consecutive_speakers(combine_whisper_and_pyannote(result['text_df'],
+                                                                                result['speaker_df']))
+    output_file, n_chars = save_final_transcript_df(text_speaker_df, output_filename, wav_fname,
+                                                    model_type, output_format=output_format)
+
+    print(f"\n=== LIVE TRANSCRIPTION SUMMARY ===")
+    print(f"Recorded: {result['duration_s']:.1f}s to {wav_fname}")
+    print(f"Transcriptions: {result['n_transcriptions']} (realtime factor {result['rtf']:.2f})")
+    print(f"Latency of final segments: mean {result['mean_latency_s']:.1f}s, max {result['max_latency_s']:.1f}s")
+    print(f"Final transcript saved to: {output_file}")
+
+    return output_file, result
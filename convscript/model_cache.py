@@ -0,0 +1,180 @@
+"""
+Process-wide cache for loaded models (Whisper, pyannote pipelines).
+
+Loading model weights takes seconds to tens of seconds, so models are kept
+in memory and reused across files. Entries are keyed by a tuple such as
+``('whisper', model_type, device, None)`` and evicted in least-recently-used
+order once the configured memory budget is exceeded.
+"""
+import gc
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+DEFAULT_MEMORY_BUDGET_MB = float(os.environ.get('CONVSCRIPT_MODEL_CACHE_MB', 8192))
+
+
+def resolve_device(device: Optional[str] = None) -> str:
+    """Return the given device, or 'cuda' if available and 'cpu' otherwise."""
+    if device:
+        return device
+    try:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+
+def estimate_model_size(model: Any, max_depth: int = 3) -> int:
+    """
+    Estimate the memory footprint of a model in bytes.
+
+    Sums parameters and buffers of all torch modules reachable from `model`
+    (the model itself or attributes up to `max_depth` levels deep, which
+    covers pyannote pipelines wrapping several networks).
+    """
+    seen = set()
+    total = 0
+
+    def visit(obj, depth):
+        nonlocal total
+        if id(obj) in seen or depth > max_depth:
+            return
+        seen.add(id(obj))
+
+        if hasattr(obj, 'parameters') and hasattr(obj, 'buffers'):
+            try:
+                for tensor in list(obj.parameters()) + list(obj.buffers()):
+                    if id(tensor) not in seen:
+                        seen.add(id(tensor))
+                        total += tensor.numel() * tensor.element_size()
+                return
+            except Exception:
+                pass
+
+        if hasattr(obj, '__dict__'):
+            for value in vars(obj).values():
+                visit(value, depth + 1)
+
+    visit(model, 0)
+    return total
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files in a directory (e.g. a CTranslate2 model), following symlinks."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class ModelCache:
+    """
+    Thread-safe LRU cache of loaded models with a memory budget.
+
+    A single model larger than the budget is still cached, but evicts
+    everything else.
+    """
+
+    def __init__(self, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                 size_fn: Callable[[Any], int] = estimate_model_size):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 ** 2)
+        self.size_fn = size_fn
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[Hashable]:
+        """Cached keys, least recently used first."""
+        with self._lock:
+            return list(self._entries.keys())
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def get(self, key: Hashable, loader: Callable[[], Any],
+            size_fn: Optional[Callable[[Any], int]] = None) -> Any:
+        """
+        Return the cached model for `key`, calling `loader()` on a miss.
+
+        Different keys are loaded in parallel, concurrent requests for the
+        same key wait for a single load. `size_fn` replaces the cache's size
+        estimate for models that are not torch modules (e.g. CTranslate2).
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            model = loader()
+            size = (size_fn or self.size_fn)(model)
+
+            with self._lock:
+                self._evict(size)
+                self._entries[key] = (model, size)
+                self._loading.pop(key, None)
+            return model
+
+    def set_memory_budget(self, memory_budget_mb: float):
+        """Change the memory budget and evict entries that no longer fit."""
+        with self._lock:
+            self.memory_budget_bytes = int(memory_budget_mb * 1024 ** 2)
+            self._evict(0)
+
+    def unload(self, key: Optional[Hashable] = None) -> int:
+        """
+        Drop one entry (or all entries if `key` is None).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if key is None:
+                n_removed = len(self._entries)
+                self._entries.clear()
+            else:
+                n_removed = int(self._entries.pop(key, None) is not None)
+
+        if n_removed:
+            _release_memory()
+        return n_removed
+
+    def _evict(self, incoming_bytes: int):
+        evicted = False
+        while self._entries and self.total_bytes + incoming_bytes > self.memory_budget_bytes:
+            key, _ = self._entries.popitem(last=False)
+            print(f"Evicting model from cache: {key}")
+            evicted = True
+
+        if evicted:
+            _release_memory()
+
+
+def _release_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+MODEL_CACHE = ModelCache()
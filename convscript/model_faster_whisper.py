@@ -0,0 +1,49 @@
+import os
+
+from convscript.model_cache import MODEL_CACHE, resolve_device, directory_size
+from convscript.segments import whisper_segments_to_df, WHISPER_SEGMENT_DTYPES
+
+def default_compute_type(device):
+    """int8 quantization on CPU, float16 on GPU"""
+    return 'float16' if device == 'cuda' else 'int8'
+
+def load_faster_whisper_model(model_type='base', device=None, compute_type=None):
+    """
+    Load a faster-whisper (CTranslate2) model through the process-wide model cache.
+
+    CTranslate2 models hold no torch tensors, so their size in the cache is
+    that of the model files on disk.
+    """
+    device = resolve_device(device)
+    compute_type = compute_type or default_compute_type(device)
+    key = ('faster-whisper', model_type, device, compute_type)
+    model_paths = {}
+
+    def _load():
+        from faster_whisper import WhisperModel
+        from faster_whisper.utils import download_model
+
+        model_paths['path'] = model_type if os.path.isdir(model_type) else download_model(model_type)
+        return WhisperModel(model_paths['path'], device=device, compute_type=compute_type)
+
+    return MODEL_CACHE.get(key, _load, size_fn=lambda model: directory_size(model_paths['path']))
+
+def faster_whisper_inference(audio, model_type='base', device=None, compute_type=None, beam_size=5):
+    """
+    Transcribe a file path or 16 kHz float32 samples, returning the segments as dicts
+    with the same fields as openai-whisper's result['segments'].
+    """
+    model = load_faster_whisper_model(model_type, device=device, compute_type=compute_type)
+    segments, info = model.transcribe(audio, beam_size=beam_size)
+
+    # segments is a generator, transcription happens while iterating;
+    # ids are counted from 0 as in openai-whisper
+    return [dict({field: getattr(segment, field) for field in WHISPER_SEGMENT_DTYPES if hasattr(segment, field)},
+                 id=segment_id)
+            for segment_id, segment in enumerate(segments)]
+
+def faster_whisper_inference_with_segments_df(audio, model_type='base', device=None, compute_type=None):
+
+    segments = faster_whisper_inference(audio, model_type=model_type, device=device, compute_type=compute_type)
+
+    return whisper_segments_to_df(segments)
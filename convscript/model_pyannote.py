@@ -1,8 +1,16 @@
 import os
 from dotenv import load_dotenv
-from pyannote.audio import Pipeline
 import pandas as pd
 import numpy as np
+
+from convscript.instrumentation import span
+from convscript.model_cache import MODEL_CACHE, resolve_device
+from convscript.segments import speaker_turns_to_df
+
+PYANNOTE_PIPELINE = "pyannote/speaker-diarization"
+PYANNOTE_REVISION = "2.1"
+# speaker embedding model of the 2.1 pipeline
+PYANNOTE_EMBEDDING = "speechbrain/spkrec-ecapa-voxceleb"
 #
 
 def get_pyannote_access_token(dotenv_path):
@@ -12,13 +20,61 @@ def get_pyannote_access_token(dotenv_path):
 
     return pyannote_token
 
-def appyl_pyannote_model(pyannote_token, fname):
+def load_pyannote_pipeline(pyannote_token, revision=PYANNOTE_REVISION, device=None, instance=0):
+    """
+    Load the diarization pipeline through the process-wide model cache.
     
-    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization@2.1",
-                                        use_auth_token=pyannote_token)
+    A pipeline must not be called from several threads at once; threads that
+    diarize in parallel each use their own `instance`.
+    """
+    device = resolve_device(device)
+    key = ('pyannote', PYANNOTE_PIPELINE, device, revision, instance)
+
+    def _load():
+        from pyannote.audio import Pipeline
+        with span('load_pyannote_pipeline', revision=revision, device=device):
+            pipeline = Pipeline.from_pretrained(f"{PYANNOTE_PIPELINE}@{revision}",
+                                                use_auth_token=pyannote_token)
+            if device != 'cpu' and hasattr(pipeline, 'to'):
+                import torch
+                pipeline.to(torch.device(device))
+        return pipeline
+
+    return MODEL_CACHE.get(key, _load)
+
+def load_speaker_embedding(pyannote_token, device=None, instance=0):
+    """Load the pipeline's speaker embedding model (one `instance` per thread) through the model cache"""
+    device = resolve_device(device)
+    key = ('pyannote_embedding', PYANNOTE_EMBEDDING, device, instance)
+
+    def _load():
+        import torch
+        from pyannote.audio.pipelines.speaker_verification import PretrainedSpeakerEmbedding
+        with span('load_speaker_embedding', device=device):
+            return PretrainedSpeakerEmbedding(PYANNOTE_EMBEDDING, device=torch.device(device),
+                                              use_auth_token=pyannote_token)
+
+    return MODEL_CACHE.get(key, _load)
+
+def waveform_input(audio, sample_rate=16000):
+    """Wrap a decoded mono float32 array as in-memory pyannote input"""
+    import torch
+    
+    waveform = torch.from_numpy(np.asarray(audio, dtype=np.float32)).unsqueeze(0)
+    
+    return {'waveform': waveform, 'sample_rate': sample_rate}
+
+def appyl_pyannote_model(pyannote_token, fname, revision=PYANNOTE_REVISION, instance=0):
+    """Run diarization on an audio file path or a decoded 16 kHz mono array"""
+    
+    pipeline = load_pyannote_pipeline(pyannote_token, revision=revision, instance=instance)
+    
+    if isinstance(fname, np.ndarray):
+        fname = waveform_input(fname)
 
     # apply the pipeline to an audio file
-    diarization = pipeline(fname)
+    with span('pyannote_inference'):
+        diarization = pipeline(fname)
 
     return diarization
 
@@ -31,18 +87,12 @@ def pyannote_inference_df(fname, pyannote_token):
 
 def diarization_to_df(diarization):
 
-    seg_info_list = []
-    for speech_turn, track, speaker in diarization.itertracks(yield_label=True):
-        
-        this_seg_info = {'start': np.round(speech_turn.start, 2),
-                        'end': np.round(speech_turn.end, 2),
-                        'speaker': speaker}
-        this_df = pd.DataFrame.from_dict({track: this_seg_info},
-                                        orient='index')
-        
-        seg_info_list.append(this_df)
-        
-    all_seg_infos_df = pd.concat(seg_info_list, axis=0)
-    all_seg_infos_df = all_seg_infos_df.reset_index()
-    
-    return all_seg_infos_df
\ No newline at end of file
+    seg_info_list = [{'index': track,
+                      'start': speech_turn.start,
+                      'end': speech_turn.end,
+                      'speaker': speaker}
+                     for speech_turn, track, speaker in diarization.itertracks(yield_label=True)]
+    
+    all_seg_infos_df = speaker_turns_to_df(seg_info_list)
+    
+    return all_seg_infos_df
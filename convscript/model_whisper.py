@@ -1,32 +1,36 @@
-import whisper
 import pandas as pd
 
+from convscript.instrumentation import span
+from convscript.model_cache import MODEL_CACHE, resolve_device
+from convscript.segments import whisper_segments_to_df
+
+def load_whisper_model(model_type='base', device=None):
+    """Load a Whisper model through the process-wide model cache"""
+    device = resolve_device(device)
+    key = ('whisper', model_type, device, None)
+
+    def _load():
+        import whisper
+        with span('load_whisper_model', model_type=model_type, device=device):
+            return whisper.load_model(model_type, device=device)
+
+    return MODEL_CACHE.get(key, _load)
+
 def whisper_inference(filename, model_type='base', 
-                      verbose=False):
+                      verbose=False, device=None):
     
-    model = whisper.load_model(model_type)
-    result = model.transcribe(filename, 
-                              verbose=verbose)
+    model = load_whisper_model(model_type, device=device)
+    with span('whisper_inference', model_type=model_type) as inference_span:
+        result = model.transcribe(filename, 
+                                  verbose=verbose)
+        inference_span.set(n_segments=len(result['segments']))
 
     return result
 
 def whisper_inference_with_segments_df(fname, model_type='base'):
     
     result = whisper_inference(fname, model_type=model_type)
-
-    all_seg_df_list = []
-    
-    for this_seg in result['segments']:
-        if 'tokens' in this_seg.keys():
-            this_seg.pop('tokens')
-
-        this_df = pd.DataFrame.from_dict({0: this_seg}, 
-                                        orient='index')
-        
-        all_seg_df_list.append(this_df)
-        
-    all_seg_df = pd.concat(all_seg_df_list, axis=0)
-    all_seg_df = all_seg_df.set_index('id')
+    all_seg_df = whisper_segments_to_df(result['segments'])
     
     return all_seg_df
 
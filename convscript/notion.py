@@ -1,18 +1,62 @@
 """
 Notion integration for uploading transcripts to a Notion database.
 """
+import bisect
+import hashlib
+import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Dict, Any, Callable, Iterator
+import httpx
+import numpy as np
 from notion_client import Client
-from dotenv import load_dotenv
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError, RequestTimeoutError
 
-load_dotenv()
+from convscript.path import ProjPaths
+from convscript.rate_limit import TokenBucket
+from convscript.choices import NOTION_UPLOAD_MODES
+from convscript.instrumentation import timed, current_span, propagate, file_size
+
+# Notion allows an average of 3 requests per second per integration
+NOTION_REQUESTS_PER_SECOND = 3
+NOTION_UPLOAD_CONCURRENCY = 3
+NOTION_MAX_RETRIES = 5
+NOTION_RATE_LIMITER = TokenBucket(rate=NOTION_REQUESTS_PER_SECOND)
+
+# Database schemas are fetched once per process; set NOTION_SCHEMA_CACHE_TTL (seconds)
+# to also reuse them across runs from data/cache/notion_schemas.json (None: read it when needed,
+# after the .env file has been loaded)
+NOTION_SCHEMA_CACHE_TTL: Optional[float] = None
+NOTION_SCHEMA_CACHE_FILE = ProjPaths.cache_path / "notion_schemas.json"
+_SCHEMA_CACHE: Dict[str, Dict[str, Any]] = {}
+_schema_lock = threading.Lock()
+
+# Long transcripts go to one page whose blocks are appended in batches
+# ('single_page'), or are split into several "Part N" pages ('multi_page')
+NOTION_MAX_BLOCKS_PER_REQUEST = 100
+NOTION_MAX_TEXT_LENGTH = 2000
+NOTION_MAX_RICH_TEXT_ITEMS = 100
+# characters of all rich_text segments of one block
+NOTION_MAX_BLOCK_CHARS = 20_000
+# Notion rejects request bodies over 500 KB; leaves room for the page properties
+NOTION_MAX_REQUEST_BYTES = 400_000
+NOTION_UPLOAD_STATE_FILE = ProjPaths.cache_path / "notion_uploads.json"
+_upload_state_lock = threading.Lock()
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
 
 def get_notion_credentials() -> tuple:
-    """Get Notion credentials from environment variables."""
+    """Get Notion credentials from environment variables (or the .env file)."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     write_token = os.getenv("NOTION_WRITE_API_TOKEN")
     database_id = os.getenv("NOTION_TRANSCRIPTS_DATABASE_ID")
     
@@ -23,10 +67,173 @@ def get_notion_credentials() -> tuple:
         
     return write_token, database_id
 
+def _schema_cache_ttl() -> float:
+    if NOTION_SCHEMA_CACHE_TTL is not None:
+        return NOTION_SCHEMA_CACHE_TTL
+    return float(os.getenv("NOTION_SCHEMA_CACHE_TTL", 0))
+
+def get_notion_client(write_token: str) -> Client:
+    """
+    Create a Notion client. NOTION_API_BASE_URL can point it to another
+    server (e.g. a local fake for tests).
+    """
+    base_url = os.getenv("NOTION_API_BASE_URL")
+    if base_url:
+        return Client(auth=write_token, base_url=base_url)
+    return Client(auth=write_token)
+
+def _is_transient_error(e: Exception) -> bool:
+    """5xx responses, timeouts and connection errors: the request may or may not have been applied."""
+    if isinstance(e, HTTPResponseError):
+        return e.status >= 500
+    return isinstance(e, (RequestTimeoutError, httpx.TransportError))
+
+def retry_after_seconds(retry_after: Optional[str], default: float) -> float:
+    """Wait given by a Retry-After header: seconds or an HTTP-date (`default` if missing or invalid)."""
+    if not retry_after:
+        return default
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError, IndexError):
+        return default
+    if retry_at is None or retry_at.tzinfo is None:
+        return default
+    return max(0.0, retry_at.timestamp() - time.time())
+
+@timed('notion_request')
+def notion_request(func: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+    """
+    Call a Notion API method within the shared rate limit.
+    
+    Rate-limited (429) responses pause all uploading threads for the
+    Retry-After period. For idempotent calls, 5xx responses, timeouts and
+    connection errors are retried with exponential backoff. Other errors,
+    and those of non-idempotent calls, are raised immediately.
+    
+    Args:
+        func: Client method, e.g. client.pages.create
+        idempotent: False for calls that must not be sent twice (pages.create,
+            blocks.children.append): only a 429 guarantees they were not applied
+        
+    Returns:
+        The API response
+    """
+    current_span().set(method=getattr(func, '__qualname__', repr(func)))
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        NOTION_RATE_LIMITER.acquire()
+        current_span().set(attempts=attempt + 1)
+        try:
+            return func(*args, **kwargs)
+        
+        except HTTPResponseError as e:
+            if attempt == NOTION_MAX_RETRIES or not (e.status == 429 or (idempotent and e.status >= 500)):
+                raise
+            
+            wait = retry_after_seconds(e.headers.get('Retry-After'), default=0.5 * 2 ** attempt)
+            print(f"⏳ Notion returned {e.status}, retrying in {wait:.1f}s")
+            if e.status == 429:
+                NOTION_RATE_LIMITER.pause(wait)
+            else:
+                time.sleep(wait)
+        
+        except (RequestTimeoutError, httpx.TransportError) as e:
+            if attempt == NOTION_MAX_RETRIES or not idempotent:
+                raise
+            wait = 0.5 * 2 ** attempt
+            print(f"⏳ Notion request failed ({e}), retrying in {wait:.1f}s")
+            time.sleep(wait)
+
 def get_today_date() -> str:
     """Get today's date in ISO format."""
     return datetime.now().date().isoformat()
 
+def _load_schema_file() -> Dict[str, Any]:
+    if not NOTION_SCHEMA_CACHE_FILE.exists():
+        return {}
+    try:
+        with open(NOTION_SCHEMA_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {}
+
+def _save_schema_file(schemas: Dict[str, Any]):
+    NOTION_SCHEMA_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = NOTION_SCHEMA_CACHE_FILE.with_suffix(f'.tmp{os.getpid()}')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(schemas, f)
+    os.replace(tmp_path, NOTION_SCHEMA_CACHE_FILE)
+
+def _first_property_of_type(properties: Dict[str, Any], prop_type: str) -> Optional[str]:
+    return next((name for name, data in properties.items() if data.get('type') == prop_type), None)
+
+def get_database_schema(database_id: Optional[str] = None, client: Optional[Client] = None,
+                        refresh: bool = False) -> Dict[str, Any]:
+    """
+    Get the properties of a database and the names of its title, date and URL properties.
+    
+    The schema is fetched from Notion once per database id and process. If
+    NOTION_SCHEMA_CACHE_TTL is set, it is also stored on disk and reused by
+    later runs for that many seconds.
+    
+    Args:
+        database_id: Database ID. If None, uses NOTION_TRANSCRIPTS_DATABASE_ID.
+        client: Notion client. If None, one is created from the credentials.
+        refresh: Fetch the schema again even if it is cached
+        
+    Returns:
+        Dictionary with 'properties' and the property names 'title', 'date' and 'url' (None if missing)
+    """
+    if database_id is None or client is None:
+        write_token, default_database_id = get_notion_credentials()
+        database_id = database_id or default_database_id
+        client = client or get_notion_client(write_token)
+    
+    with _schema_lock:
+        if not refresh and database_id in _SCHEMA_CACHE:
+            return _SCHEMA_CACHE[database_id]
+        
+        schema = None
+        ttl = _schema_cache_ttl()
+        if not refresh and ttl > 0:
+            record = _load_schema_file().get(database_id)
+            if record and time.time() - record['fetched'] < ttl:
+                schema = record['schema']
+        
+        if schema is None:
+            database = notion_request(client.databases.retrieve, database_id)
+            properties = database.get('properties', {})
+            schema = {'properties': properties,
+                      'title': _first_property_of_type(properties, 'title'),
+                      'date': _first_property_of_type(properties, 'date'),
+                      'url': _first_property_of_type(properties, 'url')}
+            
+            if ttl > 0:
+                schemas = _load_schema_file()
+                schemas[database_id] = {'fetched': time.time(), 'schema': schema}
+                _save_schema_file(schemas)
+        
+        _SCHEMA_CACHE[database_id] = schema
+        return schema
+
+def invalidate_database_schema(database_id: Optional[str] = None):
+    """
+    Forget the cached schema of a database (all databases if None), in memory and on disk.
+    """
+    with _schema_lock:
+        if database_id is None:
+            _SCHEMA_CACHE.clear()
+        else:
+            _SCHEMA_CACHE.pop(database_id, None)
+        
+        if NOTION_SCHEMA_CACHE_FILE.exists():
+            schemas = {} if database_id is None else _load_schema_file()
+            schemas.pop(database_id, None)
+            _save_schema_file(schemas)
+
 def check_database_properties() -> Optional[Dict[str, Any]]:
     """
     Check what properties are available in the transcripts database.
@@ -35,11 +242,7 @@ def check_database_properties() -> Optional[Dict[str, Any]]:
         Dictionary of database properties or None if failed
     """
     try:
-        write_token, database_id = get_notion_credentials()
-        client = Client(auth=write_token)
-        
-        database = client.databases.retrieve(database_id)
-        properties = database.get('properties', {})
+        properties = get_database_schema(refresh=True)['properties']
         
         print("📋 Available database properties:")
         for prop_name, prop_data in properties.items():
@@ -52,30 +255,28 @@ def check_database_properties() -> Optional[Dict[str, Any]]:
         print(f"❌ Error checking database properties: {e}")
         return None
 
+def find_title_property_name() -> str:
+    """
+    Find the name of the title property in the database, using the cached schema.
+    
+    Returns:
+        Property name, or "title" (accepted by Notion as the title property's id) if unknown
+    """
+    try:
+        return get_database_schema()['title'] or "title"
+    except Exception as e:
+        print(f"❌ Error finding title property: {e}")
+        return "title"
+
 def find_date_property_name() -> Optional[str]:
     """
-    Find the correct name of a date property in the database.
+    Find the correct name of a date property in the database, using the cached schema.
     
     Returns:
         Property name if found, None otherwise
     """
     try:
-        properties = check_database_properties()
-        if not properties:
-            return None
-        
-        # Look for date properties
-        date_properties = []
-        for prop_name, prop_data in properties.items():
-            if prop_data.get('type') == 'date':
-                date_properties.append(prop_name)
-        
-        if date_properties:
-            print(f"📅 Found date properties: {date_properties}")
-            return date_properties[0]  # Return first date property
-        else:
-            print("📅 No date properties found in database")
-            return None
+        return get_database_schema()['date']
             
     except Exception as e:
         print(f"❌ Error finding date property: {e}")
@@ -83,28 +284,13 @@ def find_date_property_name() -> Optional[str]:
 
 def find_url_property_name() -> Optional[str]:
     """
-    Find the correct name of a URL property in the database.
+    Find the correct name of a URL property in the database, using the cached schema.
     
     Returns:
         Property name if found, None otherwise
     """
     try:
-        properties = check_database_properties()
-        if not properties:
-            return None
-        
-        # Look for URL properties
-        url_properties = []
-        for prop_name, prop_data in properties.items():
-            if prop_data.get('type') == 'url':
-                url_properties.append(prop_name)
-        
-        if url_properties:
-            print(f"🔗 Found URL properties: {url_properties}")
-            return url_properties[0]  # Return first URL property
-        else:
-            print("🔗 No URL properties found in database")
-            return None
+        return get_database_schema()['url']
             
     except Exception as e:
         print(f"❌ Error finding URL property: {e}")
@@ -216,6 +402,94 @@ def safe_filename(title: str, max_length: int = 200) -> str:
     
     return safe_title
 
+def _iter_pieces(text: str, separator: re.Pattern) -> Iterator[str]:
+    """Yield the pieces of text between separator matches, without building a list."""
+    start = 0
+    for match in separator.finditer(text):
+        yield text[start:match.start()]
+        start = match.end()
+    yield text[start:]
+
+def _rich_text(content: str, annotations: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    item = {"type": "text", "text": {"content": content}}
+    if annotations:
+        item["annotations"] = annotations
+    return item
+
+def _paragraph_block(rich_text: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text}}
+
+def iter_paragraph_blocks(paragraph: str, max_length: int = NOTION_MAX_TEXT_LENGTH) -> Iterator[Dict[str, Any]]:
+    """
+    Convert one paragraph of text to paragraph blocks within Notion's size limits.
+    
+    Short paragraphs become a single block. Long ones are cut into rich_text
+    segments of at most max_length characters, at the last sentence end that
+    fits (or the last space, for very long sentences), with up to 100 segments
+    and NOTION_MAX_BLOCK_CHARS characters per block. The segments join back to
+    the exact paragraph text.
+    
+    Args:
+        paragraph: Text of the paragraph
+        max_length: Maximum characters per rich_text segment
+        
+    Yields:
+        Notion paragraph blocks
+    """
+    if len(paragraph) <= max_length:
+        yield _paragraph_block([_rich_text(paragraph)])
+        return
+    
+    # positions right after the whitespace following a sentence end
+    sentence_ends = [match.end() for match in _SENTENCE_BREAK.finditer(paragraph)]
+    
+    rich_text = []
+    n_chars = 0
+    start = 0
+    while start < len(paragraph):
+        end = start + max_length
+        if end < len(paragraph):
+            i = bisect.bisect_right(sentence_ends, end) - 1
+            if i >= 0 and sentence_ends[i] > start:
+                end = sentence_ends[i]
+            else:
+                space = paragraph.rfind(' ', start, end)
+                if space > start:
+                    end = space + 1
+        
+        if rich_text and (len(rich_text) == NOTION_MAX_RICH_TEXT_ITEMS or
+                          n_chars + end - start > NOTION_MAX_BLOCK_CHARS):
+            yield _paragraph_block(rich_text)
+            rich_text = []
+            n_chars = 0
+        
+        rich_text.append(_rich_text(paragraph[start:end]))
+        n_chars += end - start
+        start = end
+    
+    if rich_text:
+        yield _paragraph_block(rich_text)
+
+def iter_notion_blocks(content: str) -> Iterator[Dict[str, Any]]:
+    """
+    Convert plain text content to Notion paragraph blocks in a single pass.
+    Paragraphs are separated by blank lines.
+    
+    Args:
+        content: Plain text content from transcript
+        
+    Yields:
+        Notion block objects (no limit on their number applied here)
+    """
+    if not content.strip():
+        yield _paragraph_block([_rich_text("Empty transcript")])
+        return
+    
+    for paragraph in _iter_pieces(content.strip(), _PARAGRAPH_BREAK):
+        paragraph = paragraph.strip()
+        if paragraph:
+            yield from iter_paragraph_blocks(paragraph)
+
 def markdown_to_notion_blocks(content: str) -> List[Dict[str, Any]]:
     """
     Convert plain text content to Notion blocks.
@@ -227,81 +501,80 @@ def markdown_to_notion_blocks(content: str) -> List[Dict[str, Any]]:
     Returns:
         List of Notion block objects (no limit applied here)
     """
-    if not content.strip():
-        return [{
-            "object": "block",
-            "type": "paragraph",
-            "paragraph": {"rich_text": [{"type": "text", "text": {"content": "Empty transcript"}}]}
-        }]
-    
-    # Split content into paragraphs (by double newlines or long single newlines)
-    paragraphs = re.split(r'\n\s*\n', content.strip())
+    return list(iter_notion_blocks(content))
+
+def transcript_df_to_notion_blocks(text_speaker_df) -> Iterator[Dict[str, Any]]:
+    """
+    Convert a speaker-attributed transcript to Notion blocks without going through the text file.
+    Every turn gets a header block (gray timestamps, bold speaker) followed by its text.
     
-    blocks = []
-    for paragraph in paragraphs:
-        paragraph = paragraph.strip()
-        if not paragraph:
-            continue
-            
-        # Split very long paragraphs to avoid Notion's limits
-        if len(paragraph) > 1900:  # Leave some buffer under 2000 char limit
-            # Split at sentence boundaries when possible
-            sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-            current_block = ""
-            
-            for sentence in sentences:
-                if len(current_block + sentence) > 1900:
-                    if current_block:
-                        blocks.append({
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {"rich_text": [{"type": "text", "text": {"content": current_block.strip()}}]}
-                        })
-                    current_block = sentence
-                else:
-                    current_block += (" " if current_block else "") + sentence
-            
-            if current_block:
-                blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": current_block.strip()}}]}
-                })
-        else:
-            blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {"rich_text": [{"type": "text", "text": {"content": paragraph}}]}
-            })
+    Args:
+        text_speaker_df: DataFrame with start, end, speaker and text columns
+        
+    Yields:
+        Notion block objects
+    """
+    starts = np.round(text_speaker_df['start'].to_numpy(dtype=float), 2).tolist()
+    ends = np.round(text_speaker_df['end'].to_numpy(dtype=float), 2).tolist()
     
-    return blocks
+    for start, end, speaker, text in zip(starts, ends,
+                                         text_speaker_df['speaker'].tolist(),
+                                         text_speaker_df['text'].tolist()):
+        yield _paragraph_block([_rich_text(f"{start} - {end}: ", {"color": "gray"}),
+                                _rich_text(str(speaker), {"bold": True})])
+        
+        text = str(text).strip()
+        if text:
+            yield from iter_paragraph_blocks(text)
+
+def block_request_size(block: Dict[str, Any]) -> int:
+    """Size of a block in a request body (an upper bound: non-ASCII characters are counted escaped)."""
+    return len(json.dumps(block))
+
+def request_batch_end(blocks: List[Dict[str, Any]], start: int = 0,
+                      max_blocks: int = NOTION_MAX_BLOCKS_PER_REQUEST,
+                      max_bytes: int = NOTION_MAX_REQUEST_BYTES) -> int:
+    """
+    End of the batch of blocks from `start` that fits into one request:
+    at most `max_blocks` blocks and `max_bytes` of JSON (but at least one block).
+    """
+    end, n_bytes = start, 0
+    while end < len(blocks) and end - start < max_blocks:
+        n_bytes += block_request_size(blocks[end])
+        if end > start and n_bytes > max_bytes:
+            break
+        end += 1
+    return end
 
-def split_blocks_into_parts(blocks: List[Dict[str, Any]], max_blocks_per_part: int = 95) -> List[List[Dict[str, Any]]]:
+def split_blocks_into_parts(blocks: List[Dict[str, Any]], max_blocks_per_part: int = 95,
+                            max_bytes_per_part: int = NOTION_MAX_REQUEST_BYTES) -> List[List[Dict[str, Any]]]:
     """
-    Split blocks into multiple parts to handle Notion's 100-block limit.
+    Split blocks into multiple parts to handle Notion's 100-block and request size limits.
     
     Args:
         blocks: List of Notion blocks
         max_blocks_per_part: Maximum blocks per part (default 95 to leave room for navigation)
+        max_bytes_per_part: Maximum JSON size of the blocks of a part
         
     Returns:
         List of block lists, one for each part
     """
-    if len(blocks) <= max_blocks_per_part:
-        return [blocks]
-    
     parts = []
     current_part = []
+    n_bytes = 0
     
     for block in blocks:
-        if len(current_part) >= max_blocks_per_part:
+        size = block_request_size(block)
+        if current_part and (len(current_part) >= max_blocks_per_part or n_bytes + size > max_bytes_per_part):
             parts.append(current_part)
             current_part = []
+            n_bytes = 0
         
         current_part.append(block)
+        n_bytes += size
     
     # Add remaining blocks
-    if current_part:
+    if current_part or not parts:
         parts.append(current_part)
     
     return parts
@@ -355,10 +628,12 @@ def add_navigation_to_parts(parts: List[List[Dict[str, Any]]], page_urls: List[s
     
     return updated_parts
 
-def upload_transcript_to_notion(file_path: str, title: Optional[str] = None, date: Optional[str] = None, url: Optional[str] = None, include_date: bool = True) -> Optional[str]:
+@timed('notion_upload')
+def upload_transcript_to_notion(file_path: str, title: Optional[str] = None, date: Optional[str] = None, url: Optional[str] = None, include_date: bool = True, upload_mode: str = 'single_page', text_speaker_df=None) -> Optional[str]:
     """
     Upload a transcript file to Notion database.
-    Automatically splits long transcripts into multiple pages if needed.
+    Long transcripts are appended to a single page in batches, or split into
+    multiple pages with upload_mode='multi_page'.
     
     Args:
         file_path: Path to the transcript text file
@@ -366,15 +641,21 @@ def upload_transcript_to_notion(file_path: str, title: Optional[str] = None, dat
         date: Optional custom date in ISO format (YYYY-MM-DD). If None, uses today.
         url: Optional URL to store in URL property of the Notion page.
         include_date: Whether to try to set a date property (default True). Set False if database has no date property.
+        upload_mode: 'single_page' (default) or 'multi_page'
+        text_speaker_df: Optional transcript DataFrame. If given, blocks are built from it
+            (with separate speaker/timestamp header blocks) instead of parsing the file.
         
     Returns:
         Page URL of first part if successful, None otherwise. 
         For multi-part uploads, returns URL of Part I.
     """
     try:
+        current_span().set(mode=upload_mode)
+        current_span().add_bytes(file_size(file_path))
+        
         # Get credentials
         write_token, database_id = get_notion_credentials()
-        client = Client(auth=write_token)
+        client = get_notion_client(write_token)
         
         # Validate file exists and is readable
         if not os.path.exists(file_path):
@@ -384,39 +665,56 @@ def upload_transcript_to_notion(file_path: str, title: Optional[str] = None, dat
         if not file_path.endswith('.txt'):
             print(f"Warning: File '{file_path}' is not a .txt file")
         
-        # Read transcript content
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
-            print(f"Error reading file '{file_path}': {e}")
-            return None
-            
-        if not content.strip():
-            print(f"Warning: File '{file_path}' is empty")
-            content = f"Empty transcript file: {file_path}"
-        
         # Get title
         if title is None:
             default_title = generate_default_title(file_path)
             title = get_user_title(default_title)
         
-        # Convert content to Notion blocks
-        blocks = markdown_to_notion_blocks(content)
+        if text_speaker_df is not None:
+            blocks = list(transcript_df_to_notion_blocks(text_speaker_df))
+        
+        else:
+            # Read transcript content
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except Exception as e:
+                print(f"Error reading file '{file_path}': {e}")
+                return None
+                
+            if not content.strip():
+                print(f"Warning: File '{file_path}' is empty")
+                content = f"Empty transcript file: {file_path}"
+            
+            # Convert content to Notion blocks
+            blocks = markdown_to_notion_blocks(content)
+        
+        if upload_mode not in NOTION_UPLOAD_MODES:
+            raise ValueError(f"Unknown upload mode '{upload_mode}', use one of {NOTION_UPLOAD_MODES}")
+        
+        if upload_mode == 'single_page':
+            properties = create_page_properties(title, date, url, include_date)
+            if request_batch_end(blocks) < len(blocks):
+                print(f"📄 Long transcript detected: {len(blocks)} blocks, appending them to a single page")
+                return create_notion_page_in_batches(client, database_id, properties, blocks, title)
+            
+            print(f"📄 Single page upload: {len(blocks)} blocks")
+            return create_notion_page(client, database_id, properties, blocks, title)
         
         # Check if we need to split into multiple parts
-        if len(blocks) > 95:  # Leave room for navigation
+        # Leave room for navigation; large blocks can exceed the request size limit before the block limit
+        if len(blocks) > 95 or request_batch_end(blocks) < len(blocks):
             print(f"📄 Long transcript detected: {len(blocks)} blocks")
             print(f"📚 Splitting into multiple parts...")
             
             parts = split_blocks_into_parts(blocks, max_blocks_per_part=90)  # Even more conservative
             print(f"📄 Split into {len(parts)} parts")
             
-            # Upload all parts
-            page_urls = []
-            for i, part_blocks in enumerate(parts):
-                part_num = i + 1
+            # Upload all parts concurrently within the shared rate limit
+            def upload_part(part_index: int) -> Optional[str]:
+                part_num = part_index + 1
                 part_title = f"{title} - Part {part_num}"
+                part_blocks = list(parts[part_index])
                 
                 print(f"📤 Uploading Part {part_num}/{len(parts)}: {len(part_blocks)} blocks...")
                 
@@ -434,11 +732,16 @@ def upload_transcript_to_notion(file_path: str, title: Optional[str] = None, dat
                 # Upload this part
                 page_url = create_notion_page(client, database_id, properties, part_blocks, part_title)
                 if page_url:
-                    page_urls.append(page_url)
                     print(f"✅ Part {part_num} uploaded: {page_url}")
                 else:
                     print(f"❌ Failed to upload Part {part_num}")
-                    return None
+                return page_url
+            
+            with ThreadPoolExecutor(max_workers=NOTION_UPLOAD_CONCURRENCY) as executor:
+                page_urls = list(executor.map(propagate(upload_part), range(len(parts))))
+            
+            if not all(page_urls):
+                return None
             
             if page_urls:
                 print(f"🎉 Successfully uploaded {len(page_urls)} parts!")
@@ -471,7 +774,7 @@ def create_page_properties(title: str, date: Optional[str], url: Optional[str],
         Properties dictionary
     """
     properties = {
-        "title": {
+        find_title_property_name(): {
             "title": [
                 {
                     "text": {
@@ -538,26 +841,175 @@ def create_notion_page(client, database_id: str, properties: Dict[str, Any], blo
     """
     try:
         # Create page in Notion
-        new_page = client.pages.create(
+        new_page = notion_request(
+            client.pages.create,
             parent={"database_id": database_id},
             properties=properties,
-            children=blocks
+            children=blocks,
+            idempotent=False
         )
         
         page_url = new_page.get('url', '')
         print(f"✅ Successfully uploaded: '{title}'")
         return page_url
         
+    except APIResponseError as e:
+        if e.code == APIErrorCode.ValidationError:
+            # the database schema may have changed since it was cached
+            invalidate_database_schema(database_id)
+        print(f"❌ Error creating page '{title}': {e}")
+        return None
+        
     except Exception as e:
         print(f"❌ Error creating page '{title}': {e}")
         return None
 
-def upload_all_transcripts_in_directory(directory_path: str = "data/outputs") -> List[str]:
+def _upload_key(database_id: str, title: str, blocks: List[Dict[str, Any]]) -> str:
+    payload = json.dumps({'database_id': database_id, 'title': title, 'blocks': blocks}, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+def _load_upload_states() -> Dict[str, Any]:
+    if not NOTION_UPLOAD_STATE_FILE.exists():
+        return {}
+    try:
+        with open(NOTION_UPLOAD_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {}
+
+def _save_upload_state(upload_key: str, state: Optional[Dict[str, Any]]):
+    """Store (or with state=None remove) the progress of one batched upload."""
+    with _upload_state_lock:
+        states = _load_upload_states()
+        if state is None:
+            states.pop(upload_key, None)
+        else:
+            states[upload_key] = state
+        
+        NOTION_UPLOAD_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = NOTION_UPLOAD_STATE_FILE.with_suffix(f'.tmp{os.getpid()}')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(states, f)
+        os.replace(tmp_path, NOTION_UPLOAD_STATE_FILE)
+
+def _count_page_children(client, page_id: str) -> int:
+    """Number of top-level blocks currently on a page."""
+    n_children, cursor = 0, None
+    while True:
+        kwargs = {'start_cursor': cursor} if cursor else {}
+        response = notion_request(client.blocks.children.list, block_id=page_id,
+                                  page_size=NOTION_MAX_BLOCKS_PER_REQUEST, **kwargs)
+        n_children += len(response['results'])
+        if not response.get('has_more'):
+            return n_children
+        cursor = response['next_cursor']
+
+def _append_batch(client, page_id: str, batch: List[Dict[str, Any]], n_sent: int):
+    """
+    Append one batch of blocks to a page that already has `n_sent` blocks.
+    
+    An append is not retried blindly: after a 5xx, timeout or connection
+    error the page's children are counted, and the batch is only sent again
+    if it did not arrive.
+    """
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        try:
+            notion_request(client.blocks.children.append, block_id=page_id, children=batch, idempotent=False)
+            return
+        
+        except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+            if attempt == NOTION_MAX_RETRIES or not _is_transient_error(e):
+                raise
+            
+            n_children = _count_page_children(client, page_id)
+            if n_children == n_sent + len(batch):
+                return
+            if n_children != n_sent:
+                raise RuntimeError(f"Page {page_id} has {n_children} blocks, expected {n_sent}") from e
+            
+            wait = 0.5 * 2 ** attempt
+            print(f"⏳ Appending blocks failed ({e}), retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+def create_notion_page_in_batches(client, database_id: str, properties: Dict[str, Any], blocks: List[Dict[str, Any]], title: str) -> Optional[str]:
+    """
+    Create a single Notion page with any number of blocks.
+    
+    The page is created with the first 100 blocks; the rest are appended with
+    blocks.children.append in batches of 100 (fewer if they would exceed
+    NOTION_MAX_REQUEST_BYTES). Progress is saved after every
+    confirmed batch, so uploading the same transcript again after a failure
+    continues on the same page instead of starting over (after checking how
+    many blocks the page actually has, in case the last batch arrived without
+    being confirmed).
+    
+    Args:
+        client: Notion client
+        database_id: Database ID
+        properties: Page properties
+        blocks: Content blocks
+        title: Page title for logging
+        
+    Returns:
+        Page URL if successful, None otherwise
+    """
+    upload_key = _upload_key(database_id, title, blocks)
+    state = _load_upload_states().get(upload_key)
+    
+    try:
+        if state:
+            n_children = _count_page_children(client, state['page_id'])
+            if state['n_blocks_sent'] < n_children <= len(blocks):
+                state['n_blocks_sent'] = n_children
+            print(f"↪️  Resuming upload of '{title}' at block {state['n_blocks_sent']}/{len(blocks)}")
+        else:
+            first_batch = blocks[:request_batch_end(blocks)]
+            new_page = notion_request(
+                client.pages.create,
+                parent={"database_id": database_id},
+                properties=properties,
+                children=first_batch,
+                idempotent=False
+            )
+            state = {'page_id': new_page['id'], 'page_url': new_page.get('url', ''),
+                     'n_blocks_sent': len(first_batch)}
+            _save_upload_state(upload_key, state)
+        
+        # Batches are sent one after the other, each one is appended after the previous one
+        start = state['n_blocks_sent']
+        while start < len(blocks):
+            batch = blocks[start:request_batch_end(blocks, start)]
+            _append_batch(client, state['page_id'], batch, start)
+            
+            state['n_blocks_sent'] = start + len(batch)
+            _save_upload_state(upload_key, state)
+            print(f"📤 Uploaded {state['n_blocks_sent']}/{len(blocks)} blocks")
+            start = state['n_blocks_sent']
+        
+        _save_upload_state(upload_key, None)
+        print(f"✅ Successfully uploaded: '{title}'")
+        return state['page_url']
+        
+    except APIResponseError as e:
+        if e.code == APIErrorCode.ValidationError:
+            invalidate_database_schema(database_id)
+        elif e.code == APIErrorCode.ObjectNotFound:
+            # the half-uploaded page is gone, start over next time
+            _save_upload_state(upload_key, None)
+        print(f"❌ Error uploading page '{title}': {e}")
+        return None
+        
+    except Exception as e:
+        print(f"❌ Error uploading page '{title}': {e}")
+        return None
+
+def upload_all_transcripts_in_directory(directory_path: str = "data/outputs", upload_mode: str = 'single_page') -> List[str]:
     """
     Upload all .txt files from a directory to Notion.
     
     Args:
         directory_path: Path to directory containing transcript files
+        upload_mode: 'single_page' or 'multi_page', see upload_transcript_to_notion
         
     Returns:
         List of successfully uploaded page URLs
@@ -582,16 +1034,18 @@ def upload_all_transcripts_in_directory(directory_path: str = "data/outputs") ->
     for i, file_path in enumerate(txt_files, 1):
         print(f"  {i}. {os.path.basename(file_path)}")
     
-    # Upload each file
+    # Ask for all titles first, then upload files concurrently within the shared rate limit
+    titles = {}
     for file_path in txt_files:
+        print(f"\n--- Title for: {os.path.basename(file_path)} ---")
+        titles[file_path] = get_user_title(generate_default_title(file_path))
+    
+    def upload_file(file_path: str) -> Optional[str]:
         print(f"\n--- Processing: {os.path.basename(file_path)} ---")
-        page_url = upload_transcript_to_notion(file_path)
-        if page_url:
-            uploaded_pages.append(page_url)
-        
-        # Add a small pause between uploads to be respectful to Notion API
-        import time
-        time.sleep(1)
+        return upload_transcript_to_notion(file_path, title=titles[file_path], upload_mode=upload_mode)
+    
+    with ThreadPoolExecutor(max_workers=NOTION_UPLOAD_CONCURRENCY) as executor:
+        uploaded_pages = [page_url for page_url in executor.map(propagate(upload_file), txt_files) if page_url]
     
     print(f"\n🎉 Upload complete! Successfully uploaded {len(uploaded_pages)} out of {len(txt_files)} files.")
     
@@ -13,6 +13,7 @@ class ProjPaths:
     inputs_path = data_path / "inputs"
     outputs_path = data_path / "outputs"
     intermediate_path = data_path / "intermediate"
+    cache_path = data_path / "cache"
     
     @classmethod
     def create_directories(cls):
@@ -21,3 +22,4 @@ class ProjPaths:
         cls.inputs_path.mkdir(exist_ok=True)
         cls.outputs_path.mkdir(exist_ok=True)
         cls.intermediate_path.mkdir(exist_ok=True)
+        cls.cache_path.mkdir(exist_ok=True)
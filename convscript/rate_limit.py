@@ -0,0 +1,56 @@
+"""
+Thread-safe token bucket for client-side API rate limiting.
+"""
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Allow on average `rate` calls per second with bursts of up to `capacity`.
+
+    `acquire()` blocks until a token is available. `pause(seconds)` stops all
+    callers for a while, e.g. after a 429 response with a Retry-After header,
+    so that every thread sharing the bucket backs off together.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        # no tokens accumulate while paused
+        start = max(self._last_refill, self._blocked_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._last_refill = max(now, self._last_refill)
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Block all callers for `seconds` and drop the accumulated burst."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
@@ -0,0 +1,215 @@
+"""
+Content-addressed cache for inference results (Whisper segments, speaker turns).
+
+Entries are keyed by a hash of the decoded audio samples plus the stage name
+and its model parameters, so re-running a file under a different output
+name, re-rendering or changing only the combine logic reuses earlier
+inference. Entries live in `data/cache` and are evicted least recently used
+first once the cache grows beyond its size limit.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from convscript.path import ProjPaths
+
+DEFAULT_MAX_CACHE_MB = float(os.environ.get('CONVSCRIPT_RESULT_CACHE_MB', 2048))
+AUDIO_HASHES_FILE = 'audio_hashes.json'
+
+_hashes_lock = threading.Lock()
+
+
+def hash_audio(audio) -> str:
+    """
+    Content hash of decoded audio samples (or of the raw bytes of a file path).
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+
+    if isinstance(audio, (str, Path)):
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(block)
+    else:
+        hasher.update(memoryview(np.ascontiguousarray(audio, dtype=np.float32)).cast('B'))
+
+    return hasher.hexdigest()
+
+
+def stage_key(audio_hash: str, stage: str, **params) -> str:
+    """Cache key for one stage's result on one audio, given its parameters."""
+    payload = json.dumps({'audio': audio_hash, 'stage': stage, 'params': params},
+                         sort_keys=True, default=str)
+
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of DataFrames with LRU eviction under a size limit.
+
+    Every entry is a pickled DataFrame `<key>.pkl` with a `<key>.json`
+    metadata file. A hit refreshes the entry's modification time, which is
+    the recency used for eviction.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size_mb: float = DEFAULT_MAX_CACHE_MB):
+        self.cache_dir = Path(cache_dir) if cache_dir else ProjPaths.cache_path
+        self.max_size_bytes = int(max_size_mb * 1024 ** 2)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _data_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def has(self, key: str) -> bool:
+        return self._data_path(key).exists()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Return the cached DataFrame for `key`, or None on a miss.
+
+        An entry evicted by another process while it is read is a miss; a
+        truncated or corrupt entry is a miss and is removed.
+        """
+        data_path = self._data_path(key)
+        try:
+            df = pd.read_pickle(data_path)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError):
+            self.remove(key)
+            return None
+
+        try:
+            os.utime(data_path)
+        except FileNotFoundError:
+            return None
+        return df
+
+    def put(self, key: str, df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None):
+        """Store a DataFrame and evict old entries if the cache is over its limit."""
+        data_path = self._data_path(key)
+        tmp_path = data_path.with_suffix(f'.tmp{os.getpid()}_{threading.get_ident()}')
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, data_path)
+
+        metadata = dict(metadata or {})
+        metadata.update({'key': key, 'created': time.time(), 'n_rows': len(df)})
+        with open(self._meta_path(key), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, default=str)
+
+        self.prune(self.max_size_bytes)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Metadata of all entries, least recently used first."""
+        entries = []
+        for data_path in self.cache_dir.glob('*.pkl'):
+            try:
+                stat = data_path.stat()
+            except FileNotFoundError:
+                continue
+
+            metadata = {'key': data_path.stem}
+            meta_path = self._meta_path(data_path.stem)
+            if meta_path.exists():
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    metadata.update(json.load(f))
+
+            metadata['size_bytes'] = stat.st_size
+            metadata['last_used'] = stat.st_mtime
+            entries.append(metadata)
+
+        return sorted(entries, key=lambda entry: entry['last_used'])
+
+    def total_bytes(self) -> int:
+        return sum(entry['size_bytes'] for entry in self.entries())
+
+    def remove(self, key: str):
+        for path in [self._data_path(key), self._meta_path(key)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def prune(self, max_size_bytes: Optional[int] = None) -> int:
+        """
+        Evict least recently used entries until the cache fits `max_size_bytes`.
+
+        Returns:
+            Number of entries removed
+        """
+        max_size_bytes = self.max_size_bytes if max_size_bytes is None else max_size_bytes
+        entries = self.entries()
+        total = sum(entry['size_bytes'] for entry in entries)
+
+        n_removed = 0
+        for entry in entries:
+            if total <= max_size_bytes:
+                break
+            self.remove(entry['key'])
+            total -= entry['size_bytes']
+            n_removed += 1
+
+        return n_removed
+
+    def clear(self) -> int:
+        """Remove all entries and the remembered file hashes."""
+        n_removed = self.prune(0)
+        hashes_path = self.cache_dir / AUDIO_HASHES_FILE
+        if hashes_path.exists():
+            hashes_path.unlink()
+        return n_removed
+
+    # Remembered audio hashes, so unchanged files need not be decoded again
+
+    def _load_audio_hashes(self) -> Dict[str, Any]:
+        hashes_path = self.cache_dir / AUDIO_HASHES_FILE
+        if not hashes_path.exists():
+            return {}
+        try:
+            with open(hashes_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    @staticmethod
+    def _file_signature(fname) -> Dict[str, Any]:
+        stat = os.stat(fname)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def known_audio(self, fname) -> Optional[Dict[str, Any]]:
+        """
+        Audio hash and duration of `fname` from an earlier run, if the file
+        has not changed since (same size and modification time).
+        """
+        record = self._load_audio_hashes().get(str(Path(fname).resolve()))
+        if record and record.get('signature') == self._file_signature(fname):
+            return record
+        return None
+
+    def remember_audio(self, fname, audio, duration: float) -> str:
+        """Hash decoded audio (or the file itself) and remember it for `fname`."""
+        audio_hash = hash_audio(audio)
+
+        with _hashes_lock:
+            hashes = self._load_audio_hashes()
+            hashes[str(Path(fname).resolve())] = {'audio_hash': audio_hash,
+                                                   'duration': duration,
+                                                   'signature': self._file_signature(fname)}
+            hashes_path = self.cache_dir / AUDIO_HASHES_FILE
+            tmp_path = hashes_path.with_suffix(f'.tmp{os.getpid()}')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(hashes, f)
+            os.replace(tmp_path, hashes_path)
+
+        return audio_hash
@@ -0,0 +1,98 @@
+"""
+Columnar construction of segment tables (Whisper segments, speaker turns).
+
+Segments arrive as a list of dicts (one per segment). Instead of creating a
+one-row DataFrame per segment and concatenating them, values are gathered
+column by column and passed to a single DataFrame constructor with fixed
+dtypes. The input dicts are never modified.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Whisper segment fields that are large and not needed downstream
+WHISPER_DROP_FIELDS = ('tokens', 'words')
+
+WHISPER_SEGMENT_DTYPES = {
+    'id': 'int64',
+    'seek': 'int64',
+    'start': 'float64',
+    'end': 'float64',
+    'text': 'object',
+    'temperature': 'float32',
+    'avg_logprob': 'float32',
+    'compression_ratio': 'float32',
+    'no_speech_prob': 'float32',
+}
+
+SPEAKER_SEGMENT_DTYPES = {
+    'index': 'object',
+    'start': 'float64',
+    'end': 'float64',
+    'speaker': 'category',
+}
+
+
+def build_segment_table(records: Iterable[Mapping[str, Any]],
+                        columns: Optional[Sequence[str]] = None,
+                        drop_fields: Sequence[str] = (),
+                        dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame from segment records in a single constructor call.
+
+    Args:
+        records: Iterable of dicts, one per segment
+        columns: Column order. If None, all keys in order of first appearance
+        drop_fields: Keys to leave out (e.g. Whisper's token ids)
+        dtypes: Optional mapping of column name to dtype ('category' allowed)
+
+    Returns:
+        DataFrame with one row per record
+    """
+    records = list(records)
+    dtypes = dtypes or {}
+
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    columns = [col for col in columns if col not in drop_fields]
+
+    data = {}
+    for col in columns:
+        values = [record.get(col) for record in records]
+        dtype = dtypes.get(col)
+
+        if dtype == 'category':
+            data[col] = pd.Categorical(values)
+        elif dtype is not None and dtype != 'object':
+            data[col] = np.asarray(values, dtype=dtype)
+        else:
+            data[col] = pd.Series(values, dtype=object)
+
+    return pd.DataFrame(data, columns=columns)
+
+
+def whisper_segments_to_df(segments: List[Mapping[str, Any]]) -> pd.DataFrame:
+    """Segment table from Whisper's `result['segments']`, indexed by segment id."""
+    columns = [col for col in WHISPER_SEGMENT_DTYPES if not segments or col in segments[0]]
+    extra_columns = [col for col in (segments[0] if segments else {})
+                     if col not in WHISPER_SEGMENT_DTYPES]
+
+    seg_df = build_segment_table(segments,
+                                 columns=columns + extra_columns,
+                                 drop_fields=WHISPER_DROP_FIELDS,
+                                 dtypes=WHISPER_SEGMENT_DTYPES)
+
+    return seg_df.set_index('id')
+
+
+def speaker_turns_to_df(turns: Iterable[Mapping[str, Any]], decimals: int = 2) -> pd.DataFrame:
+    """Speaker table with columns index (track), start, end and speaker."""
+    speaker_df = build_segment_table(turns,
+                                     columns=list(SPEAKER_SEGMENT_DTYPES),
+                                     dtypes=SPEAKER_SEGMENT_DTYPES)
+
+    speaker_df['start'] = np.round(speaker_df['start'].to_numpy(), decimals)
+    speaker_df['end'] = np.round(speaker_df['end'].to_numpy(), decimals)
+
+    return speaker_df
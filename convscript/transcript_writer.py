@@ -0,0 +1,113 @@
+"""
+Streaming rendering of speaker-attributed transcripts.
+
+Turns are read column-wise from `text_speaker_df` and rendered one at a time,
+so long transcripts are written to disk without building the whole output
+string in memory.
+"""
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterator, TextIO, Union
+
+import numpy as np
+
+FILE_EXTENSIONS = {'txt': 'txt', 'srt': 'srt', 'vtt': 'vtt', 'jsonl': 'jsonl'}
+
+
+def _iter_turns(text_speaker_df) -> Iterator[tuple]:
+    """Yield (start, end, speaker, text) tuples from columnar arrays."""
+    starts = text_speaker_df['start'].to_numpy(dtype=float).tolist()
+    ends = text_speaker_df['end'].to_numpy(dtype=float).tolist()
+    speakers = text_speaker_df['speaker'].tolist()
+    texts = text_speaker_df['text'].tolist()
+
+    return zip(starts, ends, speakers, texts)
+
+
+def _format_timestamp(seconds: float, decimal_marker: str) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}'
+
+
+def render_txt(text_speaker_df) -> Iterator[str]:
+    """Plain text layout: '<start> - <end>: <speaker>' followed by the text."""
+    starts = np.round(text_speaker_df['start'].to_numpy(dtype=float), 2).tolist()
+    ends = np.round(text_speaker_df['end'].to_numpy(dtype=float), 2).tolist()
+
+    for start, end, speaker, text in zip(starts, ends,
+                                         text_speaker_df['speaker'].tolist(),
+                                         text_speaker_df['text'].tolist()):
+        yield f'{start} - {end}: {speaker}\n{text}\n\n'
+
+
+def render_srt(text_speaker_df) -> Iterator[str]:
+    """SubRip subtitles with the speaker as a text prefix."""
+    for counter, (start, end, speaker, text) in enumerate(_iter_turns(text_speaker_df), 1):
+        yield (f'{counter}\n'
+               f'{_format_timestamp(start, ",")} --> {_format_timestamp(end, ",")}\n'
+               f'[{speaker}] {str(text).strip()}\n\n')
+
+
+def render_vtt(text_speaker_df) -> Iterator[str]:
+    """WebVTT subtitles with speakers as voice tags."""
+    yield 'WEBVTT\n\n'
+    for start, end, speaker, text in _iter_turns(text_speaker_df):
+        yield (f'{_format_timestamp(start, ".")} --> {_format_timestamp(end, ".")}\n'
+               f'<v {speaker}>{str(text).strip()}\n\n')
+
+
+def render_jsonl(text_speaker_df) -> Iterator[str]:
+    """One JSON object per speaker turn."""
+    for start, end, speaker, text in _iter_turns(text_speaker_df):
+        yield json.dumps({'start': start, 'end': end, 'speaker': speaker, 'text': text},
+                         ensure_ascii=False) + '\n'
+
+
+RENDERERS: Dict[str, Callable] = {
+    'txt': render_txt,
+    'srt': render_srt,
+    'vtt': render_vtt,
+    'jsonl': render_jsonl,
+}
+
+OUTPUT_FORMATS = list(RENDERERS.keys())
+
+
+def iter_transcript_chunks(text_speaker_df, output_format: str = 'txt') -> Iterator[str]:
+    """
+    Yield the rendered transcript chunk by chunk (one chunk per speaker turn).
+
+    Args:
+        text_speaker_df: DataFrame with start, end, speaker and text columns
+        output_format: One of OUTPUT_FORMATS
+
+    Returns:
+        Iterator over text chunks
+    """
+    if output_format not in RENDERERS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+
+    return RENDERERS[output_format](text_speaker_df)
+
+
+def write_transcript(text_speaker_df, output: Union[str, Path, TextIO], output_format: str = 'txt') -> int:
+    """
+    Stream the rendered transcript into a file path or an open text handle.
+
+    Returns:
+        Number of characters written
+    """
+    if isinstance(output, (str, Path)):
+        with open(output, 'w', encoding='utf-8') as f:
+            return write_transcript(text_speaker_df, f, output_format)
+
+    n_chars = 0
+    for chunk in iter_transcript_chunks(text_speaker_df, output_format):
+        output.write(chunk)
+        n_chars += len(chunk)
+
+    return n_chars
@@ -0,0 +1,248 @@
+"""
+Speaker diarization of long recordings in overlapping windows.
+
+Running the pyannote pipeline over a 3-4 hour file in one call needs memory
+and time that grow with the length of the recording, and a failure loses
+all progress. Here the audio is diarized in windows of `window_s` seconds
+that overlap by `overlap_s` (optionally several at a time); each window's
+local speakers get an embedding from up to `EMBEDDING_SECONDS` of their
+speech, and are linked to global speakers by cosine similarity to the
+running speaker centroids. Each window keeps the turns of its own part of
+the recording (the overlaps are split in the middle), and the result has the
+same schema as pyannote_inference_df.
+"""
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from convscript.audio_utils import SAMPLE_RATE
+from convscript.segments import speaker_turns_to_df
+
+DEFAULT_WINDOW_SECONDS = 900
+DEFAULT_OVERLAP_SECONDS = 60
+EMBEDDING_SECONDS = 30
+SIMILARITY_THRESHOLD = 0.5
+MAX_WINDOW_ATTEMPTS = 2
+
+# (start, end, track, speaker) relative to the window start
+LocalTurn = Tuple[float, float, str, str]
+
+
+def diarization_windows(duration_s: float, window_s: float = DEFAULT_WINDOW_SECONDS,
+                        overlap_s: float = DEFAULT_OVERLAP_SECONDS) -> List[Tuple[float, float]]:
+    """(start, end) of overlapping windows covering the recording."""
+    if duration_s <= window_s:
+        return [(0.0, duration_s)]
+
+    step = window_s - overlap_s
+    starts = np.arange(0, duration_s - overlap_s, step)
+
+    return [(float(start), float(min(start + window_s, duration_s))) for start in starts]
+
+
+def owned_ranges(windows: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """The part of the recording each window keeps turns for: overlaps are split in the middle."""
+    bounds = [0.0]
+    for (_, previous_end), (next_start, _) in zip(windows[:-1], windows[1:]):
+        bounds.append((previous_end + next_start) / 2)
+    bounds.append(windows[-1][1])
+
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def speaker_samples(audio: np.ndarray, turns: Sequence[LocalTurn], speaker: str,
+                    sample_rate: int = SAMPLE_RATE, max_seconds: float = EMBEDDING_SECONDS) -> np.ndarray:
+    """Up to `max_seconds` of one speaker's speech in a window, longest turns first."""
+    speaker_turns = sorted((turn for turn in turns if turn[3] == speaker), key=lambda turn: turn[0] - turn[1])
+
+    pieces, n_samples = [], 0
+    for start, end, _, _ in speaker_turns:
+        piece = audio[int(start * sample_rate):int(end * sample_rate)]
+        pieces.append(piece[:int(max_seconds * sample_rate) - n_samples])
+        n_samples += len(pieces[-1])
+        if n_samples >= max_seconds * sample_rate:
+            break
+
+    return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+
+class SpeakerLinker:
+    """
+    Global speakers as running embedding centroids (weighted by speech duration).
+
+    `link` maps the local speakers of one window one-to-one to the most similar
+    global speakers, most similar pairs first. Local speakers without a global
+    speaker above the similarity threshold become new global speakers.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.centroids: List[np.ndarray] = []
+        self.weights: List[float] = []
+
+    @staticmethod
+    def _normalize(embedding):
+        embedding = np.asarray(embedding, dtype=np.float64).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def link(self, embeddings: Dict[str, np.ndarray], durations: Dict[str, float]) -> Dict[str, int]:
+        local_speakers = list(embeddings)
+        local = np.array([self._normalize(embeddings[speaker]) for speaker in local_speakers])
+
+        mapping = {}
+        if self.centroids and len(local_speakers):
+            centroids = np.array([self._normalize(centroid) for centroid in self.centroids])
+            similarity = local @ centroids.T
+            for flat_index in np.argsort(-similarity, axis=None):
+                i, j = np.unravel_index(flat_index, similarity.shape)
+                if similarity[i, j] < self.threshold:
+                    break
+                if local_speakers[i] in mapping or j in mapping.values():
+                    continue
+                mapping[local_speakers[i]] = int(j)
+
+        for i, speaker in enumerate(local_speakers):
+            weight = max(durations.get(speaker, 0.0), 1e-3)
+            if speaker in mapping:
+                j = mapping[speaker]
+                total = self.weights[j] + weight
+                self.centroids[j] = (self.centroids[j] * self.weights[j] + local[i] * weight) / total
+                self.weights[j] = total
+            else:
+                mapping[speaker] = len(self.centroids)
+                self.centroids.append(local[i])
+                self.weights.append(weight)
+
+        return mapping
+
+
+class WorkerSlots:
+    """Numbers the threads that call `index()`: 0, 1, ... in order of their first call."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def index(self) -> int:
+        if not hasattr(self._local, 'index'):
+            with self._lock:
+                self._local.index = next(self._counter)
+        return self._local.index
+
+
+def _pyannote_diarize_fn(pyannote_token: str, slots: WorkerSlots) -> Callable[[np.ndarray], List[LocalTurn]]:
+    """Diarization with one pipeline per worker thread (a pipeline is not thread-safe)."""
+    from convscript.model_pyannote import appyl_pyannote_model
+
+    def diarize(samples):
+        diarization = appyl_pyannote_model(pyannote_token, samples, instance=slots.index())
+        return [(turn.start, turn.end, track, speaker)
+                for turn, track, speaker in diarization.itertracks(yield_label=True)]
+
+    return diarize
+
+
+def _pyannote_embed_fn(pyannote_token: str, slots: WorkerSlots) -> Callable[[np.ndarray], np.ndarray]:
+    """Speaker embedding with the pipeline's embedding model, one per worker thread."""
+    import torch
+    from convscript.model_pyannote import load_speaker_embedding
+
+    def embed(samples):
+        embedding_model = load_speaker_embedding(pyannote_token, instance=slots.index())
+        waveform = torch.from_numpy(np.asarray(samples, dtype=np.float32)).reshape(1, 1, -1)
+        return embedding_model(waveform)[0]
+
+    return embed
+
+
+def windowed_diarization_df(audio: np.ndarray, pyannote_token: Optional[str] = None,
+                            window_s: float = DEFAULT_WINDOW_SECONDS, overlap_s: float = DEFAULT_OVERLAP_SECONDS,
+                            n_workers: int = 1, threshold: float = SIMILARITY_THRESHOLD,
+                            sample_rate: int = SAMPLE_RATE,
+                            diarize_fn: Optional[Callable[[np.ndarray], List[LocalTurn]]] = None,
+                            embed_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> pd.DataFrame:
+    """
+    Diarize decoded audio window by window and link the speakers across windows.
+
+    Args:
+        audio: 16 kHz mono float32 samples (may be a memory map)
+        window_s: Window length in seconds, bounds the pipeline's peak memory
+        overlap_s: Overlap of consecutive windows in seconds
+        n_workers: Windows diarized at the same time, each worker loads its own pipeline
+        threshold: Minimum cosine similarity to link a local speaker to a global one
+        diarize_fn: Returns (start, end, track, speaker) turns of a window (default: pyannote pipeline)
+        embed_fn: Returns a speaker embedding of samples (default: the pipeline's embedding model)
+
+    Returns:
+        DataFrame with columns index, start, end and speaker (SPEAKER_00, SPEAKER_01, ...)
+    """
+    slots = WorkerSlots()
+    diarize_fn = diarize_fn or _pyannote_diarize_fn(pyannote_token, slots)
+    embed_fn = embed_fn or _pyannote_embed_fn(pyannote_token, slots)
+
+    windows = diarization_windows(len(audio) / sample_rate, window_s, overlap_s)
+
+    def process_window(window):
+        start, end = window
+        samples = audio[int(start * sample_rate):int(end * sample_rate)]
+        for attempt in range(MAX_WINDOW_ATTEMPTS):
+            try:
+                turns = diarize_fn(samples)
+                break
+            except Exception as e:
+                if attempt + 1 == MAX_WINDOW_ATTEMPTS:
+                    raise
+                print(f"Diarization of window {start:.0f}-{end:.0f}s failed ({e}), retrying")
+
+        speakers = sorted({turn[3] for turn in turns})
+        embeddings = {speaker: embed_fn(speaker_samples(samples, turns, speaker, sample_rate))
+                      for speaker in speakers}
+        durations = {speaker: sum(turn[1] - turn[0] for turn in turns if turn[3] == speaker)
+                     for speaker in speakers}
+        print(f"Diarized window {start:.0f}-{end:.0f}s: {len(turns)} turns, {len(speakers)} speakers")
+
+        return turns, embeddings, durations
+
+    # windows are linked in order, so the global labels do not depend on n_workers
+    linker = SpeakerLinker(threshold)
+    records = []
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        results = executor.map(process_window, windows)
+
+        for (window_start, _), (own_start, own_end), (turns, embeddings, durations) in \
+                zip(windows, owned_ranges(windows), results):
+            mapping = linker.link(embeddings, durations)
+            for start, end, track, speaker in turns:
+                start, end = max(start + window_start, own_start), min(end + window_start, own_end)
+                if end > start:
+                    records.append({'index': track, 'start': start, 'end': end, 'speaker': mapping[speaker]})
+
+    records = _merge_across_windows(sorted(records, key=lambda record: record['start']))
+
+    # global labels in order of first appearance
+    labels = {}
+    for record in records:
+        record['speaker'] = labels.setdefault(record['speaker'], f'SPEAKER_{len(labels):02d}')
+
+    return speaker_turns_to_df(records)
+
+
+def _merge_across_windows(records: List[dict], gap_s: float = 0.05) -> List[dict]:
+    """Join turns of the same speaker that were cut at a window boundary."""
+    merged = []
+    last_by_speaker = {}
+    for record in records:
+        previous = last_by_speaker.get(record['speaker'])
+        if previous is not None and 0 <= record['start'] - previous['end'] <= gap_s:
+            previous['end'] = max(previous['end'], record['end'])
+            continue
+        merged.append(record)
+        last_by_speaker[record['speaker']] = record
+
+    return merged
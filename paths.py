@@ -8,7 +8,9 @@ INPUTS_RAW_DIR = INPUTS_DIR / "raw"
 INPUTS_WAV_DIR = INPUTS_DIR / "wav"
 OUTPUTS_DIR = DATA_DIR / "outputs"
 
-# Ensure directories exist
-INPUTS_RAW_DIR.mkdir(parents=True, exist_ok=True)
-INPUTS_WAV_DIR.mkdir(parents=True, exist_ok=True)
-OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+
+def ensure_directories():
+    """Create the input and output directories (called by the commands that write to them)"""
+    INPUTS_RAW_DIR.mkdir(parents=True, exist_ok=True)
+    INPUTS_WAV_DIR.mkdir(parents=True, exist_ok=True)
+    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -13,6 +13,10 @@ setup(
             'from_wav = click_app:click_wav_to_transcript',
             'from_url = click_app:click_url_to_transcript',
             'url_to_notion = click_app:click_url_to_notion',
+            'transcript_cache = click_app:cache',
+            'batch_transcribe = click_app:click_batch',
+            'benchmark_backends = click_app:click_benchmark_backends',
+            'live_transcript = click_app:click_live',
         ],
     },
     description='Some speech-to-text python experiments',
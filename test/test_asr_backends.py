@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from convscript import asr_backends
+from convscript.asr_backends import ASRBackend, benchmark_backends, get_asr_backend, word_error_rate
+from convscript.conversation_transcription import whisper_cache_key
+from convscript.result_cache import stage_key
+
+
+class FakeBackend(ASRBackend):
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.loaded = []
+
+    def load(self, model_type, device=None):
+        self.loaded.append(model_type)
+
+    def transcribe(self, audio, model_type, device=None):
+        return pd.DataFrame({'id': [0, 1], 'start': [0.0, 1.0], 'end': [1.0, 2.0],
+                             'text': self.text}).set_index('id')
+
+
+def test_word_error_rate():
+
+    assert word_error_rate('Hello there, how are you?', ' hello there how are you') == 0
+    assert word_error_rate('a b c d', 'a x c') == 0.5
+    assert word_error_rate('', '') == 0
+    assert word_error_rate('', 'extra') == 1
+
+
+def test_unknown_backend():
+
+    with pytest.raises(ValueError):
+        get_asr_backend('whisper.cpp')
+
+
+def test_cache_keys_depend_on_backend():
+
+    # results cached before backends existed stay valid for openai-whisper
+    assert whisper_cache_key('abc', 'base') == stage_key('abc', 'whisper', model_type='base')
+    assert whisper_cache_key('abc', 'base', 'faster-whisper') != whisper_cache_key('abc', 'base')
+
+
+def test_benchmark_backends(monkeypatch):
+
+    reference = FakeBackend('reference', [' The quick brown fox.', ' Jumps over the dog.'])
+    candidate = FakeBackend('candidate', [' The quick brown fox', ' jumps over a dog.'])
+    monkeypatch.setitem(asr_backends.ASR_BACKENDS, 'reference', reference)
+    monkeypatch.setitem(asr_backends.ASR_BACKENDS, 'candidate', candidate)
+
+    results = benchmark_backends(np.zeros(32000, dtype=np.float32), 'tiny', ['reference', 'candidate'])
+
+    assert [result['backend'] for result in results] == ['reference', 'candidate']
+    assert results[0]['wer_vs_reference'] == 0
+    assert results[1]['wer_vs_reference'] == pytest.approx(1 / 8)
+    assert all(result['rtf'] >= 0 for result in results)
+    assert reference.loaded == candidate.loaded == ['tiny']
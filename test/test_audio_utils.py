@@ -0,0 +1,124 @@
+import shutil
+import subprocess
+import wave
+import numpy as np
+import pytest
+from convscript.audio_utils import load_audio, audio_duration, write_wav, convert_audio, crop_wav, \
+    transform_mp3_to_wav, audio_extension, SAMPLE_RATE
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg not installed')
+
+
+@pytest.fixture
+def stereo_wav(tmp_path):
+    """Two seconds of a 440 Hz tone, 44.1 kHz stereo like a typical podcast export"""
+
+    rate = 44100
+    t = np.arange(2 * rate) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype('<i2')
+
+    fname = tmp_path / 'tone.wav'
+    with wave.open(str(fname), 'wb') as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.repeat(tone, 2).tobytes())
+
+    return fname
+
+
+@requires_ffmpeg
+def test_load_audio_resamples_to_16k_mono(stereo_wav):
+
+    audio = load_audio(stereo_wav)
+
+    assert audio.dtype == np.float32
+    assert audio.ndim == 1
+    assert audio_duration(audio) == pytest.approx(2.0, abs=0.01)
+    assert 0.3 < np.abs(audio).max() <= 1.0
+
+
+@requires_ffmpeg
+def test_load_audio_memory_mapped(stereo_wav, tmp_path):
+
+    mmap_path = tmp_path / 'tone.f32'
+    audio = load_audio(stereo_wav, mmap_path=mmap_path)
+
+    assert isinstance(audio, np.memmap)
+    np.testing.assert_array_equal(audio, load_audio(stereo_wav))
+
+
+def test_write_wav(tmp_path):
+
+    audio = np.linspace(-1, 1, SAMPLE_RATE, dtype=np.float32)
+    fname = write_wav(audio, tmp_path / 'ramp.wav')
+
+    with wave.open(str(fname), 'rb') as wf:
+        assert wf.getnchannels() == 1
+        assert wf.getframerate() == SAMPLE_RATE
+        assert wf.getnframes() == SAMPLE_RATE
+
+
+@pytest.fixture
+def ramp_wav(tmp_path):
+    """Ten seconds at 16 kHz whose amplitude encodes the time (0.05 per second)"""
+
+    audio = (np.arange(10 * SAMPLE_RATE) / SAMPLE_RATE * 0.05).astype(np.float32)
+    return write_wav(audio, tmp_path / 'ramp.wav')
+
+
+@requires_ffmpeg
+def test_crop_wav_seeks_before_decoding(ramp_wav, tmp_path):
+
+    excerpt = crop_wav(ramp_wav, tmp_path / 'excerpt.wav', start_frame=4000, n_frames=2000)
+
+    with wave.open(str(excerpt), 'rb') as wf:
+        assert wf.getnchannels() == 1
+        assert wf.getframerate() == SAMPLE_RATE
+        assert wf.getnframes() == 2 * SAMPLE_RATE
+    audio = load_audio(excerpt)
+    assert audio[0] == pytest.approx(0.2, abs=1e-3)
+    assert audio[-1] == pytest.approx(0.3, abs=1e-3)
+
+
+@requires_ffmpeg
+def test_crop_wav_in_place(ramp_wav):
+
+    crop_wav(ramp_wav, ramp_wav, start_frame=0, n_frames=1000)
+
+    assert audio_duration(load_audio(ramp_wav)) == pytest.approx(1.0)
+
+
+@requires_ffmpeg
+def test_convert_to_pipe_and_partial_load(stereo_wav, ramp_wav):
+
+    wav_bytes = convert_audio(stereo_wav, '-')
+    assert wav_bytes[:4] == b'RIFF'
+    # 2 s of 16-bit mono at 16 kHz plus the header
+    assert len(wav_bytes) == pytest.approx(2 * SAMPLE_RATE * 2 + 44, abs=100)
+
+    audio = load_audio(ramp_wav, start_s=5, duration_s=1)
+    assert audio_duration(audio) == pytest.approx(1.0)
+    assert audio[0] == pytest.approx(0.25, abs=1e-3)
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize('extension, codec', [('.m4a', 'aac'), ('.ogg', 'libvorbis'), ('.opus', 'libopus')])
+def test_compressed_inputs(stereo_wav, tmp_path, extension, codec):
+
+    compressed = tmp_path / f'tone{extension}'
+    encode = subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', str(stereo_wav),
+                             '-c:a', codec, str(compressed)], capture_output=True)
+    if encode.returncode != 0:
+        pytest.skip(f'ffmpeg has no {codec} encoder')
+
+    wav_fname = transform_mp3_to_wav(compressed, tmp_path / 'tone.wav')
+
+    assert audio_duration(load_audio(wav_fname)) == pytest.approx(2.0, abs=0.05)
+
+
+def test_audio_extension():
+
+    assert audio_extension('https://host/episode.M4A?token=1') == '.m4a'
+    assert audio_extension('https://host/feed/123?format=.opus') == '.mp3'
+    assert audio_extension('talk.opus') == '.opus'
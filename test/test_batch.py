@@ -0,0 +1,111 @@
+import json
+import pytest
+from convscript import batch
+from convscript.batch import load_manifest, run_batch, BatchState
+
+
+@pytest.fixture
+def audio_files(tmp_path):
+
+    fnames = []
+    for name in ['monday', 'tuesday', 'wednesday']:
+        fname = tmp_path / f'{name}.mp3'
+        fname.write_bytes(b'fake audio')
+        fnames.append(fname)
+
+    return fnames
+
+
+def test_load_csv_and_jsonl_manifest(tmp_path, audio_files):
+
+    csv_manifest = tmp_path / 'episodes.csv'
+    csv_manifest.write_text('audio,title,source_url\n'
+                            f'{audio_files[0]},Episode One,https://example.com/1\n'
+                            f'{audio_files[1]},Episode One,\n')
+    jsonl_manifest = tmp_path / 'episodes.jsonl'
+    jsonl_manifest.write_text(json.dumps({'audio_url': 'https://example.com/ep.mp3?x=1'}) + '\n')
+
+    csv_jobs = load_manifest(csv_manifest, model_type='tiny')
+    jsonl_jobs = load_manifest(jsonl_manifest, model_type='tiny')
+
+    assert [job['job_id'] for job in csv_jobs] == ['Episode_One_tiny', 'Episode_One_tiny_2']
+    assert csv_jobs[0]['source_url'] == 'https://example.com/1'
+    assert csv_jobs[1]['source_url'] is None
+    assert jsonl_jobs[0]['title'] == 'ep'
+
+
+def test_batch_is_resumable(tmp_path, audio_files, monkeypatch):
+
+    manifest = tmp_path / 'episodes.jsonl'
+    manifest.write_text(''.join(json.dumps({'audio': str(fname), 'title': fname.stem}) + '\n'
+                                for fname in audio_files))
+
+    transcribed = []
+    fail_on = {'tuesday'}
+
+    def fake_transcribe_job(audio_file, model_type, pyannote_token, output_filename,
+                            execution_mode='sequential', output_format='txt', backend='openai-whisper'):
+        if any(name in audio_file for name in fail_on):
+            raise RuntimeError('model crashed')
+        transcribed.append(output_filename)
+        transcript_file = tmp_path / f'{output_filename}.txt'
+        transcript_file.write_text('0.0 - 1.0: SPEAKER_00\n Hi.\n\n')
+        return str(transcript_file)
+
+    monkeypatch.setattr(batch, '_init_inference_worker', lambda *args: None)
+    monkeypatch.setattr(batch, 'transcribe_job', fake_transcribe_job)
+
+    state_path = tmp_path / 'state.json'
+    summary = run_batch(manifest, 'tiny', 'token', state_path=state_path, raw_dir=tmp_path / 'raw')
+
+    assert summary == {'done': 2, 'failed': 1}
+    assert BatchState(state_path).get('tuesday_tiny')['stage'] == 'transcription'
+
+    fail_on.clear()
+    summary = run_batch(manifest, 'tiny', 'token', state_path=state_path, raw_dir=tmp_path / 'raw')
+
+    assert summary == {'done': 3}
+    assert sorted(transcribed) == ['monday_tiny', 'tuesday_tiny', 'wednesday_tiny']
+
+
+def test_failed_upload_is_retried_without_transcribing_again(tmp_path, audio_files, monkeypatch):
+
+    manifest = tmp_path / 'episodes.jsonl'
+    manifest.write_text(json.dumps({'audio': str(audio_files[0]), 'title': 'monday'}) + '\n')
+
+    transcribed, uploads = [], []
+
+    def fake_transcribe_job(audio_file, model_type, pyannote_token, output_filename,
+                            execution_mode='sequential', output_format='txt', backend='openai-whisper'):
+        transcribed.append(output_filename)
+        transcript_file = tmp_path / f'{output_filename}.txt'
+        transcript_file.write_text('0.0 - 1.0: SPEAKER_00\n Hi.\n\n')
+        return str(transcript_file)
+
+    def fake_upload_job(job, transcript_file, upload_mode='single_page'):
+        uploads.append(transcript_file)
+        return None if len(uploads) == 1 else 'https://notion.test/page-0'
+
+    def no_download(*args):
+        raise AssertionError('audio prepared again')
+
+    monkeypatch.setattr(batch, '_init_inference_worker', lambda *args: None)
+    monkeypatch.setattr(batch, 'transcribe_job', fake_transcribe_job)
+    monkeypatch.setattr(batch, 'upload_job', fake_upload_job)
+
+    state_path = tmp_path / 'state.json'
+    summary = run_batch(manifest, 'tiny', 'token', state_path=state_path, raw_dir=tmp_path / 'raw',
+                        upload_to_notion=True)
+
+    assert summary == {'failed': 1}
+    record = BatchState(state_path).get('monday_tiny')
+    assert record['stage'] == 'upload' and record['transcript_file'] == str(tmp_path / 'monday_tiny.txt')
+
+    monkeypatch.setattr(batch, 'prepare_audio', no_download)
+    summary = run_batch(manifest, 'tiny', 'token', state_path=state_path, raw_dir=tmp_path / 'raw',
+                        upload_to_notion=True)
+
+    assert summary == {'done': 1}
+    assert transcribed == ['monday_tiny']
+    assert uploads == [str(tmp_path / 'monday_tiny.txt')] * 2
+    assert BatchState(state_path).get('monday_tiny')['notion_url'] == 'https://notion.test/page-0'
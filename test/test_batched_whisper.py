@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from convscript.batched_whisper import WhisperBatchWorker, segments_from_tokens, split_into_windows, WINDOW_SAMPLES
+
+SR = 16000
+
+
+class FakeBatchWorker(WhisperBatchWorker):
+    """Decodes every window to a single segment; records the batch sizes"""
+
+    def _load_model(self):
+        self.batch_sizes = []
+        return None
+
+    def _prepare(self, window):
+        return len(window)
+
+    def _decode(self, features, offsets_s, durations_s):
+        self.batch_sizes.append(len(features))
+        return [[{'start': offset, 'end': offset + duration, 'text': f' {n_samples}'}]
+                for n_samples, offset, duration in zip(features, offsets_s, durations_s)]
+
+
+def test_windows_are_at_most_30_seconds():
+
+    audio = np.random.default_rng(0).normal(0, 0.1, 95 * SR).astype(np.float32)
+    windows = split_into_windows(audio)
+
+    assert all(len(samples) <= WINDOW_SAMPLES for _, samples in windows)
+    assert [start for start, _ in windows][0] == 0
+    assert np.concatenate([samples for _, samples in windows]).shape == audio.shape
+    assert all(start + len(samples) == next_start
+               for (start, samples), (next_start, _) in zip(windows[:-1], windows[1:]))
+
+
+def test_segments_from_tokens():
+
+    timestamp_begin = 1000
+    tokens = [1000, 1, 2, 1100, 1100, 3, 1250, 4]
+
+    segments = segments_from_tokens(tokens, timestamp_begin, lambda toks: ''.join(f' w{t}' for t in toks),
+                                    offset_s=60.0, duration_s=10.0)
+
+    assert [(s['start'], s['end'], s['text']) for s in segments] == [(60.0, 62.0, ' w1 w2'),
+                                                                   (62.0, 65.0, ' w3'),
+                                                                   (65.0, 70.0, ' w4')]
+    assert segments_from_tokens([5, 6], timestamp_begin, str, 0.0, 7.5)[0]['end'] == 7.5
+
+
+def test_windows_of_several_files_are_decoded_together():
+
+    worker = FakeBatchWorker('tiny', device='cpu', batch_size=8, max_wait_s=0.5)
+    try:
+        lengths_s = [12, 45, 70]
+        futures = [worker.submit(np.zeros(length * SR, dtype=np.float32)) for length in lengths_s]
+        seg_dfs = [future.result(timeout=10) for future in futures]
+    finally:
+        worker.stop()
+
+    n_windows = sum(len(split_into_windows(np.zeros(length * SR, dtype=np.float32))) for length in lengths_s)
+    assert len(lengths_s) < n_windows <= 8
+    # the windows of all files fit into a single batch
+    assert worker.batch_sizes == [n_windows]
+    for length_s, seg_df in zip(lengths_s, seg_dfs):
+        assert list(seg_df.index) == list(range(len(seg_df)))
+        assert seg_df['start'].iloc[0] == 0
+        assert seg_df['end'].iloc[-1] == pytest.approx(length_s)
+
+
+def test_decode_errors_reach_the_caller():
+
+    class FailingWorker(FakeBatchWorker):
+        def _decode(self, features, offsets_s, durations_s):
+            raise RuntimeError('out of memory')
+
+    worker = FailingWorker('tiny', device='cpu')
+    try:
+        with pytest.raises(RuntimeError, match='out of memory'):
+            worker.transcribe(np.zeros(5 * SR, dtype=np.float32))
+    finally:
+        worker.stop()
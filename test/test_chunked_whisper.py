@@ -0,0 +1,122 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from convscript import chunked_whisper
+from convscript.chunked_whisper import find_split_points, split_audio, stitch_segments, split_workers, \
+    chunked_whisper_inference_df
+
+SR = 16000
+
+
+def speech_like_audio(duration_s, silences_s, seed=0):
+
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.3, int(duration_s * SR)).astype(np.float32)
+    for start, end in silences_s:
+        audio[int(start * SR):int(end * SR)] = rng.normal(0, 0.001, int(end * SR) - int(start * SR))
+
+    return audio
+
+
+def test_split_points_fall_into_silences():
+
+    silences = [(9.2, 9.9), (20.5, 21.3)]
+    audio = speech_like_audio(35, silences)
+
+    split_points = find_split_points(audio, SR, chunk_s=10, search_window_s=4)
+
+    assert len(split_points) == 2
+    for point, (start, end) in zip(split_points, silences):
+        assert start <= point / SR <= end
+
+
+def test_short_audio_is_not_split():
+
+    assert find_split_points(np.zeros(12 * SR, dtype=np.float32), SR, chunk_s=10) == []
+
+
+def test_stitch_segments():
+
+    first = pd.DataFrame({'id': [0, 1], 'seek': [0, 0], 'start': [0.0, 4.0], 'end': [4.0, 10.4],
+                          'text': [' a', ' b']}).set_index('id')
+    second = pd.DataFrame({'id': [0], 'seek': [0], 'start': [0.5], 'end': [3.0], 'text': [' c']}).set_index('id')
+
+    seg_df = stitch_segments([first, second], [0.0, 10.0], durations_s=[10.0, 5.0])
+
+    assert list(seg_df.index) == [0, 1, 2]
+    assert seg_df.index.name == 'id'
+    assert list(seg_df['start']) == [0.0, 4.0, 10.5]
+    assert list(seg_df['end']) == [4.0, 10.0, 13.0]
+    assert list(seg_df['seek']) == [0, 0, 1000]
+    assert list(seg_df['text']) == [' a', ' b', ' c']
+
+
+def test_split_workers():
+
+    assert split_workers(4, n_cores=32) == (4, 8)
+    assert split_workers(8, n_cores=4) == (4, 1)
+    assert split_workers(3, n_cores=8) == (3, 2)
+
+
+def test_chunked_inference_has_global_timestamps(monkeypatch):
+
+    audio = speech_like_audio(35, [(9.2, 9.9), (20.5, 21.3)])
+    calls = []
+
+    def fake_transcribe(chunk, model_type, backend):
+        calls.append(len(chunk))
+        duration = len(chunk) / SR
+        return pd.DataFrame({'id': [0, 1], 'start': [0.0, duration / 2], 'end': [duration / 2, duration],
+                             'text': [' first half', ' second half']}).set_index('id')
+
+    monkeypatch.setattr(chunked_whisper, 'transcribe_with_backend', fake_transcribe)
+    monkeypatch.setattr(chunked_whisper, 'find_split_points',
+                        lambda audio, sample_rate, chunk_s: find_split_points(audio, sample_rate, chunk_s, 4))
+
+    seg_df = chunked_whisper_inference_df(audio, 'tiny', n_workers=1, chunk_s=10)
+
+    chunks = split_audio(audio, find_split_points(audio, SR, chunk_s=10, search_window_s=4))
+    assert calls == [len(samples) for _, samples in chunks]
+    assert list(seg_df.index) == list(range(6))
+    assert seg_df['start'].iloc[0] == 0
+    assert seg_df['end'].iloc[-1] == len(audio) / SR
+    # chunks are contiguous: each segment starts where the previous one ended
+    assert np.allclose(seg_df['start'].to_numpy()[1:], seg_df['end'].to_numpy()[:-1])
+
+
+def test_one_worker_pool_is_kept(monkeypatch):
+
+    pools = []
+
+    class FakePool:
+        def __init__(self, max_workers, mp_context, initializer, initargs):
+            self.max_workers, self.is_shut_down = max_workers, False
+            pools.append(self)
+
+        def submit(self, func, *args):
+            future = Future()
+            future.set_result(func(*args))
+            return future
+
+        def shutdown(self):
+            self.is_shut_down = True
+
+    monkeypatch.setattr(chunked_whisper, 'ProcessPoolExecutor', FakePool)
+    monkeypatch.setattr(chunked_whisper, '_CHUNK_POOLS', {})
+    monkeypatch.setattr(chunked_whisper, 'transcribe_with_backend',
+                        lambda chunk, model_type, backend: pd.DataFrame({'id': [0], 'start': [0.0], 'end': [1.0],
+                                                                         'text': [' hi']}).set_index('id'))
+    monkeypatch.setattr(chunked_whisper, 'find_split_points',
+                        lambda audio, sample_rate, chunk_s: find_split_points(audio, sample_rate, chunk_s, 4))
+
+    # files with 3 and 2 chunks share the pool sized for the configured 4 workers
+    for silences in [[(9.2, 9.9), (20.5, 21.3)], [(9.2, 9.9)]]:
+        chunked_whisper_inference_df(speech_like_audio(35 if len(silences) == 2 else 20, silences), 'tiny',
+                                     n_workers=4, chunk_s=10, n_cores=8)
+    assert [pool.max_workers for pool in pools] == [4]
+
+    chunked_whisper_inference_df(speech_like_audio(35, [(9.2, 9.9), (20.5, 21.3)]), 'base', n_workers=4,
+                                 chunk_s=10, n_cores=8)
+    assert len(pools) == 2 and pools[0].is_shut_down and not pools[1].is_shut_down
+    assert list(chunked_whisper._CHUNK_POOLS.values()) == [pools[1]]
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from convscript.conversation_transcription import combine_whisper_and_pyannote, combine_consecutive_speakers
+
+
+def reference_combine_whisper_and_pyannote(text_df, speaker_df):
+    """Original row-by-row implementation, kept as the reference behaviour"""
+
+    overlap_list = []
+
+    for idx, this_row in speaker_df.iterrows():
+
+        this_start = this_row['start']
+        this_end = this_row['end']
+        this_speaker = this_row['speaker']
+
+        xx_inds = ~((text_df['end'] < this_start) | (text_df['start'] > this_end))
+        this_overlap_texts = text_df.loc[xx_inds, :].copy()
+        this_overlap_texts['speaker_start'] = this_start
+        this_overlap_texts['speaker_end'] = this_end
+        this_overlap_texts['speaker'] = this_speaker
+
+        overlap_list.append(this_overlap_texts)
+
+    all_overlaps = pd.concat(overlap_list)
+    all_overlaps = all_overlaps.reset_index(drop=True)
+
+    all_overlaps['max_start'] = np.maximum(all_overlaps['start'],
+                                           all_overlaps['speaker_start'])
+    all_overlaps['min_end'] = np.minimum(all_overlaps['end'],
+                                         all_overlaps['speaker_end'])
+    all_overlaps['overlap_duration'] = all_overlaps['min_end'] - all_overlaps['max_start']
+
+    max_overlap_indices = all_overlaps.groupby('id')['overlap_duration'].idxmax()
+    text_speaker_df = all_overlaps.loc[max_overlap_indices, :]
+
+    return text_speaker_df
+
+
+def random_segments(seed, n_text, n_speaker, duration=600.0):
+    """Random whisper-like text segments and (possibly overlapping) speaker turns"""
+
+    rng = np.random.default_rng(seed)
+
+    text_bounds = np.sort(np.round(rng.uniform(0, duration, size=n_text + 1), 2))
+    text_df = pd.DataFrame({'id': np.arange(n_text),
+                            'seek': np.zeros(n_text, dtype=int),
+                            'start': text_bounds[:-1],
+                            'end': text_bounds[1:],
+                            'text': [f'segment {i}' for i in range(n_text)],
+                            'avg_logprob': rng.normal(size=n_text)})
+
+    speaker_start = np.round(rng.uniform(0, duration, size=n_speaker), 2)
+    speaker_length = np.round(rng.exponential(scale=duration / max(n_speaker, 1), size=n_speaker), 2)
+    speaker_df = pd.DataFrame({'index': np.arange(n_speaker),
+                               'start': speaker_start,
+                               'end': speaker_start + speaker_length,
+                               'speaker': rng.choice(['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02'],
+                                                     size=n_speaker)})
+
+    return text_df, speaker_df
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_matches_reference_implementation(seed):
+
+    rng = np.random.default_rng(1000 + seed)
+    text_df, speaker_df = random_segments(seed,
+                                          n_text=int(rng.integers(1, 200)),
+                                          n_speaker=int(rng.integers(1, 80)))
+
+    expected = reference_combine_whisper_and_pyannote(text_df, speaker_df).reset_index(drop=True)
+    result = combine_whisper_and_pyannote(text_df, speaker_df).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_ties_go_to_first_speaker_turn():
+
+    text_df = pd.DataFrame({'id': [0], 'start': [1.0], 'end': [3.0], 'text': ['hello']})
+    speaker_df = pd.DataFrame({'start': [2.0, 0.0], 'end': [4.0, 2.0],
+                               'speaker': ['SPEAKER_01', 'SPEAKER_00']})
+
+    result = combine_whisper_and_pyannote(text_df, speaker_df)
+
+    assert list(result['speaker']) == ['SPEAKER_01']
+    assert list(result['overlap_duration']) == [1.0]
+
+
+def test_segments_without_speaker_are_dropped():
+
+    text_df = pd.DataFrame({'id': [0, 1], 'start': [0.0, 10.0], 'end': [1.0, 11.0], 'text': ['a', 'b']})
+    speaker_df = pd.DataFrame({'start': [9.5], 'end': [12.0], 'speaker': ['SPEAKER_00']})
+
+    result = combine_whisper_and_pyannote(text_df, speaker_df)
+
+    assert list(result['id']) == [1]
+
+
+def test_consecutive_speakers_are_merged():
+
+    text_speaker_df = pd.DataFrame({'start': [0.0, 1.0, 2.0, 3.0, 4.0],
+                                    'end': [1.0, 2.0, 3.0, 4.0, 5.0],
+                                    'text': [' Hi', ' there.', ' Hello.', np.nan, ' Bye.'],
+                                    'speaker': ['SPEAKER_00', 'SPEAKER_00', 'SPEAKER_01',
+                                                'SPEAKER_01', 'SPEAKER_00'],
+                                    'overlap_duration': [1.0] * 5})
+
+    result = combine_consecutive_speakers(text_speaker_df)
+
+    assert list(result.columns) == ['start', 'end', 'text', 'speaker']
+    assert list(result['start']) == [0.0, 2.0, 4.0]
+    assert list(result['end']) == [2.0, 4.0, 5.0]
+    assert list(result['text']) == [' Hi  there.', ' Hello. ', ' Bye.']
+    assert list(result['speaker']) == ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_00']
+
+
+def test_max_turn_duration_splits_long_monologues():
+
+    n_segments = 10
+    text_speaker_df = pd.DataFrame({'start': np.arange(n_segments) * 10.0,
+                                    'end': np.arange(1, n_segments + 1) * 10.0,
+                                    'text': [f'part {i}' for i in range(n_segments)],
+                                    'speaker': ['SPEAKER_00'] * n_segments})
+
+    assert len(combine_consecutive_speakers(text_speaker_df)) == 1
+
+    result = combine_consecutive_speakers(text_speaker_df, max_turn_duration=30)
+
+    assert list(result['start']) == [0.0, 30.0, 60.0, 90.0]
+    assert list(result['end']) == [30.0, 60.0, 90.0, 100.0]
+    assert (result['end'] - result['start'] <= 30).all()
+    assert result['text'].iloc[0] == 'part 0 part 1 part 2'
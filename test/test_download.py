@@ -0,0 +1,121 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+from convscript.audio_utils import download_mp3
+
+FILE_SIZE = 3 * 1024 * 1024 + 123
+
+
+class FakeAudioHandler(BaseHTTPRequestHandler):
+    """Serves `server.data` with Range/ETag support, optionally dropping the first connection"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        data = server.data
+
+        if server.n_failures > 0:
+            server.n_failures -= 1
+            # announce the full file but drop the connection half-way
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('ETag', server.etag)
+            self.end_headers()
+            self.wfile.write(data[:len(data) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and (if_range is None or if_range == server.etag):
+            start = int(range_header.split('=')[1].split('-')[0])
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+            self.send_header('Content-Length', str(len(data) - start))
+            body = data[start:]
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            body = data
+
+        self.send_header('ETag', server.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def audio_server():
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAudioHandler)
+    server.data = np.random.default_rng(0).integers(0, 256, FILE_SIZE, dtype=np.uint8).tobytes()
+    server.etag = '"v1"'
+    server.n_failures = 0
+    server.requests = []
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def server_url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}/episode.mp3'
+
+
+def test_streaming_download_with_progress(audio_server, tmp_path):
+
+    progress = []
+    fname = download_mp3(server_url(audio_server), str(tmp_path / 'episode.mp3'),
+                         chunk_size=256 * 1024,
+                         progress_callback=lambda n, total, speed: progress.append((n, total)))
+
+    with open(fname, 'rb') as f:
+        assert f.read() == audio_server.data
+    assert progress[-1] == (FILE_SIZE, FILE_SIZE)
+    assert len(progress) > 1
+    assert not os.path.exists(fname + '.part')
+
+
+def test_resume_after_dropped_connection(audio_server, tmp_path):
+
+    audio_server.n_failures = 1
+    fname = download_mp3(server_url(audio_server), str(tmp_path / 'episode.mp3'),
+                         backoff_factor=0.01)
+
+    with open(fname, 'rb') as f:
+        assert f.read() == audio_server.data
+
+    assert len(audio_server.requests) == 2
+    resumed_request = audio_server.requests[1]
+    assert resumed_request['Range'].startswith('bytes=')
+    assert resumed_request['Range'] != 'bytes=0-'
+    assert resumed_request['If-Range'] == '"v1"'
+
+
+def test_changed_file_is_downloaded_from_scratch(audio_server, tmp_path):
+
+    fname = tmp_path / 'episode.mp3'
+    with open(f'{fname}.part', 'wb') as f:
+        f.write(b'stale bytes from an older version')
+    with open(f'{fname}.part.etag', 'w') as f:
+        f.write('"v0"')
+
+    download_mp3(server_url(audio_server), str(fname))
+
+    with open(fname, 'rb') as f:
+        assert f.read() == audio_server.data
+
+
+def test_temp_file_download(audio_server):
+
+    fname = download_mp3(server_url(audio_server))
+
+    assert fname.endswith('.mp3')
+    assert os.path.getsize(fname) == FILE_SIZE
+    os.remove(fname)
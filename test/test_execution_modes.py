@@ -0,0 +1,50 @@
+import time
+import pandas as pd
+import pytest
+from convscript import conversation_transcription
+from convscript.conversation_transcription import run_inference_stages, split_torch_threads
+
+
+@pytest.fixture
+def slow_models(monkeypatch):
+
+    def fake_whisper(wav_fname, model_type='base', backend='openai-whisper'):
+        time.sleep(0.3)
+        return pd.DataFrame({'id': [0], 'start': [0.0], 'end': [1.0], 'text': ['hi']}).set_index('id')
+
+    def fake_pyannote(wav_fname, pyannote_token):
+        time.sleep(0.3)
+        return pd.DataFrame({'start': [0.0], 'end': [1.0], 'speaker': ['SPEAKER_00']})
+
+    monkeypatch.setattr(conversation_transcription, 'transcribe_with_backend', fake_whisper)
+    monkeypatch.setattr(conversation_transcription, 'pyannote_inference_df', fake_pyannote)
+
+
+def test_split_torch_threads():
+
+    assert split_torch_threads(2, n_cores=32) == [16, 16]
+    assert split_torch_threads(2, n_cores=5) == [3, 2]
+    assert split_torch_threads(2, n_cores=1) == [1, 1]
+
+
+@pytest.mark.parametrize('execution_mode', ['sequential', 'concurrent'])
+def test_stage_timings(slow_models, execution_mode):
+
+    text_df, speaker_df, timings = run_inference_stages('fake.wav', 'base', 'token',
+                                                        execution_mode=execution_mode)
+
+    assert list(text_df['id']) == [0]
+    assert list(speaker_df['speaker']) == ['SPEAKER_00']
+    assert timings['whisper'] >= 0.3
+    assert timings['pyannote'] >= 0.3
+
+    if execution_mode == 'concurrent':
+        assert timings['inference_wall'] < timings['whisper'] + timings['pyannote']
+    else:
+        assert timings['inference_wall'] >= timings['whisper'] + timings['pyannote']
+
+
+def test_unknown_execution_mode():
+
+    with pytest.raises(ValueError):
+        run_inference_stages('fake.wav', 'base', 'token', execution_mode='parallel')
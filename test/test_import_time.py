@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+from convscript.path import ProjPaths
+
+# the CLI must start without loading any of these
+HEAVY_MODULES = ['torch', 'whisper', 'faster_whisper', 'pyannote', 'pandas', 'notion_client', 'httpx', 'requests']
+IMPORT_BUDGET_SECONDS = 0.5
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ProjPaths.project_path, env=os.environ.copy(),
+                          capture_output=True, text=True, check=True)
+
+
+def cumulative_import_seconds(importtime_stderr, module):
+    """Cumulative import time of a top-level module from `python -X importtime` output."""
+    for line in importtime_stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].rstrip() == f' {module}':
+            return int(line.split('|')[1]) / 1e6
+    raise AssertionError(f'{module} not in -X importtime output')
+
+
+def test_cli_imports_no_heavy_dependencies():
+
+    result = run_python('-c', 'import sys, click_app; '
+                              f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+
+    assert result.stdout.strip() == ''
+
+
+def test_cli_import_time_budget():
+
+    # best of three, the first run may have cold file system caches
+    seconds = min(cumulative_import_seconds(run_python('-X', 'importtime', '-c', 'import click_app').stderr,
+                                            'click_app')
+                  for _ in range(3))
+
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_cli_choices_match_the_pipeline():
+
+    from convscript import choices, transcript_writer
+
+    assert choices.OUTPUT_FORMATS == list(transcript_writer.RENDERERS)
@@ -0,0 +1,124 @@
+import json
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from convscript import conversation_transcription
+from convscript.instrumentation import current_run, propagate, record_run, span, write_run_report
+from convscript.path import ProjPaths
+
+
+def test_spans_nest_and_aggregate():
+
+    with record_run('test', model_type='base') as run:
+        with span('outer') as outer:
+            with span('inner', n=1) as inner:
+                inner.add_bytes(100)
+                time.sleep(0.01)
+            with span('inner', n=2) as inner:
+                inner.add_bytes(50)
+
+    assert current_run() is None
+    assert [s.name for s in run.spans] == ['inner', 'inner', 'outer']
+    assert run.spans[0].parent == 'outer' and outer.parent is None
+    assert outer.wall_s >= 0.01 and outer.cpu_s >= 0
+
+    stages = run.stages()
+    assert stages['inner']['count'] == 2
+    assert stages['inner']['bytes'] == 150
+    assert run.summary()['meta'] == {'model_type': 'base'}
+
+
+def test_failed_spans_are_recorded():
+
+    with record_run('test') as run:
+        with pytest.raises(ValueError):
+            with span('broken'):
+                raise ValueError('no')
+
+    assert run.spans[0].error == 'ValueError'
+
+
+def test_nested_runs_join_the_outer_run():
+
+    with record_run('upload') as outer:
+        with record_run('transcribe') as inner:
+            with span('whisper'):
+                pass
+
+    assert inner is outer
+    assert [s.name for s in outer.spans] == ['whisper']
+
+
+def test_spans_only_join_runs_through_propagate():
+
+    def stage(name):
+        with span(name):
+            pass
+
+    with record_run('test') as run:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(propagate(stage), ['a', 'b']))
+            executor.submit(stage, 'lost').result()
+
+    assert sorted(s.name for s in run.spans) == ['a', 'b']
+
+
+def test_report_and_history(tmp_path):
+
+    transcript = tmp_path / 'episode.txt'
+    transcript.write_text('hi')
+
+    for _ in range(2):
+        with record_run('test') as run:
+            with span('whisper'):
+                pass
+        report_path = write_run_report(run, transcript)
+
+    report = json.loads(report_path.read_text())
+    assert report_path.name == 'episode.txt.run.json'
+    assert report['run_id'] == run.run_id
+    assert report['spans'][0]['name'] == 'whisper'
+
+    history = [json.loads(line) for line in (tmp_path / 'run_history.jsonl').read_text().splitlines()]
+    assert len(history) == 2
+    assert 'spans' not in history[0] and 'whisper' in history[0]['stages']
+
+
+@pytest.mark.parametrize('execution_mode', ['sequential', 'concurrent'])
+def test_wav_to_transcript_writes_a_run_report(tmp_path, monkeypatch, execution_mode):
+
+    for attr in ['data_path', 'intermediate_path', 'outputs_path', 'cache_path', 'inputs_path']:
+        monkeypatch.setattr(ProjPaths, attr, tmp_path / attr)
+
+    monkeypatch.setattr(conversation_transcription, 'transcribe_with_backend',
+                        lambda audio, model_type='base', backend='openai-whisper':
+                        pd.DataFrame({'id': [0], 'start': [0.0], 'end': [1.0], 'text': [' Hi.']}).set_index('id'))
+    monkeypatch.setattr(conversation_transcription, 'pyannote_inference_df',
+                        lambda audio, pyannote_token:
+                        pd.DataFrame({'index': ['A'], 'start': [0.0], 'end': [1.0], 'speaker': ['SPEAKER_00']}))
+
+    wav_fname = tmp_path / 'episode.wav'
+    with wave.open(str(wav_fname), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(np.zeros(32000, dtype='<i2').tobytes())
+
+    output_file, text_speaker_df = conversation_transcription.wav_to_transcript(
+        str(wav_fname), 'base', 'token', 'episode', execution_mode=execution_mode,
+        return_path=True, use_cache=False, return_df=True)
+
+    assert list(text_speaker_df['speaker']) == ['SPEAKER_00']
+
+    report = json.loads(output_file.with_name('episode.txt.run.json').read_text())
+    assert report['meta']['execution_mode'] == execution_mode
+    assert {'decode', 'inference', 'whisper', 'pyannote', 'combine', 'write_transcript',
+            'write_intermediates'} <= set(report['stages'])
+    assert report['stages']['write_transcript']['bytes'] == output_file.stat().st_size
+    parents = {s['name']: s['parent'] for s in report['spans']}
+    assert parents['whisper'] == parents['pyannote'] == 'inference'
+    assert (output_file.parent / 'run_history.jsonl').exists()
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from convscript import intermediate_store
+from convscript.intermediate_store import read_corpus, read_intermediate, save_intermediate_tables, \
+    count_rows, write_intermediate
+from convscript.path import ProjPaths
+from convscript.segments import whisper_segments_to_df, speaker_turns_to_df
+
+
+@pytest.fixture
+def intermediate_dir(tmp_path, monkeypatch):
+    for attr in ['data_path', 'intermediate_path', 'outputs_path', 'cache_path', 'inputs_path']:
+        monkeypatch.setattr(ProjPaths, attr, tmp_path / attr)
+    return tmp_path / 'intermediate_path'
+
+
+def segment_tables(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.cumsum(rng.uniform(1, 5, size=n_rows + 1))
+    text_df = whisper_segments_to_df([{'id': i, 'seek': 0, 'start': bounds[i], 'end': bounds[i + 1],
+                                       'text': f' segment {i}', 'tokens': [1, 2], 'temperature': 0.0,
+                                       'avg_logprob': rng.normal(-0.3, 0.1),
+                                       'compression_ratio': rng.uniform(1, 2),
+                                       'no_speech_prob': rng.uniform(0, 0.1)}
+                                      for i in range(n_rows)]).reset_index()
+    speaker_df = speaker_turns_to_df([{'index': 'A', 'start': bounds[i], 'end': bounds[i + 1],
+                                       'speaker': f'SPEAKER_0{i % 3}'} for i in range(n_rows)])
+    return text_df, speaker_df
+
+
+def test_parquet_round_trip_keeps_types_and_values(intermediate_dir):
+
+    text_df, speaker_df = segment_tables(50)
+
+    whisper_path, speaker_path = save_intermediate_tables(text_df, speaker_df, 'episode.mp3', 'base')
+
+    assert whisper_path == intermediate_dir / 'episode_whisper_base_segments.parquet'
+    pd.testing.assert_frame_equal(read_intermediate(whisper_path), text_df)
+    loaded_speakers = read_intermediate(speaker_path)
+    assert isinstance(loaded_speakers['speaker'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(loaded_speakers, speaker_df)
+
+
+def test_speaker_column_is_dictionary_encoded(tmp_path):
+
+    import pyarrow.parquet as pq
+
+    speaker_df = pd.DataFrame({'start': [0.0, 1.0], 'end': [1.0, 2.0], 'speaker': ['SPEAKER_00', 'SPEAKER_01']})
+    path = write_intermediate(speaker_df, tmp_path / 'speakers.parquet')
+
+    column = pq.read_metadata(path).row_group(0).column(2)
+    assert column.compression == 'ZSTD'
+    assert 'RLE_DICTIONARY' in column.encodings
+
+
+def test_read_columns_and_row_ranges(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(intermediate_store, 'PARQUET_ROW_GROUP_SIZE', 100)
+    text_df, _ = segment_tables(1000)
+    parquet_path = write_intermediate(text_df, tmp_path / 'segments.parquet')
+    csv_path = write_intermediate(text_df, tmp_path / 'segments.csv')
+
+    expected = text_df.loc[250:429, ['start', 'avg_logprob']].reset_index(drop=True)
+    for path in [parquet_path, csv_path]:
+        loaded = read_intermediate(path, columns=['start', 'avg_logprob'], rows=(250, 430))
+        pd.testing.assert_frame_equal(loaded, expected, check_dtype=False, atol=1e-6)
+        assert count_rows(path) == 1000
+
+    assert len(read_intermediate(parquet_path, rows=(990, 2000))) == 10
+    assert list(read_intermediate(parquet_path, columns=['id'], rows=(5000, 6000)).columns) == ['id']
+
+
+def test_csv_export_is_still_available(intermediate_dir):
+
+    text_df, speaker_df = segment_tables(5)
+
+    whisper_path, speaker_path = save_intermediate_tables(text_df, speaker_df, 'episode.wav', 'base',
+                                                          intermediate_format='csv')
+
+    assert speaker_path == intermediate_dir / 'episode_speaker_segments.csv'
+    assert list(pd.read_csv(whisper_path)['text']) == list(text_df['text'])
+    with pytest.raises(ValueError):
+        save_intermediate_tables(text_df, speaker_df, 'episode.wav', 'base', intermediate_format='feather')
+
+
+def test_read_corpus(intermediate_dir):
+
+    for episode, n_rows in [('first', 3), ('second', 4)]:
+        save_intermediate_tables(*segment_tables(n_rows), f'{episode}.mp3', 'base')
+
+    corpus_df = read_corpus('speaker', columns=['speaker', 'end'])
+    assert list(corpus_df.columns) == ['episode', 'speaker', 'end']
+    assert list(corpus_df['episode']) == ['first'] * 3 + ['second'] * 4
+    assert isinstance(corpus_df['speaker'].dtype, pd.CategoricalDtype)
+
+    assert len(read_corpus('whisper', model_type='base')) == 7
+    assert read_corpus('whisper', model_type='large').empty
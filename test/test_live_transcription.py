@@ -0,0 +1,115 @@
+import wave
+
+import numpy as np
+import pandas as pd
+from convscript.live_transcription import LiveTranscriber, RingBuffer, Resampler, WavFileSource, \
+    pcm16_to_mono, read_wav_samples
+from convscript.segments import speaker_turns_to_df
+
+SR = 16000
+FRAME = 1600  # 0.1 s
+
+
+def write_wav(path, audio, sample_rate=SR, channels=1):
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((audio * 32767).astype('<i2').tobytes())
+
+
+def tone_bursts(n_bursts, burst_s=3.0, pause_s=1.0):
+    """Bursts of a 440 Hz tone separated by silence, like utterances."""
+    burst = 0.5 * np.sin(2 * np.pi * 440 * np.arange(int(burst_s * SR)) / SR)
+    pause = np.zeros(int(pause_s * SR))
+    return np.concatenate([np.concatenate([burst, pause]) for _ in range(n_bursts)]).astype(np.float32)
+
+
+def fake_transcribe(samples):
+    """One segment per run of loud 0.1 s frames."""
+    n_frames = len(samples) // FRAME
+    loud = np.abs(samples[:n_frames * FRAME]).reshape(n_frames, FRAME).max(axis=1) > 0.1
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], loud.astype(int), [0]])))
+    segments = [{'id': i, 'start': start * 0.1, 'end': end * 0.1, 'text': ' burst'}
+                for i, (start, end) in enumerate(zip(edges[::2], edges[1::2]))]
+    return pd.DataFrame(segments, columns=['id', 'start', 'end', 'text']).set_index('id')
+
+
+def fake_diarizer(calls):
+    def diarize(audio):
+        calls.append(len(audio))
+        return speaker_turns_to_df([{'index': 'A', 'start': 0.0, 'end': len(audio) / SR, 'speaker': 'SPEAKER_00'}])
+    return diarize
+
+
+def test_ring_buffer_addresses_absolute_samples():
+
+    ring = RingBuffer(10)
+    ring.write(np.arange(8, dtype=np.float32))
+    ring.release(6)
+    ring.write(np.arange(8, 14, dtype=np.float32))
+
+    assert ring.written == 14
+    assert list(ring.read(6, 14)) == [6, 7, 8, 9, 10, 11, 12, 13]
+
+
+def test_resampler_is_continuous_across_blocks():
+
+    audio = np.sin(2 * np.pi * 5 * np.arange(44100) / 44100).astype(np.float32)
+    resample = Resampler(44100)
+
+    resampled = np.concatenate([resample(block) for block in np.array_split(audio, 37)])
+
+    assert abs(len(resampled) - SR) <= 1
+    expected = np.sin(2 * np.pi * 5 * np.arange(len(resampled)) / SR)
+    assert np.max(np.abs(resampled - expected)) < 1e-3
+
+
+def test_stereo_is_mixed_down():
+
+    data = (np.array([[1000, 3000], [-2000, 0]], dtype='<i2')).tobytes()
+
+    assert np.allclose(pcm16_to_mono(data, 2), [2000 / 32768, -1000 / 32768])
+
+
+def test_live_transcription_of_a_wav_stream(tmp_path):
+
+    audio = tone_bursts(10)
+    write_wav(tmp_path / 'input.wav', audio)
+    diarize_calls = []
+    emitted = []
+
+    transcriber = LiveTranscriber(window_s=10, step_s=2, holdback_s=1, diarize_every_s=15,
+                                  on_segment=emitted.append,
+                                  transcribe_fn=fake_transcribe, diarize_fn=fake_diarizer(diarize_calls))
+    result = transcriber.run(WavFileSource(tmp_path / 'input.wav'), tmp_path / 'live.wav')
+
+    # every burst is final exactly once, at its global position
+    text_df = result['text_df']
+    assert list(text_df['id']) == list(range(10))
+    assert np.allclose(text_df['start'], np.arange(10) * 4.0)
+    assert np.allclose(text_df['end'], np.arange(10) * 4.0 + 3.0)
+    assert sum(segment['final'] for segment in emitted) == 10
+    assert all(segment['latency_s'] >= 0 for segment in emitted)
+
+    # the recording is kept, and diarized as a whole at the end
+    assert result['duration_s'] == len(audio) / SR
+    assert np.allclose(read_wav_samples(tmp_path / 'live.wav'), audio, atol=1e-4)
+    assert diarize_calls[-1] == len(audio)
+    assert list(result['speaker_df']['speaker']) == ['SPEAKER_00']
+
+
+def test_partial_segments_while_recording(tmp_path):
+
+    write_wav(tmp_path / 'input.wav', tone_bursts(1, burst_s=1.5, pause_s=1.0))
+    emitted = []
+
+    transcriber = LiveTranscriber(window_s=2, step_s=0.5, holdback_s=0.5, on_segment=emitted.append,
+                                  transcribe_fn=fake_transcribe, diarize_fn=fake_diarizer([]))
+    result = transcriber.run(WavFileSource(tmp_path / 'input.wav', realtime=True), tmp_path / 'live.wav',
+                             max_seconds=2.5)
+
+    partial = [segment for segment in emitted if not segment['final']]
+    assert partial and partial[0]['end'] <= 1.5
+    assert [segment['end'] for segment in emitted if segment['final']] == [1.5]
+    assert result['max_latency_s'] < 2.0
@@ -0,0 +1,91 @@
+import sys
+from types import ModuleType
+
+from convscript import model_faster_whisper
+from convscript.model_cache import ModelCache, estimate_model_size
+
+
+class FakeModel:
+
+    def __init__(self, name, size_bytes):
+        self.name = name
+        self.size_bytes = size_bytes
+
+
+def fake_size(model):
+    return model.size_bytes
+
+
+def test_cache_hit_does_not_reload():
+
+    cache = ModelCache(memory_budget_mb=1, size_fn=fake_size)
+    n_loads = []
+
+    def loader():
+        n_loads.append(1)
+        return FakeModel('base', 100)
+
+    first = cache.get(('whisper', 'base', 'cpu', None), loader)
+    second = cache.get(('whisper', 'base', 'cpu', None), loader)
+
+    assert first is second
+    assert len(n_loads) == 1
+
+
+def test_lru_eviction_under_memory_budget():
+
+    mb = 1024 ** 2
+    cache = ModelCache(memory_budget_mb=2, size_fn=fake_size)
+
+    cache.get('a', lambda: FakeModel('a', mb))
+    cache.get('b', lambda: FakeModel('b', mb))
+    cache.get('a', lambda: FakeModel('a', mb))  # 'a' becomes most recently used
+    cache.get('c', lambda: FakeModel('c', mb))
+
+    assert cache.keys() == ['a', 'c']
+    assert cache.total_bytes == 2 * mb
+
+
+def test_unload_and_budget_change():
+
+    mb = 1024 ** 2
+    cache = ModelCache(memory_budget_mb=4, size_fn=fake_size)
+    for key in ['a', 'b', 'c']:
+        cache.get(key, lambda: FakeModel(key, mb))
+
+    assert cache.unload('b') == 1
+    assert 'b' not in cache
+
+    cache.set_memory_budget(1)
+    assert cache.keys() == ['c']
+
+    assert cache.unload() == 1
+    assert len(cache) == 0
+
+
+def test_ctranslate2_models_are_sized_by_their_files(tmp_path, monkeypatch):
+
+    model_dir = tmp_path / 'faster-whisper-base'
+    model_dir.mkdir()
+    (model_dir / 'model.bin').write_bytes(b'0' * 3000)
+    (model_dir / 'vocabulary.txt').write_bytes(b'0' * 100)
+
+    class WhisperModel:
+        def __init__(self, model_path, device, compute_type):
+            self.model_path = model_path
+
+    faster_whisper = ModuleType('faster_whisper')
+    faster_whisper.WhisperModel = WhisperModel
+    utils = ModuleType('faster_whisper.utils')
+    utils.download_model = lambda model_type: str(model_dir)
+    monkeypatch.setitem(sys.modules, 'faster_whisper', faster_whisper)
+    monkeypatch.setitem(sys.modules, 'faster_whisper.utils', utils)
+    cache = ModelCache(memory_budget_mb=1)
+    monkeypatch.setattr(model_faster_whisper, 'MODEL_CACHE', cache)
+
+    model = model_faster_whisper.load_faster_whisper_model('base', device='cpu')
+
+    assert model.model_path == str(model_dir)
+    # no torch modules to count
+    assert estimate_model_size(model) == 0
+    assert cache.total_bytes == 3100
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+from convscript.notion import (markdown_to_notion_blocks, iter_notion_blocks, iter_paragraph_blocks,
+                               transcript_df_to_notion_blocks, request_batch_end, split_blocks_into_parts,
+                               block_request_size, NOTION_MAX_TEXT_LENGTH, NOTION_MAX_RICH_TEXT_ITEMS,
+                               NOTION_MAX_BLOCK_CHARS, NOTION_MAX_REQUEST_BYTES)
+
+
+def block_texts(block):
+
+    return [item['text']['content'] for item in block['paragraph']['rich_text']]
+
+
+def test_short_paragraphs_are_one_block_each():
+
+    content = '0.0 - 1.5: SPEAKER_00\n Hello there.\n\n1.5 - 3.0: SPEAKER_01\n Hi.\n\n\n'
+    blocks = markdown_to_notion_blocks(content)
+
+    assert [block_texts(block) for block in blocks] == [['0.0 - 1.5: SPEAKER_00\n Hello there.'],
+                                                        ['1.5 - 3.0: SPEAKER_01\n Hi.']]
+    assert markdown_to_notion_blocks('  \n ') == markdown_to_notion_blocks('')
+    assert block_texts(markdown_to_notion_blocks('')[0]) == ['Empty transcript']
+
+
+@pytest.mark.parametrize('paragraph', [
+    'Short sentence number one. ' * 2000,
+    'x' * 9000,
+    'A long sentence ' + 'with many words ' * 800 + 'ends here. And a short one.',
+])
+def test_long_paragraphs_respect_limits_and_round_trip(paragraph):
+
+    paragraph = paragraph.strip()
+    blocks = list(iter_notion_blocks(paragraph))
+
+    segments = [text for block in blocks for text in block_texts(block)]
+    assert all(len(text) <= NOTION_MAX_TEXT_LENGTH for text in segments)
+    assert all(len(block['paragraph']['rich_text']) <= NOTION_MAX_RICH_TEXT_ITEMS for block in blocks)
+    assert ''.join(segments) == paragraph
+
+
+def test_many_segments_start_new_blocks():
+
+    paragraph = ' '.join(['word ' * 300 + 'end.'] * 200)
+    blocks = markdown_to_notion_blocks(paragraph)
+
+    assert len(blocks) > 1
+    assert all(sum(map(len, block_texts(block))) <= NOTION_MAX_BLOCK_CHARS for block in blocks)
+    assert sum(map(len, block_texts(blocks[0]))) > NOTION_MAX_BLOCK_CHARS - NOTION_MAX_TEXT_LENGTH
+    assert ''.join(text for block in blocks for text in block_texts(block)) == paragraph
+
+    # short segments reach the limit on their number first
+    blocks = list(iter_paragraph_blocks(paragraph, max_length=100))
+    assert len(blocks[0]['paragraph']['rich_text']) == NOTION_MAX_RICH_TEXT_ITEMS
+    assert ''.join(text for block in blocks for text in block_texts(block)) == paragraph
+
+
+def test_requests_stay_under_the_payload_limit():
+
+    # 60 blocks of 19k characters would be a 1.1 MB request
+    paragraphs = ['Sentence number one. ' * 900] * 60
+    blocks = markdown_to_notion_blocks('\n\n'.join(paragraphs))
+    assert len(blocks) < 100
+
+    end = request_batch_end(blocks)
+    assert 0 < end < len(blocks)
+    assert sum(map(block_request_size, blocks[:end])) <= NOTION_MAX_REQUEST_BYTES
+    assert request_batch_end(blocks, len(blocks) - 1) == len(blocks)
+
+    parts = split_blocks_into_parts(blocks, 90)
+    assert len(parts) > 1 and sum(parts, []) == blocks
+    assert all(sum(map(block_request_size, part)) <= NOTION_MAX_REQUEST_BYTES for part in parts)
+
+
+def test_blocks_from_text_speaker_df():
+
+    text_speaker_df = pd.DataFrame({'start': [0.0, 12.345], 'end': [12.345, 20.0],
+                                    'text': [' Hello there.', ' Long.' * 1000],
+                                    'speaker': ['SPEAKER_00', 'SPEAKER_01']})
+    blocks = list(transcript_df_to_notion_blocks(text_speaker_df))
+
+    header = blocks[0]['paragraph']['rich_text']
+    assert [item['text']['content'] for item in header] == ['0.0 - 12.34: ', 'SPEAKER_00']
+    assert header[1]['annotations'] == {'bold': True}
+    assert block_texts(blocks[1]) == ['Hello there.']
+    assert block_texts(blocks[2]) == ['12.34 - 20.0: ', 'SPEAKER_01']
+    assert ''.join(block_texts(blocks[3])) == ('Long. ' * 1000).strip()
+    assert len(blocks) == 4
@@ -0,0 +1,317 @@
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import convscript.notion as notion
+from convscript.rate_limit import TokenBucket
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    """Minimal Notion API: database retrieval, page creation and block children, with injectable 429/5xx responses"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def maybe_fail(self):
+        server = self.server
+        with server.lock:
+            if server.failures and server.failures[0][0] == self.command:
+                status = server.failures.pop(0)[1]
+            else:
+                return False
+
+        codes = {400: 'validation_error', 429: 'rate_limited'}
+        headers = {'Retry-After': server.retry_after} if status == 429 else {}
+        self.send_json(status, {'object': 'error', 'status': status, 'code': codes.get(status, 'internal_server_error'),
+                                'message': 'injected failure'}, headers)
+        return True
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path))
+        if self.maybe_fail():
+            return
+        if self.path.startswith('/v1/blocks/'):
+            path, _, query = self.path.partition('?')
+            params = dict(param.split('=') for param in query.split('&') if param)
+            start, page_size = int(params.get('start_cursor', 0)), int(params.get('page_size', 100))
+            children = self.server.children[path.split('/')[3]]
+            has_more = start + page_size < len(children)
+            self.send_json(200, {'object': 'list', 'results': children[start:start + page_size], 'has_more': has_more,
+                                 'next_cursor': str(start + page_size) if has_more else None})
+            return
+        self.send_json(200, {'object': 'database', 'id': 'db',
+                             'properties': {'Name': {'type': 'title'},
+                                            'Date': {'type': 'date'},
+                                            'Link': {'type': 'url'}}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(('POST', self.path))
+        if self.maybe_fail():
+            return
+
+        with self.server.lock:
+            page_id = f'page-{len(self.server.pages)}'
+            self.server.pages.append(body)
+            self.server.children[page_id] = list(body.get('children', []))
+        self.send_json(200, {'object': 'page', 'id': page_id, 'url': f'https://notion.test/{page_id}'})
+
+    def do_PATCH(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(('PATCH', self.path))
+        if self.maybe_fail():
+            return
+
+        with self.server.lock:
+            self.server.n_appends += 1
+            if self.server.n_appends == self.server.reject_append:
+                self.send_json(400, {'object': 'error', 'status': 400, 'code': 'validation_error', 'message': 'rejected'})
+                return
+            page_id = self.path.split('/')[3]
+            self.server.children[page_id].extend(body['children'])
+            if self.server.n_appends == self.server.lose_append_response:
+                self.send_json(502, {'object': 'error', 'status': 502, 'code': 'internal_server_error',
+                                     'message': 'response lost'})
+                return
+        self.send_json(200, {'object': 'list', 'results': body['children'], 'has_more': False, 'next_cursor': None})
+
+
+@pytest.fixture
+def notion_server(monkeypatch, tmp_path):
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeNotionHandler)
+    server.lock = threading.Lock()
+    server.failures = []
+    server.requests = []
+    server.pages = []
+    server.children = {}
+    server.n_appends = 0
+    server.reject_append = None
+    server.lose_append_response = None
+    server.retry_after = '0.2'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv('NOTION_WRITE_API_TOKEN', 'secret')
+    monkeypatch.setenv('NOTION_TRANSCRIPTS_DATABASE_ID', 'db')
+    monkeypatch.setenv('NOTION_API_BASE_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    monkeypatch.setattr(notion, 'NOTION_RATE_LIMITER', TokenBucket(rate=200))
+    monkeypatch.setattr(notion, '_SCHEMA_CACHE', {})
+    monkeypatch.setattr(notion, 'NOTION_UPLOAD_STATE_FILE', tmp_path / 'notion_uploads.json')
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def page_title(page):
+
+    return page['properties']['Name']['title'][0]['text']['content']
+
+
+@pytest.fixture
+def long_transcript_file(tmp_path):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text(''.join(f'{i}.0 - {i + 1}.0: SPEAKER_00\n Sentence {i}.\n\n' for i in range(400)),
+                               encoding='utf-8')
+    return transcript_file
+
+
+def test_multi_part_upload_with_retries(notion_server, long_transcript_file):
+
+    transcript_file = long_transcript_file
+    notion_server.failures = [('GET', 502), ('POST', 429), ('POST', 429)]
+
+    page_url = notion.upload_transcript_to_notion(str(transcript_file), title='Episode',
+                                                  date='2024-01-02', url='https://example.com',
+                                                  upload_mode='multi_page')
+
+    n_parts = len(notion.split_blocks_into_parts(notion.markdown_to_notion_blocks(transcript_file.read_text()), 90))
+    assert n_parts > 2
+    titles = sorted(page_title(page) for page in notion_server.pages)
+    assert titles == sorted(f'Episode - Part {i}' for i in range(1, n_parts + 1))
+    assert page_url == 'https://notion.test/' + next(f'page-{i}' for i, page in enumerate(notion_server.pages)
+                                                     if page_title(page) == 'Episode - Part 1')
+    assert notion_server.pages[0]['properties']['Date'] == {'date': {'start': '2024-01-02'}}
+    assert notion_server.pages[0]['properties']['Link'] == {'url': 'https://example.com'}
+    assert notion_server.failures == []
+    # the schema is fetched once for all parts (the first attempt failed with a 502)
+    assert [request for request in notion_server.requests if request[0] == 'GET'] == [('GET', '/v1/databases/db')] * 2
+
+
+def test_validation_error_is_not_retried_and_invalidates_schema(notion_server, tmp_path):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text('0.0 - 1.0: SPEAKER_00\n Hello.\n\n', encoding='utf-8')
+    notion_server.failures = [('POST', 400)]
+
+    page_url = notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False)
+
+    assert page_url is None
+    assert notion_server.pages == []
+    assert [request[0] for request in notion_server.requests] == ['GET', 'POST']
+    assert notion._SCHEMA_CACHE == {}
+
+    assert notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False)
+    assert [request[0] for request in notion_server.requests] == ['GET', 'POST', 'GET', 'POST']
+
+
+def test_retry_after_header_formats():
+
+    assert notion.retry_after_seconds('2', default=1.0) == 2.0
+    assert notion.retry_after_seconds('-3', default=1.0) == 0.0
+    assert notion.retry_after_seconds(None, default=1.0) == 1.0
+    assert notion.retry_after_seconds('soon', default=1.0) == 1.0
+    assert notion.retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT', default=1.0) == 0.0
+    future = formatdate(time.time() + 30, usegmt=True)
+    assert 25 < notion.retry_after_seconds(future, default=1.0) <= 30
+
+
+def test_rate_limit_with_http_date_is_retried(notion_server, tmp_path):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text('0.0 - 1.0: SPEAKER_00\n Hello.\n\n', encoding='utf-8')
+    notion_server.retry_after = formatdate(time.time() - 5, usegmt=True)
+    notion_server.failures = [('POST', 429)]
+
+    assert notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False)
+    assert [request[0] for request in notion_server.requests] == ['GET', 'POST', 'POST']
+
+
+def test_page_creation_is_not_retried_after_server_errors(notion_server, tmp_path):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text('0.0 - 1.0: SPEAKER_00\n Hello.\n\n', encoding='utf-8')
+    notion_server.failures = [('POST', 502)]
+
+    assert notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False) is None
+    assert [request[0] for request in notion_server.requests] == ['GET', 'POST']
+
+
+def test_schema_disk_cache(notion_server, tmp_path, monkeypatch):
+
+    monkeypatch.setattr(notion, 'NOTION_SCHEMA_CACHE_TTL', 3600)
+    monkeypatch.setattr(notion, 'NOTION_SCHEMA_CACHE_FILE', tmp_path / 'notion_schemas.json')
+
+    assert notion.get_database_schema()['date'] == 'Date'
+    notion._SCHEMA_CACHE.clear()
+    assert notion.get_database_schema()['url'] == 'Link'
+    assert len(notion_server.requests) == 1
+
+    notion.invalidate_database_schema('db')
+    assert notion.get_database_schema()['title'] == 'Name'
+    assert len(notion_server.requests) == 2
+
+
+def test_single_page_upload_in_batches(notion_server, long_transcript_file):
+
+    blocks = notion.markdown_to_notion_blocks(long_transcript_file.read_text())
+    notion_server.failures = [('PATCH', 429), ('PATCH', 503)]
+
+    page_url = notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False)
+
+    assert page_url == 'https://notion.test/page-0'
+    assert len(notion_server.pages) == 1
+    assert notion_server.children['page-0'] == blocks
+    assert all(len(page['children']) <= 100 for page in notion_server.pages)
+    assert notion.NOTION_UPLOAD_STATE_FILE.read_text() == '{}'
+
+
+def test_single_page_upload_resumes(notion_server, long_transcript_file):
+
+    blocks = notion.markdown_to_notion_blocks(long_transcript_file.read_text())
+    notion_server.reject_append = 2
+
+    assert notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False) is None
+    assert len(notion_server.children['page-0']) == 200
+
+    page_url = notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False)
+
+    assert page_url == 'https://notion.test/page-0'
+    assert len(notion_server.pages) == 1
+    assert notion_server.children['page-0'] == blocks
+
+
+@pytest.mark.parametrize('n_blocks', [96, 100, 101])
+def test_single_page_upload_never_splits(notion_server, tmp_path, n_blocks):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text(''.join(f'{i}.0 - {i + 1}.0: SPEAKER_00\n Sentence {i}.\n\n' for i in range(n_blocks)),
+                               encoding='utf-8')
+    blocks = notion.markdown_to_notion_blocks(transcript_file.read_text())
+    assert len(blocks) == n_blocks
+
+    page_url = notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False)
+
+    assert page_url == 'https://notion.test/page-0'
+    assert [page_title(page) for page in notion_server.pages] == ['Episode']
+    assert notion_server.children['page-0'] == blocks
+    assert notion_server.n_appends == (1 if n_blocks > 100 else 0)
+
+
+def test_lost_append_response_does_not_duplicate_blocks(notion_server, long_transcript_file):
+
+    blocks = notion.markdown_to_notion_blocks(long_transcript_file.read_text())
+    notion_server.lose_append_response = 2
+
+    page_url = notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False)
+
+    assert page_url == 'https://notion.test/page-0'
+    assert notion_server.children['page-0'] == blocks
+    assert notion_server.n_appends == 3
+
+
+def test_resume_skips_batches_that_arrived(notion_server, long_transcript_file, monkeypatch):
+
+    blocks = notion.markdown_to_notion_blocks(long_transcript_file.read_text())
+    notion_server.lose_append_response = 2
+    # the batch arrives, but its confirmation is lost and the upload gives up
+    monkeypatch.setattr(notion, 'NOTION_MAX_RETRIES', 0)
+
+    assert notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False) is None
+    assert len(notion_server.children['page-0']) == 300
+
+    page_url = notion.upload_transcript_to_notion(str(long_transcript_file), title='Episode', include_date=False)
+
+    assert page_url == 'https://notion.test/page-0'
+    assert notion_server.children['page-0'] == blocks
+
+
+@pytest.mark.parametrize('upload_mode', ['single_page', 'multi_page'])
+def test_large_blocks_are_appended_within_the_payload_limit(notion_server, tmp_path, upload_mode):
+
+    transcript_file = tmp_path / 'transcript.txt'
+    transcript_file.write_text(''.join(f'{i}.0 - {i + 1}.0: SPEAKER_00\n' + 'Sentence. ' * 2000 + '\n\n'
+                                       for i in range(40)), encoding='utf-8')
+    blocks = notion.markdown_to_notion_blocks(transcript_file.read_text())
+    # few enough blocks for a single request, but too large for one
+    assert len(blocks) <= 95
+
+    page_url = notion.upload_transcript_to_notion(str(transcript_file), title='Episode', include_date=False,
+                                                  upload_mode=upload_mode)
+
+    assert page_url
+    assert all(len(json.dumps(page['children'])) <= notion.NOTION_MAX_REQUEST_BYTES for page in notion_server.pages)
+    if upload_mode == 'single_page':
+        assert page_url == 'https://notion.test/page-0'
+        assert notion_server.children['page-0'] == blocks
+        assert notion_server.n_appends > 0
+    else:
+        assert len(notion_server.pages) > 1
+        parts = sorted(notion_server.pages, key=page_title)
+        # each part starts with its navigation header
+        assert [block for page in parts for block in page['children'][1:]] == blocks
@@ -0,0 +1,124 @@
+import os
+import time
+import wave
+import numpy as np
+import pandas as pd
+import pytest
+from convscript import conversation_transcription
+from convscript.path import ProjPaths
+from convscript.result_cache import ResultCache, hash_audio, stage_key
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    return ResultCache(cache_dir=tmp_path / 'cache', max_size_mb=1)
+
+
+def test_stage_key_depends_on_audio_and_params():
+
+    key = stage_key('abc', 'whisper', model_type='base')
+
+    assert key == stage_key('abc', 'whisper', model_type='base')
+    assert key != stage_key('abc', 'whisper', model_type='tiny')
+    assert key != stage_key('abd', 'whisper', model_type='base')
+    assert hash_audio(np.zeros(10, dtype=np.float32)) != hash_audio(np.ones(10, dtype=np.float32))
+
+
+def test_put_get_and_lru_eviction(result_cache):
+
+    big_df = pd.DataFrame({'x': np.arange(50_000, dtype=np.float64)})  # ~400 kB pickled
+
+    for key in ['a', 'b']:
+        result_cache.put(key, big_df, {'stage': 'whisper'})
+        time.sleep(0.01)
+    pd.testing.assert_frame_equal(result_cache.get('a'), big_df)  # 'a' becomes most recently used
+    time.sleep(0.01)
+    result_cache.put('c', big_df)
+
+    assert result_cache.has('a')
+    assert not result_cache.has('b')
+    assert result_cache.get('b') is None
+    assert [entry['key'] for entry in result_cache.entries()] == ['a', 'c']
+
+    assert result_cache.prune(0) == 2
+    assert result_cache.entries() == []
+
+
+def test_corrupt_and_evicted_entries_are_misses(result_cache, monkeypatch):
+
+    df = pd.DataFrame({'start': [0.0], 'end': [1.0]})
+    result_cache.put('a', df)
+    data_path = result_cache.cache_dir / 'a.pkl'
+    data_path.write_bytes(data_path.read_bytes()[:10])
+
+    assert result_cache.get('a') is None
+    assert not data_path.exists() and not (result_cache.cache_dir / 'a.json').exists()
+
+    result_cache.put('b', df)
+    # evicted by another process between reading and refreshing the entry
+    def evicted(path):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert result_cache.get('b') is None
+
+
+def test_known_audio_detects_changed_files(result_cache, tmp_path):
+
+    fname = tmp_path / 'episode.wav'
+    fname.write_bytes(b'first version')
+    audio_hash = result_cache.remember_audio(fname, fname, duration=1.5)
+
+    assert result_cache.known_audio(fname)['audio_hash'] == audio_hash
+    assert result_cache.known_audio(fname)['duration'] == 1.5
+
+    fname.write_bytes(b'second, longer version')
+    assert result_cache.known_audio(fname) is None
+
+
+def test_wav_to_transcript_reuses_cached_inference(tmp_path, monkeypatch):
+
+    for attr in ['data_path', 'intermediate_path', 'outputs_path', 'cache_path', 'inputs_path']:
+        monkeypatch.setattr(ProjPaths, attr, tmp_path / attr)
+    monkeypatch.setattr(ProjPaths, 'data_path', tmp_path)
+
+    calls = []
+
+    def fake_whisper(audio, model_type='base', backend='openai-whisper'):
+        calls.append('whisper')
+        return pd.DataFrame({'id': [0, 1], 'start': [0.0, 1.0], 'end': [1.0, 2.0],
+                             'text': [' Hello.', ' Bye.']}).set_index('id')
+
+    def fake_pyannote(audio, pyannote_token):
+        calls.append('pyannote')
+        return pd.DataFrame({'index': ['A', 'B'], 'start': [0.0, 1.0], 'end': [1.0, 2.0],
+                             'speaker': ['SPEAKER_00', 'SPEAKER_01']})
+
+    monkeypatch.setattr(conversation_transcription, 'transcribe_with_backend', fake_whisper)
+    monkeypatch.setattr(conversation_transcription, 'pyannote_inference_df', fake_pyannote)
+
+    wav_fname = tmp_path / 'episode.wav'
+    with wave.open(str(wav_fname), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(np.zeros(32000, dtype='<i2').tobytes())
+
+    first = conversation_transcription.wav_to_transcript(str(wav_fname), 'base', 'token', 'first',
+                                                         decode_once=False)
+    second = conversation_transcription.wav_to_transcript(str(wav_fname), 'base', 'token', 'second',
+                                                          decode_once=False)
+
+    assert calls == ['whisper', 'pyannote']
+    assert first == second
+    assert 'SPEAKER_01\n Bye.' in second
+
+    # the speaker turns were evicted (e.g. by another batch worker): decode and diarize again
+    result_cache = ResultCache()
+    for entry in result_cache.entries():
+        if entry.get('stage') == 'pyannote':
+            result_cache.remove(entry['key'])
+
+    third = conversation_transcription.wav_to_transcript(str(wav_fname), 'base', 'token', 'third',
+                                                         decode_once=False)
+    assert calls == ['whisper', 'pyannote', 'pyannote']
+    assert third == first
@@ -0,0 +1,45 @@
+import copy
+import numpy as np
+from convscript.segments import build_segment_table, whisper_segments_to_df, speaker_turns_to_df
+
+
+def whisper_segment(seg_id, start, end):
+
+    return {'id': seg_id, 'seek': 0, 'start': start, 'end': end, 'text': f' text {seg_id}',
+            'tokens': [50364, 1000, 50414], 'temperature': 0.0, 'avg_logprob': -0.25,
+            'compression_ratio': 1.1, 'no_speech_prob': 0.02}
+
+
+def test_whisper_segments_drop_tokens_without_mutating_input():
+
+    segments = [whisper_segment(0, 0.0, 2.5), whisper_segment(1, 2.5, 4.0)]
+    segments_before = copy.deepcopy(segments)
+
+    seg_df = whisper_segments_to_df(segments)
+
+    assert segments == segments_before
+    assert 'tokens' not in seg_df.columns
+    assert list(seg_df.index) == [0, 1]
+    assert seg_df['start'].dtype == np.float64
+    assert seg_df['avg_logprob'].dtype == np.float32
+    assert list(seg_df['text']) == [' text 0', ' text 1']
+
+
+def test_speaker_turns_rounded_and_categorical():
+
+    turns = [{'index': 'A', 'start': 0.031, 'end': 3.456, 'speaker': 'SPEAKER_00'},
+             {'index': 'B', 'start': 3.5, 'end': 7.0049, 'speaker': 'SPEAKER_01'}]
+
+    speaker_df = speaker_turns_to_df(turns)
+
+    assert list(speaker_df.columns) == ['index', 'start', 'end', 'speaker']
+    assert list(speaker_df['start']) == [0.03, 3.5]
+    assert list(speaker_df['end']) == [3.46, 7.0]
+    assert speaker_df['speaker'].dtype == 'category'
+
+
+def test_empty_tables_keep_columns():
+
+    assert list(speaker_turns_to_df([]).columns) == ['index', 'start', 'end', 'speaker']
+    assert 'start' in whisper_segments_to_df([]).columns
+    assert build_segment_table([], columns=['a', 'b']).shape == (0, 2)
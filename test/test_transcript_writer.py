@@ -0,0 +1,74 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from convscript.transcript_writer import iter_transcript_chunks, write_transcript
+
+
+@pytest.fixture
+def text_speaker_df():
+
+    return pd.DataFrame({'start': [0.0, 12.345, 3725.5],
+                         'end': [12.345, 3725.5, 3730.004],
+                         'text': [' Hello there.', ' Hi, how are you?', ' Fine.'],
+                         'speaker': ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_00']})
+
+
+def legacy_text_speaker_df_to_text(text_speaker_df):
+
+    output_str = ''
+
+    for idx, this_row in text_speaker_df.iterrows():
+
+        this_start = np.round(this_row['start'], 2)
+        this_end = np.round(this_row['end'], 2)
+
+        output_str += f'{this_start} - {this_end}: {this_row["speaker"]}\n'
+        output_str += f'{this_row["text"]}\n\n'
+
+    return output_str
+
+
+def test_txt_matches_legacy_layout(text_speaker_df):
+
+    output_str = ''.join(iter_transcript_chunks(text_speaker_df, 'txt'))
+
+    assert output_str == legacy_text_speaker_df_to_text(text_speaker_df)
+    assert output_str.startswith('0.0 - 12.34: SPEAKER_00\n Hello there.\n\n')
+
+
+def test_srt_and_vtt(text_speaker_df):
+
+    srt = ''.join(iter_transcript_chunks(text_speaker_df, 'srt'))
+    vtt = ''.join(iter_transcript_chunks(text_speaker_df, 'vtt'))
+
+    assert srt.startswith('1\n00:00:00,000 --> 00:00:12,345\n[SPEAKER_00] Hello there.\n\n2\n')
+    assert '3\n01:02:05,500 --> 01:02:10,004\n[SPEAKER_00] Fine.\n' in srt
+    assert vtt.startswith('WEBVTT\n\n00:00:00.000 --> 00:00:12.345\n<v SPEAKER_00>Hello there.\n\n')
+
+
+def test_jsonl_round_trip(text_speaker_df):
+
+    handle = io.StringIO()
+    n_chars = write_transcript(text_speaker_df, handle, 'jsonl')
+
+    lines = handle.getvalue().splitlines()
+    assert n_chars == len(handle.getvalue())
+    assert [json.loads(line)['speaker'] for line in lines] == list(text_speaker_df['speaker'])
+    assert json.loads(lines[1])['start'] == 12.345
+
+
+def test_write_to_path(text_speaker_df, tmp_path):
+
+    output_file = tmp_path / 'transcript.txt'
+    n_chars = write_transcript(text_speaker_df, output_file)
+
+    assert output_file.read_text(encoding='utf-8') == legacy_text_speaker_df_to_text(text_speaker_df)
+    assert n_chars == len(output_file.read_text(encoding='utf-8'))
+
+
+def test_unknown_format(text_speaker_df):
+
+    with pytest.raises(ValueError):
+        iter_transcript_chunks(text_speaker_df, 'docx')
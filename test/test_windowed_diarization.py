@@ -0,0 +1,129 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from convscript import model_pyannote
+from convscript.windowed_diarization import diarization_windows, owned_ranges, SpeakerLinker, \
+    windowed_diarization_df
+
+SR = 1000
+FREQUENCIES = {'alice': 50, 'bob': 120, 'carol': 310}
+
+
+def conversation(turns):
+    """Each speaker is a sine tone of its own frequency."""
+    audio = np.zeros(int(turns[-1][1] * SR), dtype=np.float32)
+    for start, end, name in turns:
+        t = np.arange(int(start * SR), int(end * SR)) / SR
+        audio[int(start * SR):int(end * SR)] = np.sin(2 * np.pi * FREQUENCIES[name] * t)
+    return audio
+
+
+def fake_diarizer(turns):
+    """Diarizes a window from the ground truth, with labels that change from window to window."""
+    calls = []
+
+    def diarize(samples):
+        # windows are diarized in order with n_workers=1
+        window_start = diarize.offsets[len(calls)]
+        window_end = window_start + len(samples) / SR
+        calls.append((window_start, window_end))
+        names = list(FREQUENCIES)
+        names = names[len(calls) % 3:] + names[:len(calls) % 3]
+        local_labels = {name: f'SPEAKER_{names.index(name):02d}' for name in FREQUENCIES}
+        return [(max(start, window_start) - window_start, min(end, window_end) - window_start, 'A',
+                 local_labels[name])
+                for start, end, name in turns if end > window_start and start < window_end]
+
+    return diarize, calls
+
+
+def spectrum_embedding(samples):
+    spectrum = np.abs(np.fft.rfft(samples, n=SR))
+    return spectrum / (np.linalg.norm(spectrum) or 1)
+
+
+def test_windows_overlap_and_cover_the_recording():
+
+    windows = diarization_windows(250, window_s=100, overlap_s=20)
+
+    assert windows == [(0.0, 100.0), (80.0, 180.0), (160.0, 250.0)]
+    assert owned_ranges(windows) == [(0.0, 90.0), (90.0, 170.0), (170.0, 250.0)]
+    assert diarization_windows(50, window_s=100, overlap_s=20) == [(0.0, 50)]
+
+
+def test_linker_matches_known_speakers_and_adds_new_ones():
+
+    linker = SpeakerLinker(threshold=0.5)
+
+    first = linker.link({'A': np.array([1.0, 0.0, 0.0]), 'B': np.array([0.0, 1.0, 0.0])}, {'A': 10, 'B': 5})
+    second = linker.link({'X': np.array([0.1, 0.9, 0.0]), 'Y': np.array([0.0, 0.0, 1.0]),
+                          'Z': np.array([0.9, 0.1, 0.0])}, {})
+
+    assert first == {'A': 0, 'B': 1}
+    assert second == {'X': 1, 'Y': 2, 'Z': 0}
+
+
+def test_speakers_are_linked_across_windows():
+
+    turns = [(0, 25, 'alice'), (25, 60, 'bob'), (60, 95, 'alice'), (95, 130, 'carol'),
+             (130, 170, 'bob'), (170, 200, 'alice')]
+    audio = conversation(turns)
+    diarize, calls = fake_diarizer(turns)
+    diarize.offsets = [start for start, _ in diarization_windows(200, window_s=60, overlap_s=10)]
+
+    speaker_df = windowed_diarization_df(audio, window_s=60, overlap_s=10, sample_rate=SR,
+                                         diarize_fn=diarize, embed_fn=spectrum_embedding)
+
+    assert len(calls) == 4
+    assert list(speaker_df.columns) == ['index', 'start', 'end', 'speaker']
+    # turns cut at window boundaries are joined again
+    assert list(speaker_df['start']) == [start for start, _, _ in turns]
+    assert list(speaker_df['end']) == [end for _, end, _ in turns]
+
+    labels = dict(zip(speaker_df['speaker'], [name for _, _, name in turns]))
+    assert labels == {'SPEAKER_00': 'alice', 'SPEAKER_01': 'bob', 'SPEAKER_02': 'carol'}
+    assert list(speaker_df['speaker']) == ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_00', 'SPEAKER_02',
+                                           'SPEAKER_01', 'SPEAKER_00']
+
+
+def test_failed_window_is_retried():
+
+    turns = [(0, 30, 'alice'), (30, 60, 'bob')]
+    attempts = []
+
+    def flaky_diarize(samples):
+        attempts.append(len(samples))
+        if len(attempts) == 1:
+            raise RuntimeError('out of memory')
+        return [(0.0, 30.0, 'A', 'S1'), (30.0, 60.0, 'B', 'S2')]
+
+    speaker_df = windowed_diarization_df(conversation(turns), window_s=100, sample_rate=SR,
+                                         diarize_fn=flaky_diarize, embed_fn=spectrum_embedding)
+
+    assert len(attempts) == 2
+    assert list(speaker_df['speaker']) == ['SPEAKER_00', 'SPEAKER_01']
+
+
+def test_parallel_windows_use_one_pipeline_per_worker(monkeypatch):
+
+    users = {}
+
+    class FakeDiarization:
+        def itertracks(self, yield_label=False):
+            yield SimpleNamespace(start=0.0, end=5.0), 'A', 'S1'
+
+    def fake_pyannote(pyannote_token, samples, instance=0):
+        users.setdefault(instance, set()).add(threading.get_ident())
+        time.sleep(0.01)
+        return FakeDiarization()
+
+    monkeypatch.setattr(model_pyannote, 'appyl_pyannote_model', fake_pyannote)
+
+    windowed_diarization_df(np.zeros(100 * SR, dtype=np.float32), 'token', window_s=20, overlap_s=5,
+                            n_workers=3, sample_rate=SR, embed_fn=spectrum_embedding)
+
+    assert set(users) <= {0, 1, 2} and len(users) > 1
+    # no pipeline instance is shared between threads
+    assert all(len(threads) == 1 for threads in users.values())